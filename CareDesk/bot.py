@@ -1,47 +1,50 @@
 import os
 import re
-import sys
 import asyncio
+import calendar
+import csv
+import glob
 import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Mapping
 from datetime import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
 from loguru import logger
 from openpyxl import Workbook, load_workbook
 
-from pipecat.audio.vad.silero import SileroVADAnalyzer
-from pipecat.frames.frames import LLMRunFrame
+from pipecat.frames.frames import TranscriptionFrame, TTSSpeakFrame
 from pipecat.pipeline.pipeline import Pipeline
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
 from pipecat.processors.aggregators.llm_context import LLMContext
 from pipecat.processors.aggregators.llm_response_universal import LLMContextAggregatorPair
 
-from pipecat.services.deepgram.stt import DeepgramSTTService
-from pipecat.services.cartesia.tts import CartesiaTTSService
-from pipecat.services.openai.llm import OpenAILLMService
-from pipecat.services.deepgram.tts import DeepgramTTSService
 from pipecat.services.llm_service import FunctionCallParams
 
 from pipecat.transports.base_transport import TransportParams
-from pipecat.transports.smallwebrtc.transport import SmallWebRTCTransport
-from pipecat.transports.websocket.fastapi import (
-    FastAPIWebsocketParams,
-    FastAPIWebsocketTransport,
-)
 
 from pipecat.adapters.schemas.tools_schema import ToolsSchema
 
-from nextgenswitch_serializer import NextGenSwitchFrameSerializer
 from transfer_call import transfer_call
+from vad import SharedSileroVADAnalyzer
 
-
-load_dotenv(override=True)
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
-logger.add(sys.stderr, level=os.getenv("LOG_LEVEL", "INFO"))
+load_dotenv(override=True)
 
 
-GREETING_INSTRUCTION = "Start the call now with the required greeting."
+GREETING_MESSAGE = "Hello, thank you for calling Info Diagnostic Center. How may I help you today?"
 
 APPOINTMENTS_HEADERS = [
     "Logged At",
@@ -57,12 +60,58 @@ APPOINTMENTS_HEADERS = [
     "Existing Appointment",
     "Notes",
 ]
+# Column number (1-based) of each header in a sheet written by this module.
+_HEADER_INDEX = MappingProxyType({name: idx + 1 for idx, name in enumerate(APPOINTMENTS_HEADERS)})
+_HEADER_SET = frozenset(APPOINTMENTS_HEADERS)
+
+# One appointment log row, with fields in APPOINTMENTS_HEADERS order.
+AppointmentRow = namedtuple(
+    "AppointmentRow",
+    [
+        "logged_at",
+        "action",
+        "patient_name",
+        "patient_age_or_dob",
+        "phone",
+        "department_or_doctor",
+        "reason",
+        "preferred_date",
+        "preferred_time",
+        "visit_type",
+        "existing_appointment",
+        "notes",
+    ],
+)
+
+# Deepgram finalizes an utterance after this much trailing silence instead of
+# its server default. pipecat already sends Deepgram a Finalize message when
+# the VAD reports UserStoppedSpeakingFrame and drops empty transcripts.
+# Deepgram's own vad_events stay off: the transport's Silero VAD already emits
+# the user speaking frames, and Deepgram would push a second set of them along
+# with extra interruptions.
+DEEPGRAM_ENDPOINTING_MS = 200
+DEEPGRAM_UTTERANCE_END_MS = 1000
+
+# close_session's return value is never sent back to the model, so one
+# read-only instance serves every call.
+_CLOSE_RESULT = MappingProxyType({"status": "closed"})
 
-APPOINTMENT_LOG_LOCK = threading.Lock()
 DEFAULT_APPOINTMENTS_SHEET = "Appointments"
 
-SYSTEM_INSTRUCTION = f"""
-You are a professional appointment booking receptionist for a medical clinic named "Info Diagnostic Center" in the United States.
+# Patterns and formats used by the appointment normalizers.
+_SHEET_RE = re.compile(r"[\\/*?:\[\]]")
+_PHONE_RE = re.compile(r"\D")
+_DATE_RE = re.compile(r"(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/-]\d{1,2}[/-]\d{2,4})")
+_TIME_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?")
+# The date layouts the log understands: ISO, or day and month in either order
+# followed by a four-digit year, with one separator used throughout.
+_DATE_SHAPE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})([/-])(\d{1,2})\5(\d{4})")
+
+# Universal rules shared by every tenant. Keep this byte-stable: it is the
+# prefix OpenAI caches across all calls, whatever clinic they are for.
+BASE_SYSTEM = """
+You are a professional appointment booking receptionist for a medical clinic in the United States.
+The clinic you work for and its details are given in the next system message.
 
 Your ONLY job is to help callers:
 1) Book a new doctor appointment
@@ -104,6 +153,37 @@ Say:
 Then offer:
 "I can also notify the clinic if you want."
 
+TOOL USAGE RULES:
+After the caller confirms, use tools exactly once.
+
+APPOINTMENT LOGGING TOOL:
+After confirming a NEW booking, call log_appointment once with:
+action, patient_name, patient_age_or_dob, phone, department_or_doctor, reason, preferred_date,
+preferred_time, visit_type, existing_appointment, notes.
+Use YYYY-MM-DD for preferred_date when possible.
+
+APPOINTMENT UPDATE TOOL:
+For reschedule or cancellation, call update_appointment once after confirming.
+Provide search_name or search_phone, plus search_date and search_time if known.
+Set action to reschedule or cancel and include only the fields that should change.
+If update_appointment returns not_found:
+Ask for the missing details in one short question, or offer a callback.
+
+ERROR HANDLING:
+If audio is unclear:
+"Sorry, I did not catch that. Could you please repeat?"
+If still unclear:
+"No problem. I can take your number and the clinic will call you back."
+
+PRIVACY:
+- Only collect necessary booking details.
+- Never ask for OTP, passwords, bank PIN, or full card number.
+"""
+
+# Clinic-specific details. bot_params["prompt"] replaces only this part.
+CLINIC_TAIL = """
+You work for: Info Diagnostic Center, a medical clinic in the United States.
+
 CLINIC INFO (USE WHEN ASKED):
 - Clinic Name: Info Diagnostic Center
 - Departments: Family Medicine, Internal Medicine, Cardiology, OB GYN, Pediatrics, Dermatology, ENT, Orthopedics
@@ -242,37 +322,229 @@ CONFIRMATION RULE (BEFORE FINALIZING):
 Confirm in one short sentence:
 "To confirm, you want an appointment with Doctor Name on Date at Time for Reason. Is that correct?"
 
-TOOL USAGE RULES:
-After the caller confirms, use tools exactly once.
+ENDING:
+Close with:
+"Thank you for calling Info Diagnostic Center. We will confirm your appointment shortly. Have a good day."
 
-APPOINTMENT LOGGING TOOL:
-After confirming a NEW booking, call log_appointment once with:
-action, patient_name, patient_age_or_dob, phone, department_or_doctor, reason, preferred_date,
-preferred_time, visit_type, existing_appointment, notes.
-Use YYYY-MM-DD for preferred_date when possible.
+"""
 
-APPOINTMENT UPDATE TOOL:
-For reschedule or cancellation, call update_appointment once after confirming.
-Provide search_name or search_phone, plus search_date and search_time if known.
-Set action to reschedule or cancel and include only the fields that should change.
-If update_appointment returns not_found:
-Ask for the missing details in one short question, or offer a callback.
 
-ERROR HANDLING:
-If audio is unclear:
-"Sorry, I did not catch that. Could you please repeat?"
-If still unclear:
-"No problem. I can take your number and the clinic will call you back."
+def _normalize_prompt(text: str) -> str:
+    """Normalize line endings and trailing whitespace in a system prompt.
 
-PRIVACY:
-- Only collect necessary booking details.
-- Never ask for OTP, passwords, bank PIN, or full card number.
+    Prompts edited on different machines or pasted into bot_params can differ
+    only in CRLFs or trailing spaces, which is enough to miss OpenAI's prompt
+    cache. Normalizing keeps the bytes identical across deploys.
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
 
-ENDING:
-Close with:
-"Thank you for calling Info Diagnostic Center. We will confirm your appointment shortly. Have a good day."
-""".strip()
 
+def _prompt_crc32(text: str) -> str:
+    return format(zlib.crc32(text.encode("utf-8")), "08x")
+
+
+BASE_SYSTEM = _normalize_prompt(BASE_SYSTEM)
+CLINIC_TAIL = _normalize_prompt(CLINIC_TAIL)
+BASE_SYSTEM_CRC32 = _prompt_crc32(BASE_SYSTEM)
+CLINIC_TAIL_CRC32 = _prompt_crc32(CLINIC_TAIL)
+
+# Checksum of the shipped BASE_SYSTEM. Update it together with any deliberate
+# edit to the base prompt; a mismatch otherwise means the text was changed by
+# accident and every tenant's cached prefix is about to be invalidated.
+BASE_SYSTEM_PINNED_CRC32 = "ba97cdcf"
+if BASE_SYSTEM_CRC32 != BASE_SYSTEM_PINNED_CRC32:
+    logger.warning(
+        "BASE_SYSTEM changed: crc32={} expected={}", BASE_SYSTEM_CRC32, BASE_SYSTEM_PINNED_CRC32
+    )
+
+logger.debug(
+    "System prompt base_crc32={} tail_crc32={}", BASE_SYSTEM_CRC32, CLINIC_TAIL_CRC32
+)
+
+
+@lru_cache(maxsize=32)
+def _system_prefix(clinic_tail: str) -> tuple[tuple[str, str], ...]:
+    """Return the static system prefix for a clinic as (role, content) pairs.
+
+    BASE_SYSTEM always goes first as its own message, followed by the clinic
+    tail. The prefix never carries per-call identifiers, so OpenAI's automatic
+    prompt cache sees byte-identical leading tokens for every call, and the
+    BASE_SYSTEM part is shared even across tenants with different tails.
+    Overridden tails are memoized by value.
+    """
+    return (("system", BASE_SYSTEM), ("system", _normalize_prompt(clinic_tail)))
+
+
+@lru_cache(maxsize=32)
+def _prompt_cache_key(clinic_tail: str) -> str:
+    """Return the OpenAI prompt_cache_key for calls using this clinic tail.
+
+    Requests that share a key are routed to the same prompt cache, so every
+    call with the same system prefix lands where that prefix is already warm.
+    """
+    tail = _system_prefix(clinic_tail)[1][1]
+    return f"caredesk-{BASE_SYSTEM_CRC32}-{_prompt_crc32(tail)}"
+
+
+def _initial_messages(clinic_tail: str, greeting_message: str) -> list[dict]:
+    messages = [
+        {"role": role, "content": content}
+        for role, content in _system_prefix(clinic_tail)
+    ]
+    # Per-call turns are strictly appended after the cacheable prefix. The
+    # greeting is spoken verbatim, so it is recorded as the assistant's turn.
+    messages.append({"role": "assistant", "content": greeting_message})
+    return messages
+
+
+# Stock replies taken from the fixed answers in CLINIC_TAIL. A caller
+# turn that closely matches one of the phrasings is answered directly without
+# an LLM round trip. Only stateless answers belong here: anything that depends
+# on the booking in progress must go through the model.
+CANNED_REPLIES = (
+    (
+        (
+            "what departments do you have",
+            "which departments are available",
+            "what kind of doctors do you have",
+        ),
+        "We have Family Medicine, Internal Medicine, Cardiology, OB GYN, Pediatrics, "
+        "Dermatology, ENT, and Orthopedics. Which one would you like?",
+    ),
+    (
+        (
+            "are you a robot",
+            "are you a real person",
+            "am i talking to a computer",
+            "is this an ai",
+        ),
+        "I am a virtual receptionist assistant. How can I help you with your appointment?",
+    ),
+    (
+        (
+            "what is your address",
+            "where are you located",
+        ),
+        "I can take your number and have the clinic call you back with the details.",
+    ),
+)
+
+CANNED_REPLY_MIN_SIMILARITY = 0.8
+
+_TRANSCRIPT_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def _transcript_tokens(text: str) -> frozenset[str]:
+    return frozenset(_TRANSCRIPT_TOKEN_RE.findall(text.lower()))
+
+
+# Phrasings are tokenized once at import; a lookup only tokenizes the caller's
+# transcript and does set arithmetic against this flat index.
+_CANNED_REPLY_INDEX = tuple(
+    (_transcript_tokens(phrasing), reply)
+    for phrasings, reply in CANNED_REPLIES
+    for phrasing in phrasings
+)
+
+
+def _match_canned_reply(text: str) -> str | None:
+    tokens = _transcript_tokens(text)
+    if not tokens:
+        return None
+
+    best_reply = None
+    best_score = 0.0
+    for candidate, reply in _CANNED_REPLY_INDEX:
+        score = len(tokens & candidate) / len(tokens | candidate)
+        if score > best_score:
+            best_reply, best_score = reply, score
+
+    if best_score >= CANNED_REPLY_MIN_SIMILARITY:
+        return best_reply
+    return None
+
+
+class CannedReplyProcessor(FrameProcessor):
+    """Answers stock caller questions from CANNED_REPLIES, bypassing the LLM.
+
+    Sits between STT and the user context aggregator. On a hit the exchange is
+    written to the context so the model still sees it on the next turn, and the
+    reply is spoken straight through TTS.
+    """
+
+    def __init__(self, context: LLMContext):
+        super().__init__()
+        self._context = context
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, TranscriptionFrame):
+            reply = _match_canned_reply(frame.text)
+            if reply:
+                logger.debug("Canned reply for transcript: {}", frame.text)
+                self._context.add_message({"role": "user", "content": frame.text})
+                self._context.add_message({"role": "assistant", "content": reply})
+                await self.push_frame(TTSSpeakFrame(reply), direction)
+                return
+
+        await self.push_frame(frame, direction)
+
+
+# Emergency phrases from the EMERGENCY HANDLING rules in BASE_SYSTEM. These
+# are matched on the raw transcript so the urgent-care instruction is spoken
+# without waiting for an LLM round trip. Only present-tense, acute phrasings
+# are listed: callers booking tests routinely mention past events ("I had chest
+# pain last month"), and those must reach the model untouched.
+EMERGENCY_REPLY = (
+    "That sounds urgent. Please call 911 immediately or go to the nearest emergency room now. "
+    "I can also notify the clinic if you want."
+)
+_EMERGENCY_RE = re.compile(
+    r"\b(?:"
+    r"(?:i(?:'m| am) having|i have|i've got|i got|having)"
+    r"(?: (?:some|severe|bad|sharp|really|terrible))* chest pains?"
+    r"|(?:can'?t|cannot|can not) breathe"
+    r"|(?:i(?:'m| am)|he(?:'s| is)|she(?:'s| is)|they(?:'re| are)) bleeding (?:heavily|a lot|badly)"
+    r"|(?:i(?:'m| am) having|i have|there(?:'s| is)) heavy bleeding"
+    r"|(?:i(?:'m| am)|i feel|feeling) suicidal"
+    r"|(?:want|going|gonna) to (?:kill|hurt|harm) myself|end my life"
+    r"|(?:i(?:'m| am)|i've been) (?:hurting|harming|cutting) myself"
+    r"|(?:'s|'re|'m|is|are|am) having a stroke"
+    r"|just (?:collapsed|passed out|fainted|blacked out)"
+    r"|(?:'s|'re|is|are) (?:unconscious|unresponsive|not breathing|collapsing|passing out)"
+    r"|(?:'m|am) (?:about to )?(?:pass out|passing out|fainting|blacking out)"
+    r"|(?:can'?t|cannot|can not) wake (?:him|her|them) up"
+    r")\b",
+    re.IGNORECASE,
+)
+
+
+class EmergencyGuardProcessor(FrameProcessor):
+    """Speaks the emergency instruction as soon as a transcript mentions one.
+
+    Sits between STT and the user context aggregator, like
+    CannedReplyProcessor. The LLM is not called for that turn: the exchange is
+    written to the context so the model sees it on the next turn, for example
+    to notify the clinic if the caller asks.
+    """
+
+    def __init__(self, context: LLMContext):
+        super().__init__()
+        self._context = context
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, TranscriptionFrame) and _EMERGENCY_RE.search(frame.text):
+            logger.warning("Emergency phrase in transcript: {}", frame.text)
+            self._context.add_message({"role": "user", "content": frame.text})
+            self._context.add_message({"role": "assistant", "content": EMERGENCY_REPLY})
+            await self.push_frame(TTSSpeakFrame(EMERGENCY_REPLY), direction)
+            return
+
+        await self.push_frame(frame, direction)
 
 
 def _resolve_appointments_path() -> str:
@@ -288,46 +560,70 @@ def _cell_text(value: object | None) -> str:
     return str(value).strip()
 
 
+# The normalizers below are pure and see the same few phone numbers, dates
+# and times over and over while matching rows, so their results are cached.
+@lru_cache(maxsize=4096)
 def _safe_sheet_name(value: str) -> str:
     if not value:
         return ""
-    cleaned = re.sub(r"[\\/*?:\[\]]", "-", str(value)).strip()
+    cleaned = _SHEET_RE.sub("-", str(value)).strip()
     if not cleaned:
         return ""
     return cleaned[:31]
 
 
+@lru_cache(maxsize=4096)
 def _normalize_phone(value: str | None) -> str:
     if not value:
         return ""
-    return re.sub(r"\D", "", str(value))
+    return _PHONE_RE.sub("", str(value))
+
+
+def _date_from_shape(text: str) -> str | None:
+    match = _DATE_SHAPE_RE.fullmatch(text)
+    if not match:
+        return None
+
+    iso_year, iso_month, iso_day, first, _, second, year = match.groups()
+    if iso_year:
+        orders = ((int(iso_year), int(iso_month), int(iso_day)),)
+    else:
+        # Day-first is tried before month-first, so 03/05/2026 is 3 May.
+        orders = ((int(year), int(second), int(first)), (int(year), int(first), int(second)))
+
+    for y, m, d in orders:
+        if y >= 1 and 1 <= m <= 12 and 1 <= d <= calendar.monthrange(y, m)[1]:
+            return f"{y:04d}-{m:02d}-{d:02d}"
+    return None
 
 
-def _normalize_date(value: str | None) -> str:
+@lru_cache(maxsize=4096)
+def _parse_known_date(cleaned: str) -> str | None:
+    # The layout is read off the string's shape instead of trying strptime
+    # formats in turn, so no ValueError is raised for the ones that miss.
+    parsed = _date_from_shape(cleaned)
+    if parsed is not None:
+        return parsed
+
+    date_match = _DATE_RE.search(cleaned)
+    if date_match:
+        return _date_from_shape(date_match.group(1))
+    return None
+
+
+def _normalize_date(value: str | None, now: datetime | None = None) -> str:
     if not value:
         return ""
     cleaned = str(value).strip()
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y"):
-        try:
-            return datetime.strptime(cleaned, fmt).strftime("%Y-%m-%d")
-        except ValueError:
-            continue
-
-    date_match = re.search(
-        r"(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/-]\d{1,2}[/-]\d{2,4})", cleaned
-    )
-    if date_match:
-        candidate = date_match.group(1)
-        for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y"):
-            try:
-                return datetime.strptime(candidate, fmt).strftime("%Y-%m-%d")
-            except ValueError:
-                continue
+    parsed = _parse_known_date(cleaned)
+    if parsed is not None:
+        return parsed
 
+    # Not cached: dateutil fills missing fields from today's date.
     try:
         from dateutil import parser as _dtparser  # type: ignore
 
-        dt = _dtparser.parse(cleaned, fuzzy=True, default=datetime.now())
+        dt = _dtparser.parse(cleaned, fuzzy=True, default=now or datetime.now())
         if dt:
             return dt.strftime("%Y-%m-%d")
     except Exception:
@@ -341,18 +637,20 @@ def _use_single_appointments_sheet() -> bool:
     return mode not in {"per_date", "date", "dated"}
 
 
-def _appointments_sheet_name(preferred_date_norm: str, existing_norm: str) -> str:
+def _appointments_sheet_name(
+    preferred_date_norm: str, existing_norm: str, now: datetime | None = None
+) -> str:
     if _use_single_appointments_sheet():
         override = os.getenv("APPOINTMENTS_SHEET_NAME", DEFAULT_APPOINTMENTS_SHEET)
         cleaned = _safe_sheet_name(override)
         return cleaned or DEFAULT_APPOINTMENTS_SHEET
 
-    target_date = preferred_date_norm or _normalize_date(existing_norm)
-    if not target_date:
-        target_date = datetime.now().strftime("%Y-%m-%d")
-    return _safe_sheet_name(target_date) or datetime.now().strftime("%Y-%m-%d")
+    today = (now or datetime.now()).strftime("%Y-%m-%d")
+    target_date = preferred_date_norm or _normalize_date(existing_norm, now)
+    return _safe_sheet_name(target_date or today) or today
 
 
+@lru_cache(maxsize=4096)
 def _normalize_time_bucket(value: str | None) -> str:
     if not value:
         return ""
@@ -365,7 +663,7 @@ def _normalize_time_bucket(value: str | None) -> str:
     if any(k in text for k in ["evening", "night"]):
         return "evening"
 
-    m = re.search(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?", text)
+    m = _TIME_RE.search(text)
     if not m:
         return text
 
@@ -387,6 +685,9 @@ def _normalize_time_bucket(value: str | None) -> str:
     return f"{hour:02d}:{minute:02d}"
 
 
+# The matchers below compare a search value against a row's match keys (see
+# _row_keys), so each row is normalized once when the index is built rather
+# than on every update_appointment scan.
 def _phone_matches(search: str, candidate: str) -> bool:
     if not search:
         return True
@@ -401,65 +702,44 @@ def _phone_matches(search: str, candidate: str) -> bool:
     return False
 
 
-def _text_matches(search: str, candidate: str) -> bool:
-    if not search:
-        return True
-    if not candidate:
+def _text_matches(search_norm: str, candidate_norm: str) -> bool:
+    if not candidate_norm:
         return False
-    search_norm = search.strip().lower()
-    candidate_norm = candidate.strip().lower()
     return search_norm in candidate_norm or candidate_norm in search_norm
 
 
-def _date_matches(search: str, candidate: str) -> bool:
-    if not search:
-        return True
-    if not candidate:
-        return False
-
-    s_raw = _cell_text(search)
-    c_raw = _cell_text(candidate)
-
-    s_norm = _normalize_date(s_raw).strip().lower()
-    c_norm = _normalize_date(c_raw).strip().lower()
-
-    if s_norm == c_norm:
-        return True
-
-    if s_norm in c_norm or c_norm in s_norm:
-        return True
-
-    return False
+def _date_key(value: str | None, now: datetime | None = None) -> str:
+    return _normalize_date(_cell_text(value), now).strip().lower()
 
 
-def _time_matches(search: str, candidate: str) -> bool:
-    if not search:
-        return True
-    if not candidate:
-        return False
-
-    s_raw = _cell_text(search).lower()
-    c_raw = _cell_text(candidate).lower()
+def _date_matches(search_key: str, candidate_keys: tuple[str, ...]) -> bool:
+    return any(
+        search_key == key or search_key in key or key in search_key for key in candidate_keys
+    )
 
-    s_bucket = _normalize_time_bucket(s_raw)
-    c_bucket = _normalize_time_bucket(c_raw)
 
-    if s_bucket == c_bucket:
-        return True
+def _time_key(value: str | None) -> tuple[str, str]:
+    raw = _cell_text(value).lower()
+    return raw, _normalize_time_bucket(raw)
 
-    if s_raw in c_raw or c_raw in s_raw:
-        return True
 
-    return False
+def _time_matches(search_key: tuple[str, str], candidate_keys: tuple[tuple[str, str], ...]) -> bool:
+    s_raw, s_bucket = search_key
+    return any(
+        s_bucket == c_bucket or s_raw in c_raw or c_raw in s_raw
+        for c_raw, c_bucket in candidate_keys
+    )
 
 
-def _ensure_sheet_headers(sheet) -> dict[str, int]:
-    header_cells = [cell.value for cell in sheet[1]]
+def _ensure_sheet_headers(sheet) -> Mapping[str, int]:
+    # Only the header row is read, as plain values: no Cell objects are built
+    # for the data rows.
+    header_cells = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), (None,))
 
-    if sheet.max_row == 1 and sheet.max_column == 1 and header_cells[0] is None:
+    if sheet.max_row == 1 and len(header_cells) == 1 and header_cells[0] is None:
         for col_idx, name in enumerate(APPOINTMENTS_HEADERS, start=1):
             sheet.cell(row=1, column=col_idx).value = name
-        return {name: idx + 1 for idx, name in enumerate(APPOINTMENTS_HEADERS)}
+        return _HEADER_INDEX
 
     header_map: dict[str, int] = {}
     for idx, value in enumerate(header_cells, start=1):
@@ -477,7 +757,7 @@ def _ensure_sheet_headers(sheet) -> dict[str, int]:
     return header_map
 
 
-def _append_row_to_workbook(path: str, sheet_name: str, row: list[str]) -> None:
+def _append_row_to_workbook(path: str, sheet_name: str, row: list[str]) -> int:
     directory = os.path.dirname(path)
     if directory:
         os.makedirs(directory, exist_ok=True)
@@ -496,16 +776,737 @@ def _append_row_to_workbook(path: str, sheet_name: str, row: list[str]) -> None:
     _ensure_sheet_headers(sheet)
     sheet.append(row)
     workbook.save(path)
+    return sheet.max_row
+
+
+def _appointments_format() -> str:
+    value = os.getenv("APPOINTMENTS_FORMAT", "xlsx").strip().lower()
+    return "csv" if value == "csv" else "xlsx"
+
+
+def _appointments_engine() -> str:
+    # "native" swaps openpyxl for python-calamine when reading the log and for
+    # xlsxwriter when exporting it. openpyxl still does in-place edits, which
+    # neither of them supports.
+    value = os.getenv("APPOINTMENTS_ENGINE", "openpyxl").strip().lower()
+    return "native" if value == "native" else "openpyxl"
+
+
+def _csv_sheet_path(path: str, sheet_name: str) -> str:
+    return f"{os.path.splitext(path)[0]}.{sheet_name}.csv"
+
+
+def _csv_sheet_names(path: str) -> list[str]:
+    base = os.path.splitext(path)[0]
+    prefix_len = len(base) + 1
+    return sorted(
+        csv_path[prefix_len:-4] for csv_path in glob.glob(f"{glob.escape(base)}.*.csv")
+    )
+
+
+def _append_row_csv(path: str, sheet_name: str, row: list[str]) -> str:
+    """Append one appointment row to the sheet's CSV file.
+
+    Each sheet is its own file next to the configured workbook path, so an
+    append is a single write regardless of how many rows are already logged.
+    """
+    csv_path = _csv_sheet_path(path, sheet_name)
+    directory = os.path.dirname(csv_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(csv_path, "a", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        if handle.tell() == 0:
+            writer.writerow(APPOINTMENTS_HEADERS)
+        writer.writerow(row)
+    return csv_path
+
+
+def _load_csv_sheet(path: str, sheet_name: str) -> tuple[list[str], list[list[str]]]:
+    with open(_csv_sheet_path(path, sheet_name), newline="", encoding="utf-8") as handle:
+        rows = list(csv.reader(handle))
+    header = rows[0] if rows else []
+    if not _HEADER_SET.issubset(header):
+        present = set(header)
+        header += [name for name in APPOINTMENTS_HEADERS if name not in present]
+    return header, rows[1:]
+
+
+def _load_csv_sheets(path: str) -> dict[str, tuple[list[str], list[list[str]]]]:
+    return {sheet_name: _load_csv_sheet(path, sheet_name) for sheet_name in _csv_sheet_names(path)}
+
+
+def _write_csv_sheet(path: str, sheet_name: str, header: list[str], rows: list[list[str]]) -> None:
+    csv_path = _csv_sheet_path(path, sheet_name)
+    tmp_path = f"{csv_path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_path, csv_path)
+
+
+def export_appointments_xlsx(path: str | None = None) -> str:
+    """Build the appointments workbook from the per-sheet CSV logs.
+
+    Used with APPOINTMENTS_FORMAT=csv to produce the Excel file on demand. The
+    workbook is streamed in write-only mode and replaces any existing file.
+    With the default xlsx format the workbook is the log itself, so ValueError
+    is raised instead of overwriting it.
+    """
+    if _appointments_format() != "csv":
+        raise ValueError(
+            "APPOINTMENTS_FORMAT is xlsx: the workbook is already the appointments log, "
+            "so there is nothing to export. Set APPOINTMENTS_FORMAT=csv."
+        )
+
+    path = path or _resolve_appointments_path()
+    sheets = _load_csv_sheets(path) or {DEFAULT_APPOINTMENTS_SHEET: (APPOINTMENTS_HEADERS, [])}
+
+    if _appointments_engine() == "native":
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        for sheet_name, (header, rows) in sheets.items():
+            sheet = workbook.add_worksheet(sheet_name)
+            sheet.write_row(0, 0, header)
+            for row_idx, row in enumerate(rows, start=1):
+                sheet.write_row(row_idx, 0, row)
+        workbook.close()
+        return path
+
+    workbook = Workbook(write_only=True)
+    for sheet_name, (header, rows) in sheets.items():
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def _phone_key(phone_norm: str) -> str:
+    # _phone_matches only pairs numbers that are equal or share a suffix of at
+    # least seven digits, so matching numbers always share this key.
+    return phone_norm[-7:]
+
+
+def _appointments_signature(path: str, use_csv: bool) -> tuple | None:
+    try:
+        if use_csv:
+            files = []
+            for sheet_name in _csv_sheet_names(path):
+                stat = os.stat(_csv_sheet_path(path, sheet_name))
+                files.append((sheet_name, stat.st_mtime_ns, stat.st_size))
+            return (path, use_csv, tuple(files))
+        stat = os.stat(path)
+        return (path, use_csv, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
+
+def _row_reader(columns: list[str]):
+    """Return a function turning a sheet row into an AppointmentRow.
+
+    Column positions are resolved once per sheet, so sheets whose columns are
+    reordered or partly missing still map onto the right fields.
+    """
+    positions = [columns.index(name) if name in columns else None for name in APPOINTMENTS_HEADERS]
+
+    def read(values) -> AppointmentRow:
+        width = len(values)
+        return AppointmentRow._make(
+            values[pos] if pos is not None and pos < width else None for pos in positions
+        )
+
+    return read
+
+
+# Normalized values of one row, precomputed for matching: whether the row is
+# blank, its phone digits, its lowercased name, and the keys of its preferred
+# and existing appointment dates and times (empty cells are left out).
+_RowKeys = namedtuple("_RowKeys", ["blank", "phone", "name", "dates", "times"])
+
+
+def _row_keys(row: AppointmentRow, now: datetime | None = None) -> _RowKeys:
+    slots = (row.preferred_date, row.existing_appointment)
+    times = (row.preferred_time, row.existing_appointment)
+    return _RowKeys(
+        blank=all(value in (None, "") for value in row),
+        phone=_normalize_phone(_cell_text(row.phone)),
+        name=_cell_text(row.patient_name).lower(),
+        dates=tuple(_date_key(value, now) for value in slots if _cell_text(value)),
+        times=tuple(_time_key(value) for value in times if _cell_text(value)),
+    )
+
+
+class _AppointmentIndex:
+    """In-memory copy of the appointment log rows, bucketed by phone number.
+
+    Built with one read-only pass over the log and then kept current by the
+    appointment tools as they write. The log's mtime and size are recorded
+    after every sync, so a file edited by hand is picked up and re-read on
+    the next lookup. Callers must hold _appointments_file_lock for the log.
+    """
+
+    def __init__(self):
+        self.signature = None
+        # Entries are [sheet_name, row_idx, AppointmentRow, _RowKeys] lists
+        # shared by both views, so an in-place update only has to swap the
+        # last two items.
+        self.rows: list[list] = []
+        self.by_phone: dict[str, list[list]] = {}
+        self.sheet_rows: dict[str, int] = {}
+
+    def is_current(self, path: str, use_csv: bool) -> bool:
+        return self.signature is not None and self.signature == _appointments_signature(
+            path, use_csv
+        )
+
+    def invalidate(self) -> None:
+        self.signature = None
+
+    def mark_synced(self, path: str, use_csv: bool) -> None:
+        self.signature = _appointments_signature(path, use_csv)
+
+    def sync(self, path: str, use_csv: bool) -> None:
+        if self.is_current(path, use_csv):
+            return
+
+        self.rows = []
+        self.by_phone = {}
+        self.sheet_rows = {}
+        now = datetime.now()
+        if use_csv:
+            for sheet_name, (header, rows) in _load_csv_sheets(path).items():
+                self._add_sheet(sheet_name, header, rows, now)
+        elif _appointments_engine() == "native":
+            from python_calamine import CalamineWorkbook
+
+            workbook = CalamineWorkbook.from_path(path)
+            for sheet_name in workbook.sheet_names:
+                rows = iter(workbook.get_sheet_by_name(sheet_name).to_python())
+                self._add_sheet(sheet_name, [_cell_text(v) for v in next(rows, ())], rows, now)
+        else:
+            workbook = load_workbook(path, read_only=True, data_only=True)
+            try:
+                for sheet_name in workbook.sheetnames:
+                    rows = workbook[sheet_name].iter_rows(values_only=True)
+                    self._add_sheet(sheet_name, [_cell_text(v) for v in next(rows, ())], rows, now)
+            finally:
+                workbook.close()
+        self.mark_synced(path, use_csv)
+
+    def _add_sheet(self, sheet_name: str, columns: list[str], rows, now: datetime) -> None:
+        read = _row_reader(columns)
+        self.sheet_rows[sheet_name] = 0
+        for row_idx, values in enumerate(rows, start=2):
+            self.add(sheet_name, row_idx, read(values), now)
+
+    def add(
+        self, sheet_name: str, row_idx: int, row: AppointmentRow, now: datetime | None = None
+    ) -> None:
+        keys = _row_keys(row, now)
+        entry = [sheet_name, row_idx, row, keys]
+        self.rows.append(entry)
+        self.by_phone.setdefault(_phone_key(keys.phone), []).append(entry)
+        self.sheet_rows[sheet_name] = max(self.sheet_rows.get(sheet_name, 0), row_idx - 1)
+
+    def lookup(self, phone_norm: str) -> list[list]:
+        if not phone_norm:
+            return self.rows
+        return self.by_phone.get(_phone_key(phone_norm), [])
+
+
+# Locks and indexes are kept per log path, so calls writing to different logs
+# never wait on each other.
+_LOCKS_GUARD = threading.Lock()
+_FILE_LOCKS: dict[str, threading.Lock] = {}
+_ASYNC_FILE_LOCKS: dict[str, asyncio.Lock] = {}
+_APPT_INDEXES: dict[str, _AppointmentIndex] = {}
+
+
+def _async_lock_for(path: str) -> asyncio.Lock:
+    # Only touched from the event loop thread, so no guard is needed.
+    lock = _ASYNC_FILE_LOCKS.get(path)
+    if lock is None:
+        lock = _ASYNC_FILE_LOCKS[path] = asyncio.Lock()
+    return lock
+
+
+def _appointment_index(path: str) -> _AppointmentIndex:
+    with _LOCKS_GUARD:
+        index = _APPT_INDEXES.get(path)
+        if index is None:
+            index = _APPT_INDEXES[path] = _AppointmentIndex()
+        return index
+
+
+@contextmanager
+def _appointments_file_lock(path: str):
+    """Hold the log at ``path`` exclusively, across threads and processes.
+
+    Other processes are excluded with an OS lock on a ``.lock`` file next to
+    the log; the log itself is replaced on save, so it cannot carry the lock.
+    """
+    with _LOCKS_GUARD:
+        thread_lock = _FILE_LOCKS.setdefault(path, threading.Lock())
+
+    with thread_lock:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{path}.lock", "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                yield
+                return
+
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# The appointment tools run openpyxl/CSV work in a worker thread so a slow save
+# never stalls the audio pipeline. Both hold _appointments_file_lock, which
+# keeps the read-modify-write of the log atomic across threads and processes.
+def _log_appointment_sync(
+    action: str,
+    patient_name: str | None = None,
+    patient_age_or_dob: str | None = None,
+    phone: str | None = None,
+    department_or_doctor: str | None = None,
+    reason: str | None = None,
+    preferred_date: str | None = None,
+    preferred_time: str | None = None,
+    visit_type: str | None = None,
+    existing_appointment: str | None = None,
+    notes: str | None = None,
+) -> dict:
+    # One clock reading serves the timestamp, the sheet name and any date
+    # parsing for this call.
+    now = datetime.now()
+    preferred_date_norm = _normalize_date(preferred_date, now)
+    existing_norm = _cell_text(existing_appointment)
+    phone_norm = _normalize_phone(phone)
+
+    sheet_name = _appointments_sheet_name(preferred_date_norm, existing_norm, now)
+    workbook_path = _resolve_appointments_path()
+    use_csv = _appointments_format() == "csv"
+    log_path = _csv_sheet_path(workbook_path, sheet_name) if use_csv else workbook_path
+
+    row = [
+        now.strftime("%Y-%m-%d %H:%M:%S"),
+        _cell_text(action),
+        _cell_text(patient_name),
+        _cell_text(patient_age_or_dob),
+        phone_norm or _cell_text(phone),
+        _cell_text(department_or_doctor),
+        _cell_text(reason),
+        preferred_date_norm or _cell_text(preferred_date),
+        _cell_text(preferred_time),
+        _cell_text(visit_type),
+        existing_norm,
+        _cell_text(notes),
+    ]
+
+    try:
+        with _appointments_file_lock(workbook_path):
+            index = _appointment_index(workbook_path)
+            index_current = index.is_current(workbook_path, use_csv)
+            if use_csv:
+                _append_row_csv(workbook_path, sheet_name, row)
+                row_idx = index.sheet_rows.get(sheet_name, 0) + 2
+            else:
+                row_idx = _append_row_to_workbook(workbook_path, sheet_name, row)
+            if index_current:
+                index.add(sheet_name, row_idx, AppointmentRow._make(row), now)
+                index.mark_synced(workbook_path, use_csv)
+    except PermissionError as exc:
+        logger.exception("Appointment log write blocked (file locked): {}", log_path)
+        return {"status": "error", "reason": "file_locked", "path": log_path}
+    except Exception as exc:
+        logger.exception("Appointment log write failed: {}", log_path)
+        return {"status": "error", "reason": "write_failed", "path": log_path}
+
+    return {"status": "logged", "path": log_path, "sheet": sheet_name}
+
+
+def _update_appointment_sync(
+    action: str,
+    search_name: str | None = None,
+    search_phone: str | None = None,
+    search_date: str | None = None,
+    search_time: str | None = None,
+    patient_name: str | None = None,
+    patient_age_or_dob: str | None = None,
+    phone: str | None = None,
+    department_or_doctor: str | None = None,
+    reason: str | None = None,
+    preferred_date: str | None = None,
+    preferred_time: str | None = None,
+    visit_type: str | None = None,
+    existing_appointment: str | None = None,
+    notes: str | None = None,
+) -> dict:
+    if not search_name and patient_name:
+        search_name = patient_name
+    if not search_phone and phone:
+        search_phone = phone
+
+    if not any([search_name, search_phone, search_date, search_time]):
+        return {"status": "missing_search"}
+
+    log_path = _resolve_appointments_path()
+    use_csv = _appointments_format() == "csv"
+    if not (_csv_sheet_names(log_path) if use_csv else os.path.exists(log_path)):
+        return {"status": "not_found", "reason": "missing_workbook"}
+
+    now = datetime.now()
+    search_phone_norm = _normalize_phone(search_phone)
+    search_date_norm = _normalize_date(search_date, now)
+    if _use_single_appointments_sheet():
+        sheet_hint = _appointments_sheet_name(search_date_norm, "", now)
+    else:
+        sheet_hint = _safe_sheet_name(search_date_norm) if search_date_norm else ""
+
+    # Search values are normalized once here; rows carry theirs in _RowKeys.
+    search_name_norm = _cell_text(search_name).lower()
+    search_date_key = _date_key(search_date, now)
+    search_time_key = _time_key(search_time)
+
+    action_value = _cell_text(action)
+    preferred_date_norm = _normalize_date(preferred_date, now)
+
+    with _appointments_file_lock(log_path):
+        index = _appointment_index(log_path)
+        index.sync(log_path, use_csv)
+
+        # With a date or time in the search only the first match is used, so
+        # the scan can stop there unless a match on the hinted sheet, which
+        # would be preferred, may still follow.
+        stop_at_first = bool(search_date or search_time)
+
+        # Only the fields present in the search are checked, each as a filter
+        # stage over the phone bucket. The phone is the most selective field,
+        # so it goes first.
+        checks = []
+        if search_phone_norm:
+            checks.append(lambda entry: _phone_matches(search_phone_norm, entry[3].phone))
+        checks.append(lambda entry: not entry[3].blank)
+        if search_name:
+            checks.append(lambda entry: _text_matches(search_name_norm, entry[3].name))
+        if search_date:
+            checks.append(lambda entry: _date_matches(search_date_key, entry[3].dates))
+        if search_time:
+            checks.append(lambda entry: _time_matches(search_time_key, entry[3].times))
+
+        matches = index.lookup(search_phone_norm)
+        for check in checks:
+            matches = filter(check, matches)
+
+        candidates = []
+        for entry in matches:
+            candidates.append(entry)
+            if stop_at_first and (not sheet_hint or entry[0] == sheet_hint):
+                break
+
+        # Rows on the hinted sheet are preferred; the sort is stable, so file
+        # order is kept within each group.
+        if sheet_hint:
+            candidates.sort(key=lambda candidate: candidate[0] != sheet_hint)
+
+        if not candidates:
+            return {"status": "not_found"}
+
+        if len(candidates) > 1 and (not search_date and not search_time):
+            return {
+                "status": "multiple_matches",
+                "matches": [
+                    {
+                        "sheet": s,
+                        "row": r,
+                        "patient_name": _cell_text(v.patient_name),
+                        "phone": _cell_text(v.phone),
+                        "preferred_date": _cell_text(v.preferred_date),
+                        "preferred_time": _cell_text(v.preferred_time),
+                        "existing_appointment": _cell_text(v.existing_appointment),
+                    }
+                    for (s, r, v, _) in candidates[:10]
+                ],
+            }
+
+        entry = candidates[0]
+        sheet_name, row_idx, row, _ = entry
+
+        updated_values = dict(zip(APPOINTMENTS_HEADERS, row))
+        updated_values["Action"] = action_value
+
+        if not existing_appointment and action_value.lower().startswith("resched"):
+            if not _cell_text(row.existing_appointment):
+                snapshot_parts = [
+                    _cell_text(row.preferred_date),
+                    _cell_text(row.preferred_time),
+                ]
+                snapshot = " ".join([p for p in snapshot_parts if p])
+                if snapshot:
+                    existing_appointment = snapshot
+
+        if patient_name:
+            updated_values["Patient Name"] = patient_name
+        if patient_age_or_dob:
+            updated_values["Patient Age or DOB"] = patient_age_or_dob
+        if phone:
+            updated_values["Phone"] = _normalize_phone(phone) or phone
+        if department_or_doctor:
+            updated_values["Department or Doctor"] = department_or_doctor
+        if reason:
+            updated_values["Reason"] = reason
+        if preferred_date:
+            updated_values["Preferred Date"] = preferred_date_norm or preferred_date
+        if preferred_time:
+            updated_values["Preferred Time"] = preferred_time
+        if visit_type:
+            updated_values["Visit Type"] = visit_type
+        if existing_appointment:
+            updated_values["Existing Appointment"] = existing_appointment
+        if notes:
+            updated_values["Notes"] = notes
+
+        new_sheet_name = sheet_name
+        moved = False
+
+        if not _use_single_appointments_sheet():
+            if preferred_date and action_value.lower().startswith("resched"):
+                new_sheet_name = _safe_sheet_name(preferred_date_norm) or sheet_name
+
+        # The search above ran on the index, which is read in read-only mode.
+        # The log is only opened for writing now that one row has been picked,
+        # and only the sheet holding that row is read back in CSV mode.
+        if use_csv:
+            header, rows = _load_csv_sheet(log_path, sheet_name)
+            if new_sheet_name != sheet_name:
+                del rows[row_idx - 2]
+                _write_csv_sheet(log_path, sheet_name, header, rows)
+                target_row = [updated_values.get(header, "") for header in APPOINTMENTS_HEADERS]
+                _append_row_csv(log_path, new_sheet_name, target_row)
+                moved = True
+            else:
+                # Start from the stored row so columns added by hand survive.
+                updated_row = list(rows[row_idx - 2])
+                updated_row += [""] * (len(header) - len(updated_row))
+                for col_idx, column in enumerate(header):
+                    if column in _HEADER_SET and column != "Logged At":
+                        updated_row[col_idx] = _cell_text(updated_values.get(column))
+                rows[row_idx - 2] = updated_row
+                _write_csv_sheet(log_path, sheet_name, header, rows)
+            result_path = _csv_sheet_path(log_path, new_sheet_name)
+        else:
+            workbook = load_workbook(log_path)
+            sheet = workbook[sheet_name]
+            if new_sheet_name != sheet_name:
+                target_sheet = (
+                    workbook[new_sheet_name]
+                    if new_sheet_name in workbook.sheetnames
+                    else workbook.create_sheet(new_sheet_name)
+                )
+                _ensure_sheet_headers(target_sheet)
+                target_row = [updated_values.get(header, "") for header in APPOINTMENTS_HEADERS]
+                target_sheet.append(target_row)
+                sheet.delete_rows(row_idx, 1)
+                moved = True
+            else:
+                # Only an in-place edit needs the source sheet's columns. The
+                # row keeps its position, and only the cells whose value
+                # changed are written.
+                header_map = _ensure_sheet_headers(sheet)
+                for header, old_value in zip(APPOINTMENTS_HEADERS, row):
+                    value = updated_values[header]
+                    if header == "Logged At" or value is None or value == old_value:
+                        continue
+                    sheet.cell(row=row_idx, column=header_map[header]).value = value
+
+            workbook.save(log_path)
+            result_path = log_path
+
+        # Moving a row shifts the ones below it, and a new phone number changes
+        # its bucket; both are rare enough to simply re-read the log next time.
+        if moved or _normalize_phone(_cell_text(updated_values.get("Phone"))) != _normalize_phone(
+            _cell_text(row.phone)
+        ):
+            index.invalidate()
+        else:
+            entry[2] = AppointmentRow._make(updated_values[header] for header in APPOINTMENTS_HEADERS)
+            entry[3] = _row_keys(entry[2], now)
+            index.mark_synced(log_path, use_csv)
+
+        return {"status": "updated", "path": result_path, "sheet": new_sheet_name, "moved": moved}
+
+
+# Conversation contexts of recently disconnected calls, keyed by call_sid. A
+# caller who drops and reconnects within the TTL resumes the same context, so
+# the history is kept and the request prefix OpenAI has cached still matches.
+CONTEXT_STORE_MAX_ENTRIES = 1024
+CONTEXT_STORE_TTL_SECS = 600.0
+_CONTEXT_STORE: "OrderedDict[str, tuple[float, LLMContext]]" = OrderedDict()
+
+
+def _take_stored_context(call_sid: str | None) -> LLMContext | None:
+    if not call_sid:
+        return None
+    entry = _CONTEXT_STORE.pop(call_sid, None)
+    if entry is None:
+        return None
+    stored_at, context = entry
+    if time.monotonic() - stored_at > CONTEXT_STORE_TTL_SECS:
+        return None
+    return context
+
+
+def _store_context(call_sid: str | None, context: LLMContext) -> None:
+    if not call_sid:
+        return
+    _CONTEXT_STORE[call_sid] = (time.monotonic(), context)
+    _CONTEXT_STORE.move_to_end(call_sid)
+    while len(_CONTEXT_STORE) > CONTEXT_STORE_MAX_ENTRIES:
+        _CONTEXT_STORE.popitem(last=False)
+
+
+# bot_params key -> run_bot setting. The NextGenSwitch keys are accepted with
+# both the historical "nexgenswitch" spelling and the correct one; later
+# entries win when a payload carries both.
+_PARAM_BINDINGS = (
+    ("prompt", "clinic_tail"),
+    ("greetings", "greeting_message"),
+    ("openai_api_key", "openai_api_key"),
+    ("deepgram_api_key", "deepgram_api_key"),
+    ("cartesia_api_key", "cartesia_api_key"),
+    ("cartesia_voice_id", "cartesia_voice_id"),
+    ("nexgenswitch_api_url", "base_url"),
+    ("nextgenswitch_api_url", "base_url"),
+    ("nexgenswitch_api_key", "api_key"),
+    ("nextgenswitch_api_key", "api_key"),
+    ("nextgenswitch_api_secret", "api_secret"),
+)
+
+
+# Transport and service modules are imported on first use: a process that only
+# serves websocket calls never loads aiortc, and vice versa. The helpers are
+# cached so later calls skip the import machinery entirely.
+@lru_cache(maxsize=None)
+def _import_webrtc_transport():
+    from pipecat.transports.smallwebrtc.transport import SmallWebRTCTransport
 
+    return SmallWebRTCTransport
 
-def _build_webrtc_transport(webrtc_connection: object) -> SmallWebRTCTransport:
+
+@lru_cache(maxsize=None)
+def _import_websocket_transport():
+    from pipecat.transports.websocket.fastapi import (
+        FastAPIWebsocketParams,
+        FastAPIWebsocketTransport,
+    )
+
+    from nextgenswitch_serializer import NextGenSwitchFrameSerializer
+
+    return FastAPIWebsocketTransport, FastAPIWebsocketParams, NextGenSwitchFrameSerializer
+
+
+# One AsyncOpenAI client (and its keep-alive httpx pool) per credential set,
+# shared by every call in the process so only the first call pays for the
+# TCP and TLS handshakes.
+OPENAI_KEEPALIVE_CONNECTIONS = 64
+OPENAI_KEEPALIVE_EXPIRY_SECS = 300.0
+
+_OPENAI_CLIENTS: dict[tuple, object] = {}
+
+
+def _shared_openai_client(api_key, base_url, organization, project, default_headers):
+    key = (api_key, base_url, organization, project)
+    client = _OPENAI_CLIENTS.get(key)
+    if client is None:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            organization=organization,
+            project=project,
+            default_headers=default_headers,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SECS,
+                ),
+            ),
+        )
+        _OPENAI_CLIENTS[key] = client
+    return client
+
+
+async def close_shared_clients() -> None:
+    """Close the pooled OpenAI clients and their keep-alive connections.
+
+    Meant for server shutdown. The Deepgram STT and TTS services each stream
+    over their own per-call websocket, so they have no pool to close.
+    """
+    clients = list(_OPENAI_CLIENTS.values())
+    _OPENAI_CLIENTS.clear()
+    for client in clients:
+        await client.close()
+
+
+@lru_cache(maxsize=None)
+def _import_services():
+    from deepgram import LiveOptions
+    from pipecat.services.deepgram.stt import DeepgramSTTService
+    from pipecat.services.deepgram.tts import DeepgramTTSService
+    from pipecat.services.openai.llm import OpenAILLMService
+
+    class PooledOpenAILLMService(OpenAILLMService):
+        """OpenAI LLM service that reuses the process-wide client for its key."""
+
+        def create_client(
+            self,
+            api_key=None,
+            base_url=None,
+            organization=None,
+            project=None,
+            default_headers=None,
+            **kwargs,
+        ):
+            return _shared_openai_client(
+                api_key, base_url, organization, project, default_headers
+            )
+
+    return LiveOptions, DeepgramSTTService, DeepgramTTSService, PooledOpenAILLMService
+
+
+def prewarm_services() -> None:
+    """Import the STT, TTS and LLM service modules ahead of the first call.
+
+    The service instances themselves are built per call: pipecat processors
+    are linked into one pipeline and torn down with it, so they cannot be
+    pooled. The Silero session and the OpenAI HTTP client are already shared.
+    """
+    _import_services()
+
+
+def _build_webrtc_transport(webrtc_connection: object):
+    SmallWebRTCTransport = _import_webrtc_transport()
     return SmallWebRTCTransport(
         webrtc_connection=webrtc_connection,
         params=TransportParams(
             audio_in_enabled=True,
             audio_out_enabled=True,
-            vad_analyzer=SileroVADAnalyzer(),
-            audio_out_10ms_chunks=2,
+            vad_analyzer=SharedSileroVADAnalyzer(),
+            audio_out_10ms_chunks=1,
         ),
     )
 
@@ -513,7 +1514,13 @@ def _build_webrtc_transport(webrtc_connection: object) -> SmallWebRTCTransport:
 def _build_websocket_transport(
     websocket: object,
     stream_id: str | None = None,
-) -> FastAPIWebsocketTransport:
+):
+    (
+        FastAPIWebsocketTransport,
+        FastAPIWebsocketParams,
+        NextGenSwitchFrameSerializer,
+    ) = _import_websocket_transport()
+
     serializer = NextGenSwitchFrameSerializer()
     if stream_id:
         serializer.set_stream_id(stream_id)
@@ -524,12 +1531,25 @@ def _build_websocket_transport(
             audio_in_enabled=True,
             audio_out_enabled=True,
             add_wav_header=False,
-            vad_analyzer=SileroVADAnalyzer(),
+            vad_analyzer=SharedSileroVADAnalyzer(),
             serializer=serializer,
         ),
     )
 
 
+async def run_bot_webrtc(webrtc_connection, bot_params=None):
+    transport = _build_webrtc_transport(webrtc_connection)
+    close_callback = getattr(webrtc_connection, "disconnect", None) or getattr(
+        webrtc_connection, "close", None
+    )
+    await _run_pipeline(transport, close_callback, call_sid=None, bot_params=bot_params)
+
+
+async def run_bot_websocket(websocket, stream_id=None, call_sid=None, bot_params=None):
+    transport = _build_websocket_transport(websocket, stream_id=stream_id)
+    await _run_pipeline(transport, websocket.close, call_sid=call_sid, bot_params=bot_params)
+
+
 async def run_bot(
     webrtc_connection=None,
     websocket=None,
@@ -537,58 +1557,49 @@ async def run_bot(
     call_sid=None,
     bot_params=None,
 ):
+    """Back-compat entry point; dispatches to run_bot_webrtc or run_bot_websocket."""
     if webrtc_connection and websocket:
         raise ValueError("Provide either webrtc_connection or websocket, not both.")
-    if not webrtc_connection and not websocket:
-        raise ValueError("No transport input provided to run_bot.")
-
-    transport = (
-        _build_webrtc_transport(webrtc_connection)
-        if webrtc_connection
-        else _build_websocket_transport(websocket, stream_id=stream_id)
-    )
-
-    close_callback = None
     if webrtc_connection:
-        if hasattr(webrtc_connection, "disconnect"):
-            close_callback = webrtc_connection.disconnect
-        elif hasattr(webrtc_connection, "close"):
-            close_callback = webrtc_connection.close
+        await run_bot_webrtc(webrtc_connection, bot_params=bot_params)
     elif websocket:
-        close_callback = websocket.close
+        await run_bot_websocket(
+            websocket, stream_id=stream_id, call_sid=call_sid, bot_params=bot_params
+        )
+    else:
+        raise ValueError("No transport input provided to run_bot.")
 
-    system_instruction = SYSTEM_INSTRUCTION
-    greeting_instruction = GREETING_INSTRUCTION
 
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    deepgram_api_key = os.getenv("DEEPGRAM_API_KEY")
-    cartesia_api_key = os.getenv("CARTESIA_API_KEY")
-    cartesia_voice_id = os.getenv(
-        "CARTESIA_VOICE_ID", "5ee9feff-1265-424a-9d7f-8e4d431a12c7"
-    )
+async def _run_pipeline(transport, close_callback, call_sid=None, bot_params=None):
+    call_logger = logger.bind(call_sid=call_sid)
 
-    base_url = os.getenv("NEXTGENSWITCH_URL")
-    api_key = os.getenv("NEXTGENSWITCH_API_KEY")
-    api_secret = os.getenv("NEXTGENSWITCH_API_SECRET")
-
-    if bot_params and "prompt" in bot_params:
-        system_instruction = bot_params["prompt"]
-    if bot_params and "openai_api_key" in bot_params:
-        openai_api_key = bot_params["openai_api_key"]
-    if bot_params and "greetings" in bot_params:
-        greeting_instruction = bot_params["greetings"]
-    if bot_params and "nexgenswitch_api_url" in bot_params:
-        base_url = bot_params["nexgenswitch_api_url"]
-    if bot_params and "nexgenswitch_api_key" in bot_params:
-        api_key = bot_params["nexgenswitch_api_key"]
-    if bot_params and "nextgenswitch_api_secret" in bot_params:
-        api_secret = bot_params["nextgenswitch_api_secret"]
-    if bot_params and "deepgram_api_key" in bot_params:
-        deepgram_api_key = bot_params["deepgram_api_key"]
-    if bot_params and "cartesia_api_key" in bot_params:
-        cartesia_api_key = bot_params["cartesia_api_key"]
-    if bot_params and "cartesia_voice_id" in bot_params:
-        cartesia_voice_id = bot_params["cartesia_voice_id"]
+    config = {
+        "clinic_tail": CLINIC_TAIL,
+        "greeting_message": GREETING_MESSAGE,
+        "openai_api_key": os.getenv("OPENAI_API_KEY"),
+        "deepgram_api_key": os.getenv("DEEPGRAM_API_KEY"),
+        "cartesia_api_key": os.getenv("CARTESIA_API_KEY"),
+        "cartesia_voice_id": os.getenv(
+            "CARTESIA_VOICE_ID", "5ee9feff-1265-424a-9d7f-8e4d431a12c7"
+        ),
+        "base_url": os.getenv("NEXTGENSWITCH_URL"),
+        "api_key": os.getenv("NEXTGENSWITCH_API_KEY"),
+        "api_secret": os.getenv("NEXTGENSWITCH_API_SECRET"),
+    }
+    if bot_params:
+        config.update(
+            {dst: bot_params[src] for src, dst in _PARAM_BINDINGS if src in bot_params}
+        )
+
+    clinic_tail = config["clinic_tail"]
+    greeting_message = config["greeting_message"]
+    openai_api_key = config["openai_api_key"]
+    deepgram_api_key = config["deepgram_api_key"]
+    cartesia_api_key = config["cartesia_api_key"]
+    cartesia_voice_id = config["cartesia_voice_id"]
+    base_url = config["base_url"]
+    api_key = config["api_key"]
+    api_secret = config["api_secret"]
 
     if not openai_api_key:
         raise ValueError("Missing OPENAI_API_KEY (env or bot_params.openai_api_key)")
@@ -597,19 +1608,30 @@ async def run_bot(
     if not cartesia_api_key:
         raise ValueError("Missing CARTESIA_API_KEY (env or bot_params.cartesia_api_key)")
 
-    stt = DeepgramSTTService(api_key=deepgram_api_key)
+    LiveOptions, DeepgramSTTService, DeepgramTTSService, OpenAILLMService = _import_services()
+
+    stt = DeepgramSTTService(
+        api_key=deepgram_api_key,
+        live_options=LiveOptions(
+            endpointing=DEEPGRAM_ENDPOINTING_MS,
+            utterance_end_ms=DEEPGRAM_UTTERANCE_END_MS,
+            interim_results=True,
+        ),
+    )
     # tts = CartesiaTTSService(api_key=cartesia_api_key, voice_id=cartesia_voice_id)
     tts = DeepgramTTSService(api_key=deepgram_api_key, voice="aura-2-athena-en")
 
-    async def close_session(params: FunctionCallParams) -> dict:
-        logger.info("Closing transport session")
+    async def close_session(params: FunctionCallParams) -> MappingProxyType:
+        call_logger.info("Closing transport session")
         if close_callback:
             await close_callback()
         else:
             logger.warning("No close callback available for this session")
-        logger.info("Transport session closed")
-        return {"status": "closed"}
+        call_logger.info("Transport session closed")
+        return _CLOSE_RESULT
 
+    # The tool results are small dicts of str, int and bool values only, so
+    # pipecat can encode them for the context without a custom JSON default.
     async def log_appointment(
         params: FunctionCallParams,
         action: str,
@@ -624,43 +1646,21 @@ async def run_bot(
         existing_appointment: str | None = None,
         notes: str | None = None,
     ) -> dict:
-        preferred_date_norm = _normalize_date(preferred_date)
-        existing_norm = _cell_text(existing_appointment)
-        phone_norm = _normalize_phone(phone)
-
-        sheet_name = _appointments_sheet_name(preferred_date_norm, existing_norm)
-        log_path = _resolve_appointments_path()
-
-        row = [
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            _cell_text(action),
-            _cell_text(patient_name),
-            _cell_text(patient_age_or_dob),
-            phone_norm or _cell_text(phone),
-            _cell_text(department_or_doctor),
-            _cell_text(reason),
-            preferred_date_norm or _cell_text(preferred_date),
-            _cell_text(preferred_time),
-            _cell_text(visit_type),
-            existing_norm,
-            _cell_text(notes),
-        ]
-
-        try:
-            with APPOINTMENT_LOG_LOCK:
-                _append_row_to_workbook(log_path, sheet_name, row)
-        except PermissionError as exc:
-            logger.exception("Appointment log write blocked (file locked): {}", log_path)
-            result = {"status": "error", "reason": "file_locked", "path": log_path}
-            await params.result_callback(result)
-            return result
-        except Exception as exc:
-            logger.exception("Appointment log write failed: {}", log_path)
-            result = {"status": "error", "reason": "write_failed", "path": log_path}
-            await params.result_callback(result)
-            return result
-
-        result = {"status": "logged", "path": log_path, "sheet": sheet_name}
+        async with _async_lock_for(_resolve_appointments_path()):
+            result = await asyncio.to_thread(
+                _log_appointment_sync,
+                action,
+                patient_name=patient_name,
+                patient_age_or_dob=patient_age_or_dob,
+                phone=phone,
+                department_or_doctor=department_or_doctor,
+                reason=reason,
+                preferred_date=preferred_date,
+                preferred_time=preferred_time,
+                visit_type=visit_type,
+                existing_appointment=existing_appointment,
+                notes=notes,
+            )
         await params.result_callback(result)
         return result
 
@@ -682,171 +1682,28 @@ async def run_bot(
         existing_appointment: str | None = None,
         notes: str | None = None,
     ) -> dict:
-        if not search_name and patient_name:
-            search_name = patient_name
-        if not search_phone and phone:
-            search_phone = phone
-
-        if not any([search_name, search_phone, search_date, search_time]):
-            result = {"status": "missing_search"}
-            await params.result_callback(result)
-            return result
-
-        log_path = _resolve_appointments_path()
-        if not os.path.exists(log_path):
-            result = {"status": "not_found", "reason": "missing_workbook"}
-            await params.result_callback(result)
-            return result
-
-        search_phone_norm = _normalize_phone(search_phone)
-        search_date_norm = _normalize_date(search_date)
-        if _use_single_appointments_sheet():
-            sheet_hint = _appointments_sheet_name(search_date_norm, "")
-        else:
-            sheet_hint = _safe_sheet_name(search_date_norm) if search_date_norm else ""
-
-        action_value = _cell_text(action)
-        preferred_date_norm = _normalize_date(preferred_date)
-
-        with APPOINTMENT_LOG_LOCK:
-            workbook = load_workbook(log_path)
-
-            if sheet_hint and sheet_hint in workbook.sheetnames:
-                sheet_names = [sheet_hint] + [s for s in workbook.sheetnames if s != sheet_hint]
-            else:
-                sheet_names = workbook.sheetnames
-
-            candidates = []
-            for sheet_name in sheet_names:
-                sheet = workbook[sheet_name]
-                header_map = _ensure_sheet_headers(sheet)
-
-                for row_idx in range(2, sheet.max_row + 1):
-                    row_values = {
-                        header: sheet.cell(row=row_idx, column=col_idx).value
-                        for header, col_idx in header_map.items()
-                    }
-
-                    if not any(value not in (None, "") for value in row_values.values()):
-                        continue
-
-                    row_name = _cell_text(row_values.get("Patient Name"))
-                    row_phone = _normalize_phone(_cell_text(row_values.get("Phone")))
-                    row_pref_date = _cell_text(row_values.get("Preferred Date"))
-                    row_pref_time = _cell_text(row_values.get("Preferred Time"))
-                    row_existing = _cell_text(row_values.get("Existing Appointment"))
-
-                    if search_name and not _text_matches(search_name, row_name):
-                        continue
-                    if search_phone_norm and not _phone_matches(search_phone_norm, row_phone):
-                        continue
-                    if search_date and not (
-                        _date_matches(search_date, row_pref_date)
-                        or _date_matches(search_date, row_existing)
-                    ):
-                        continue
-                    if search_time and not (
-                        _time_matches(search_time, row_pref_time)
-                        or _time_matches(search_time, row_existing)
-                    ):
-                        continue
-
-                    candidates.append((sheet_name, row_idx, row_values))
-
-            if not candidates:
-                result = {"status": "not_found"}
-                await params.result_callback(result)
-                return result
-
-            if len(candidates) > 1 and (not search_date and not search_time):
-                result = {
-                    "status": "multiple_matches",
-                    "matches": [
-                        {
-                            "sheet": s,
-                            "row": r,
-                            "patient_name": _cell_text(v.get("Patient Name")),
-                            "phone": _cell_text(v.get("Phone")),
-                            "preferred_date": _cell_text(v.get("Preferred Date")),
-                            "preferred_time": _cell_text(v.get("Preferred Time")),
-                            "existing_appointment": _cell_text(v.get("Existing Appointment")),
-                        }
-                        for (s, r, v) in candidates[:10]
-                    ],
-                }
-                await params.result_callback(result)
-                return result
-
-            sheet_name, row_idx, row_values = candidates[0]
-            sheet = workbook[sheet_name]
-            header_map = _ensure_sheet_headers(sheet)
-
-            updated_values = dict(row_values)
-            updated_values["Action"] = action_value
-
-            if not existing_appointment and action_value.lower().startswith("resched"):
-                if not _cell_text(row_values.get("Existing Appointment")):
-                    snapshot_parts = [
-                        _cell_text(row_values.get("Preferred Date")),
-                        _cell_text(row_values.get("Preferred Time")),
-                    ]
-                    snapshot = " ".join([p for p in snapshot_parts if p])
-                    if snapshot:
-                        existing_appointment = snapshot
-
-            if patient_name:
-                updated_values["Patient Name"] = patient_name
-            if patient_age_or_dob:
-                updated_values["Patient Age or DOB"] = patient_age_or_dob
-            if phone:
-                updated_values["Phone"] = _normalize_phone(phone) or phone
-            if department_or_doctor:
-                updated_values["Department or Doctor"] = department_or_doctor
-            if reason:
-                updated_values["Reason"] = reason
-            if preferred_date:
-                updated_values["Preferred Date"] = preferred_date_norm or preferred_date
-            if preferred_time:
-                updated_values["Preferred Time"] = preferred_time
-            if visit_type:
-                updated_values["Visit Type"] = visit_type
-            if existing_appointment:
-                updated_values["Existing Appointment"] = existing_appointment
-            if notes:
-                updated_values["Notes"] = notes
-
-            new_sheet_name = sheet_name
-            moved = False
-
-            if not _use_single_appointments_sheet():
-                if preferred_date and action_value.lower().startswith("resched"):
-                    new_sheet_name = _safe_sheet_name(preferred_date_norm) or sheet_name
-
-            if new_sheet_name != sheet_name:
-                target_sheet = (
-                    workbook[new_sheet_name]
-                    if new_sheet_name in workbook.sheetnames
-                    else workbook.create_sheet(new_sheet_name)
-                )
-                _ensure_sheet_headers(target_sheet)
-                target_row = [updated_values.get(header, "") for header in APPOINTMENTS_HEADERS]
-                target_sheet.append(target_row)
-                sheet.delete_rows(row_idx, 1)
-                moved = True
-            else:
-                for header, col_idx in header_map.items():
-                    if header == "Logged At":
-                        continue
-                    if header in updated_values and updated_values[header] is not None:
-                        sheet.cell(row=row_idx, column=col_idx).value = updated_values[header]
-
-            workbook.save(log_path)
-
-            result = {"status": "updated", "path": log_path, "sheet": new_sheet_name, "moved": moved}
-            await params.result_callback(result)
-            return result
+        async with _async_lock_for(_resolve_appointments_path()):
+            result = await asyncio.to_thread(
+                _update_appointment_sync,
+                action,
+                search_name=search_name,
+                search_phone=search_phone,
+                search_date=search_date,
+                search_time=search_time,
+                patient_name=patient_name,
+                patient_age_or_dob=patient_age_or_dob,
+                phone=phone,
+                department_or_doctor=department_or_doctor,
+                reason=reason,
+                preferred_date=preferred_date,
+                preferred_time=preferred_time,
+                visit_type=visit_type,
+                existing_appointment=existing_appointment,
+                notes=notes,
+            )
+        await params.result_callback(result)
+        return result
 
-    
     async def transfer_call_to(params: FunctionCallParams, forwarding_number: int) -> None:
         """Trasfer call to live agent. Call this function immidiately if user want to talk to a live agent.
 
@@ -878,21 +1735,36 @@ async def run_bot(
     
     tools = ToolsSchema(standard_tools=[close_session, log_appointment, update_appointment, transfer_call_to])
 
-    context = LLMContext(
-        [
-            {"role": "system", "content": system_instruction},
-            {"role": "user", "content": greeting_instruction},
-        ],
-        tools=tools,
-    )
+    context = _take_stored_context(call_sid)
+    if context is not None:
+        call_logger.info("Resuming stored conversation context")
+    else:
+        messages = _initial_messages(clinic_tail, greeting_message)
+        if clinic_tail != CLINIC_TAIL:
+            # A changing checksum for the same tenant means its prompt is being
+            # mutated between calls and will keep missing the prompt cache.
+            call_logger.debug(
+                "Overridden clinic prompt crc32={}", _prompt_crc32(messages[1]["content"])
+            )
+        context = LLMContext(messages, tools=tools)
     context_aggregator = LLMContextAggregatorPair(context)
 
-    llm = OpenAILLMService(api_key=openai_api_key)
+    llm = OpenAILLMService(
+        api_key=openai_api_key,
+        params=OpenAILLMService.InputParams(
+            extra={"prompt_cache_key": _prompt_cache_key(clinic_tail)}
+        ),
+    )
+
+    # The canned replies describe this clinic, so they are only valid with the
+    # built-in clinic tail.
+    processors = [transport.input(), stt, EmergencyGuardProcessor(context)]
+    if clinic_tail == CLINIC_TAIL:
+        processors.append(CannedReplyProcessor(context))
 
     pipeline = Pipeline(
         [
-            transport.input(),
-            stt,
+            *processors,
             context_aggregator.user(),
             llm,
             tts,
@@ -916,12 +1788,14 @@ async def run_bot(
 
     @transport.event_handler("on_client_connected")
     async def on_client_connected(transport, client):
-        logger.info("Pipecat Client connected")
-        await task.queue_frames([LLMRunFrame()])
+        call_logger.info("Pipecat Client connected")
+        # Speak the fixed greeting directly; the LLM only runs once the caller talks.
+        await task.queue_frames([TTSSpeakFrame(greeting_message)])
 
     @transport.event_handler("on_client_disconnected")
     async def on_client_disconnected(transport, client):
-        logger.info("Pipecat Client disconnected")
+        call_logger.info("Pipecat Client disconnected")
+        _store_context(call_sid, context)
         await task.cancel()
 
     runner = PipelineRunner(handle_sigint=False)
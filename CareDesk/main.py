@@ -1,5 +1,6 @@
 import argparse
 import sys
+import threading
 from contextlib import asynccontextmanager
 
 import os
@@ -16,12 +17,47 @@ from pipecat.transports.smallwebrtc.request_handler import (
     SmallWebRTCRequestHandler,
 )
 
-from bot import run_bot
+from bot import (
+    close_shared_clients,
+    export_appointments_xlsx,
+    prewarm_services,
+    run_bot_webrtc,
+    run_bot_websocket,
+)
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 # Load environment variables
 load_dotenv(override=True)
 
-app = FastAPI()
+
+def _configure_logging(level: str) -> None:
+    # enqueue=True hands formatting and the stderr write to loguru's worker
+    # thread so logging never blocks the event loop that is pumping audio frames.
+    logger.remove()
+    logger.add(sys.stderr, level=level, enqueue=True, backtrace=False, diagnose=False)
+
+
+# The sink is configured here, by the entrypoint, so importing bot leaves the
+# global logger alone. uvicorn imports this module as main:app.
+_configure_logging(os.getenv("LOG_LEVEL", "DEBUG"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield  # Run app
+    await small_webrtc_handler.close()
+    await close_shared_clients()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Every call needs the service modules, so load them while the server starts
+# instead of on the first call.
+threading.Thread(target=prewarm_services, name="prewarm-services", daemon=True).start()
 
 # Initialize the SmallWebRTC request handler
 small_webrtc_handler: SmallWebRTCRequestHandler = SmallWebRTCRequestHandler()
@@ -54,7 +90,7 @@ async def offer(request: SmallWebRTCRequest, background_tasks: BackgroundTasks):
 
     # Prepare runner arguments with the callback to run your bot
     async def webrtc_connection_callback(connection):
-        background_tasks.add_task(run_bot, webrtc_connection=connection)
+        background_tasks.add_task(run_bot_webrtc, connection)
 
     # Delegate handling to SmallWebRTCRequestHandler
     answer = await small_webrtc_handler.handle_web_request(
@@ -66,7 +102,7 @@ async def offer(request: SmallWebRTCRequest, background_tasks: BackgroundTasks):
 
 @app.patch("/api/offer")
 async def ice_candidate(request: SmallWebRTCPatchRequest):
-    logger.debug(f"Received patch request: {request}")
+    logger.debug("Received patch request: {}", request)
     await small_webrtc_handler.handle_patch_request(request)
     return {"status": "success"}
 
@@ -98,7 +134,7 @@ async def _websocket(websocket: WebSocket) -> None:
         list(bot_params.keys()),
     )
 
-    await run_bot(
+    await run_bot_websocket(
         websocket=websocket,
         stream_id=stream_id,
         call_sid=call_sid,
@@ -106,12 +142,6 @@ async def _websocket(websocket: WebSocket) -> None:
     )
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    yield  # Run app
-    await small_webrtc_handler.close()
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the CareDesk FastAPI server.")
     parser.add_argument(
@@ -121,12 +151,23 @@ if __name__ == "__main__":
         "--port", type=int, default=os.getenv("PORT", 7860), help="Port for HTTP server (default: 7860)"
     )
     parser.add_argument("--verbose", "-v", action="count")
+    parser.add_argument(
+        "--export-appointments",
+        action="store_true",
+        help="Rebuild the appointments workbook from the CSV logs and exit",
+    )
     args = parser.parse_args()
 
-    logger.remove(0)
+    if args.export_appointments:
+        try:
+            print(export_appointments_xlsx())
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
     if args.verbose:
-        logger.add(sys.stderr, level="TRACE")
-    else:
-        logger.add(sys.stderr, level="DEBUG")
+        _configure_logging("TRACE")
 
-    uvicorn.run(app, host=args.host, port=args.port)
+    # libuv's loop cuts the per-frame scheduling overhead of the audio pipeline.
+    uvicorn.run(app, host=args.host, port=args.port, loop="uvloop" if uvloop else "asyncio")
@@ -23,9 +23,16 @@ from loguru import logger
 from pydantic import BaseModel
 
 from pipecat.audio.utils import create_stream_resampler, pcm_to_ulaw, ulaw_to_pcm
-from pipecat.frames.frames import Frame, StartFrame, AudioRawFrame, InputAudioRawFrame, TTSAudioRawFrame
+from pipecat.frames.frames import Frame, StartFrame, AudioRawFrame, InputAudioRawFrame
 from pipecat.serializers.base_serializer import FrameSerializer
 
+try:
+    # Every inbound 20 ms media message is parsed here, so the C parser pays
+    # off; orjson accepts str and bytes alike.
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 
 class NextGenSwitchSerializerParams(BaseModel):
     wire_sample_rate: int = 8000       # Twilio-style μ-law
@@ -46,11 +53,19 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         self._params = params or NextGenSwitchSerializerParams()
 
         self._stream_id: Optional[str] = None
+        # Outbound media messages differ only in their payload, so the JSON
+        # around it is rendered once per stream instead of once per frame.
+        self._media_prefix: Optional[str] = None
 
         self._wire_sr = int(self._params.wire_sample_rate)
         self._pipeline_in_sr = 0  # set in setup()
         self._pipeline_out_sr = 0  # optional; usually not needed for ulaw conversion
 
+        # One stateful soxr stream per direction, created once per call: the
+        # filter is designed on first use and its history carries across
+        # frames, so no per-frame filter setup or boundary artifacts. The
+        # μ-law <-> PCM16 step in ulaw_to_pcm/pcm_to_ulaw is audioop's C
+        # table lookup.
         self._input_resampler = create_stream_resampler()
         self._output_resampler = create_stream_resampler()
 
@@ -59,6 +74,9 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
 
     def set_stream_id(self, stream_id: str) -> None:
         self._stream_id = stream_id
+        self._media_prefix = (
+            '{"event":"media","streamId":' + json.dumps(stream_id) + ',"media":{"payload":"'
+        )
 
     async def setup(self, frame: StartFrame):
         # Pipecat passes pipeline configuration in StartFrame. Twilio serializer uses audio_in_sample_rate. :contentReference[oaicite:2]{index=2}
@@ -78,9 +96,7 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         Convert μ-law->PCM16 and resample 8k->pipeline_in_sr.
         """
         try:
-            if isinstance(data, bytes):
-                data = data.decode("utf-8", errors="ignore")
-            msg = json.loads(data)
+            msg = _json_loads(data)
         except Exception:
             return None
 
@@ -107,7 +123,12 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         # Optional lightweight debug every ~50 frames
         self._dbg_in_count += 1
         if self._dbg_in_count % 50 == 0:
-            logger.debug(f"[SER IN] ulaw={len(ulaw_bytes)} bytes -> pcm={len(pcm)} bytes @ {self._pipeline_in_sr}")
+            logger.debug(
+                "[SER IN] ulaw={} bytes -> pcm={} bytes @ {}",
+                len(ulaw_bytes),
+                len(pcm),
+                self._pipeline_in_sr,
+            )
 
         return InputAudioRawFrame(audio=pcm, num_channels=1, sample_rate=self._pipeline_in_sr)
 
@@ -115,10 +136,12 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         """
         Outbound: Convert PCM at frame.sample_rate -> 8k μ-law and wrap as Twilio-like media JSON.
         """
-        if not isinstance(frame, (AudioRawFrame, TTSAudioRawFrame)):
+        # TTSAudioRawFrame and OutputAudioRawFrame both subclass AudioRawFrame.
+        if not isinstance(frame, AudioRawFrame):
             return None
 
-        if not self._stream_id:
+        media_prefix = self._media_prefix
+        if media_prefix is None:
             # If you want hard-fail here, raise. For safety, just drop.
             logger.warning("serialize(): missing stream_id; dropping outbound audio")
             return None
@@ -131,17 +154,19 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         if not ulaw_bytes:
             return None
 
-        payload = base64.b64encode(ulaw_bytes).decode("utf-8")
+        # Base64 output is plain ASCII, so it can be spliced into the JSON
+        # string without escaping.
+        payload = base64.b64encode(ulaw_bytes).decode("ascii")
 
         self._dbg_out_count += 1
         if self._dbg_out_count % 50 == 0:
             logger.debug(
-                f"[SER OUT] pcm={len(pcm)} bytes @ {frame.sample_rate} -> ulaw={len(ulaw_bytes)} bytes @ {self._wire_sr}"
+                "[SER OUT] pcm={} bytes @ {} -> ulaw={} bytes @ {}",
+                len(pcm),
+                frame.sample_rate,
+                len(ulaw_bytes),
+                self._wire_sr,
             )
 
-        answer = {
-            "event": "media",
-            "streamId": self._stream_id,  # your protocol uses streamId
-            "media": {"payload": payload},
-        }
-        return json.dumps(answer)
+        # Equivalent to {"event": "media", "streamId": ..., "media": {"payload": ...}}
+        return media_prefix + payload + '"}}'
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# CareDesk is deployed as a flat directory of modules, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
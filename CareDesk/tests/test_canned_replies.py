@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("pipecat")
+
+from bot import CANNED_REPLIES, _match_canned_reply  # noqa: E402
+
+
+def _reply_for(phrasing):
+    for phrasings, reply in CANNED_REPLIES:
+        if phrasing in phrasings:
+            return reply
+    raise KeyError(phrasing)
+
+
+@pytest.mark.parametrize(
+    "text, phrasing",
+    [
+        ("Are you a robot?", "are you a robot"),
+        ("Where are you located", "where are you located"),
+        ("What is your address please", "what is your address"),
+        ("WHICH departments are available?", "which departments are available"),
+    ],
+)
+def test_close_phrasings_hit(text, phrasing):
+    assert _match_canned_reply(text) == _reply_for(phrasing)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "What are your hours",
+        "When are you open on Saturday",
+        "Are you a real person or not",
+        "What departments do you have for kids",
+        "I want to book with cardiology",
+    ],
+)
+def test_near_misses_go_to_the_model(text):
+    assert _match_canned_reply(text) is None
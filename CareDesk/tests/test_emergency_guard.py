@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pipecat")
+
+from pipecat.frames.frames import TranscriptionFrame, TTSSpeakFrame  # noqa: E402
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor  # noqa: E402
+
+from bot import EMERGENCY_REPLY, EmergencyGuardProcessor, _EMERGENCY_RE  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "I'm having chest pain right now",
+        "I have severe chest pains",
+        "I can't breathe",
+        "My son cannot breathe",
+        "I'm bleeding heavily",
+        "I am having heavy bleeding",
+        "I'm feeling suicidal",
+        "I want to kill myself",
+        "I'm going to hurt myself",
+        "I've been cutting myself",
+        "I think I'm having a stroke right now",
+        "My mom's having a stroke",
+        "My wife just collapsed",
+        "My husband is unconscious",
+        "I'm about to pass out",
+        "I can't wake him up",
+    ],
+)
+def test_acute_phrases_match(text):
+    assert _EMERGENCY_RE.search(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "I fainted last week and need a test",
+        "I need a follow-up after my car accident",
+        "My father had a stroke",
+        "I had chest pain last month and want an ECG",
+        "I'd like to book a chest X-ray",
+        "She has a history of self-harm",
+        "My uncle died by suicide years ago",
+        "I had heavy bleeding after surgery last year",
+        "Can I book a blood test for Friday?",
+        "She collapsed at home last year",
+        "He was unconscious after his accident",
+        "I'd like a stroke risk screening",
+    ],
+)
+def test_history_and_booking_phrases_do_not_match(text):
+    assert not _EMERGENCY_RE.search(text)
+
+
+class _Context:
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+
+def _run_guard(monkeypatch, text):
+    async def _base_process_frame(self, frame, direction):
+        pass
+
+    monkeypatch.setattr(FrameProcessor, "process_frame", _base_process_frame)
+    context = _Context()
+    guard = EmergencyGuardProcessor(context)
+    pushed = []
+
+    async def _push_frame(frame, direction=FrameDirection.DOWNSTREAM):
+        pushed.append(frame)
+
+    guard.push_frame = _push_frame
+    frame = TranscriptionFrame(text, "caller", "2024-01-01T00:00:00Z")
+    asyncio.run(guard.process_frame(frame, FrameDirection.DOWNSTREAM))
+    return frame, pushed, context.messages
+
+
+def test_guard_speaks_reply_and_swallows_transcript(monkeypatch):
+    text = "I'm having chest pain right now"
+    _, pushed, messages = _run_guard(monkeypatch, text)
+
+    assert len(pushed) == 1
+    assert isinstance(pushed[0], TTSSpeakFrame)
+    assert pushed[0].text == EMERGENCY_REPLY
+    assert messages == [
+        {"role": "user", "content": text},
+        {"role": "assistant", "content": EMERGENCY_REPLY},
+    ]
+
+
+def test_guard_forwards_ordinary_transcript(monkeypatch):
+    frame, pushed, messages = _run_guard(monkeypatch, "I need to book a blood test")
+
+    assert pushed == [frame]
+    assert messages == []
@@ -1,7 +1,6 @@
 """Utilities for transferring an active call to a live agent."""
 
 import asyncio
-from datetime import datetime
 from typing import Optional
 
 import requests
@@ -44,19 +43,16 @@ async def transfer_call(call_sid: str, dial_number: str, base_url: str, api_key:
         logger.exception("Failed to transfer call {}: {}", call_sid, exc)
         return
 
-    timestamp = datetime.now().strftime("%H:%M:%S")
     if response.ok:
         logger.info(
-            "Call {} transferred successfully (status {} at {})",
+            "Call {} transferred successfully (status {})",
             call_sid,
             response.status_code,
-            timestamp,
         )
     else:
         logger.error(
-            "Call {} transfer failed (status {} at {}): {}",
+            "Call {} transfer failed (status {}): {}",
             call_sid,
             response.status_code,
-            timestamp,
             response.text,
         )
@@ -0,0 +1,101 @@
+"""Silero VAD analyzer backed by a single, process-wide ONNX Runtime session.
+
+Pipecat's ``SileroVADAnalyzer`` loads the model and builds a new ORT session for
+every transport it is given. The model weights are read-only, so concurrent
+calls can share one session; only the recurrent state has to live per stream.
+
+Streams are deliberately not batched into one ``(K, 512)`` inference per tick.
+Each CareDesk replica serves a single call (``replica_concurrency = 1`` in
+cerebrium.toml), so there is nothing to batch in production, and a shared tick
+would add up to one window of latency to every speech decision.
+"""
+
+import copy
+from importlib import resources
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from pipecat.audio.vad.silero import SileroOnnxModel, SileroVADAnalyzer
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+
+
+SILERO_MODEL_PACKAGE = "pipecat.audio.vad.data"
+SILERO_MODEL_NAME = "silero_vad.onnx"
+
+# Silero expects 512-sample windows at 16 kHz.
+_WARMUP_SAMPLE_RATE = 16000
+_WARMUP_WINDOW = 512
+
+# Energy gate: windows whose RMS stays below ENERGY_GATE_RATIO times the
+# running noise floor are reported as silence without running Silero. The
+# floor starts at the quietest of the first NOISE_FLOOR_SEED_WINDOWS windows,
+# all of which go to Silero, so a speech onset cannot seed it. After that it is
+# an EMA raised only by windows Silero itself scored as silence; gated windows
+# may pull it down but never up, so soft speech cannot ratchet it upwards.
+ENERGY_GATE_RATIO = 2.0
+NOISE_FLOOR_ALPHA = 0.01
+NOISE_FLOOR_SEED_WINDOWS = 16
+
+
+def _load_shared_model() -> SileroOnnxModel:
+    model_path = str(resources.files(SILERO_MODEL_PACKAGE).joinpath(SILERO_MODEL_NAME))
+    logger.debug("Loading shared Silero VAD model from {}", model_path)
+
+    # SileroOnnxModel pins the session to the CPU provider with one intra/inter
+    # op thread and ORT's default ORT_ENABLE_ALL graph optimisations.
+    model = SileroOnnxModel(model_path, force_onnx_cpu=True)
+
+    # One zero-input run at import so the first caller does not pay for the
+    # session's lazy allocations.
+    model(np.zeros(_WARMUP_WINDOW, dtype=np.float32), _WARMUP_SAMPLE_RATE)
+    model.reset_states()
+    return model
+
+
+_SHARED_MODEL = _load_shared_model()
+
+
+class SharedSileroVADAnalyzer(SileroVADAnalyzer):
+    """Silero VAD that reuses the process-wide ORT session.
+
+    Each instance holds its own copy of the model wrapper, which shares the
+    ``InferenceSession`` but keeps a private LSTM state and context window.
+    Obviously silent windows are rejected before they reach the model when
+    their linear RMS stays below ENERGY_GATE_RATIO times the noise floor.
+    """
+
+    def __init__(self, *, sample_rate: Optional[int] = None, params: Optional[VADParams] = None):
+        # Skip SileroVADAnalyzer.__init__, which would load another session.
+        VADAnalyzer.__init__(self, sample_rate=sample_rate, params=params)
+        self._model = copy.copy(_SHARED_MODEL)
+        self._model.reset_states()
+        self._last_reset_time = 0
+        self._noise_floor: Optional[float] = None
+        self._seed_rms = float("inf")
+        self._seed_windows = 0
+
+    def voice_confidence(self, buffer) -> float:
+        samples = np.frombuffer(buffer, dtype=np.int16).astype(np.float32)
+        rms = float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+        noise_floor = self._noise_floor
+        if noise_floor is None:
+            self._seed_rms = min(self._seed_rms, rms)
+            self._seed_windows += 1
+            if self._seed_windows >= NOISE_FLOOR_SEED_WINDOWS:
+                self._noise_floor = self._seed_rms
+            return super().voice_confidence(buffer)
+
+        # Linear RMS against the floor. Each project sets its own ratio: 2.0
+        # here, while src/vad.py uses 1.5.
+        if rms < noise_floor * ENERGY_GATE_RATIO:
+            if rms < noise_floor:
+                self._noise_floor = noise_floor + NOISE_FLOOR_ALPHA * (rms - noise_floor)
+            return 0.0
+
+        confidence = super().voice_confidence(buffer)
+        if confidence < self._params.confidence:
+            self._noise_floor = noise_floor + NOISE_FLOOR_ALPHA * (rms - noise_floor)
+        return confidence
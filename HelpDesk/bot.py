@@ -1,9 +1,13 @@
 import os
 import re
+import sqlite3
 import sys
 import asyncio
-import threading
+import csv
+import glob
 from datetime import datetime
+from functools import lru_cache
+from deepgram import LiveOptions
 from dotenv import load_dotenv
 from loguru import logger
 from openpyxl import Workbook, load_workbook
@@ -30,7 +34,7 @@ from pipecat.transports.websocket.fastapi import (
 
 from pipecat.adapters.schemas.tools_schema import ToolsSchema
 
-from nextgenswitch_serializer import NextGenSwitchFrameSerializer
+from nextgenswitch_serializer import NextGenSwitchFrameSerializer, NextGenSwitchSerializerParams
 from transfer_call import transfer_call
 
 
@@ -57,10 +61,25 @@ APPOINTMENTS_HEADERS = [
     "Notes",
 ]
 
-APPOINTMENT_LOG_LOCK = threading.Lock()
 DEFAULT_APPOINTMENTS_SHEET = "Appointments"
 
-SYSTEM_INSTRUCTION = f"""
+# Deepgram finalizes an utterance after this much trailing silence instead of
+# its server default. pipecat already sends Deepgram a Finalize message when
+# the VAD reports UserStoppedSpeakingFrame and drops empty transcripts.
+# Deepgram's own vad_events stay off: the transport's Silero VAD already emits
+# the user speaking frames, and Deepgram would push a second set of them along
+# with extra interruptions.
+DEEPGRAM_ENDPOINTING_MS = int(os.getenv("DEEPGRAM_ENDPOINTING_MS", "200"))
+DEEPGRAM_UTTERANCE_END_MS = int(os.getenv("DEEPGRAM_UTTERANCE_END_MS", "1000"))
+
+# Patterns used by the appointment normalizers.
+_SHEET_RE = re.compile(r"[\\/*?:\[\]]")
+_PHONE_RE = re.compile(r"\D")
+_DATE_RE = re.compile(r"(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/-]\d{1,2}[/-]\d{2,4})")
+_TIME_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?")
+_DATE_FMTS = ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y")
+
+SYSTEM_INSTRUCTION = """
 You are a professional appointment booking receptionist for a medical clinic named "Info Diagnostic Center" in the United States.
 
 Your ONLY job is to help callers:
@@ -274,6 +293,8 @@ Close with:
 
 
 
+# APPOINTMENTS_XLSX_PATH is read once; changing it needs a restart.
+@lru_cache(maxsize=1)
 def _resolve_appointments_path() -> str:
     env_path = os.getenv("APPOINTMENTS_XLSX_PATH")
     if env_path:
@@ -290,7 +311,7 @@ def _cell_text(value: object | None) -> str:
 def _safe_sheet_name(value: str) -> str:
     if not value:
         return ""
-    cleaned = re.sub(r"[\\/*?:\[\]]", "-", str(value)).strip()
+    cleaned = _SHEET_RE.sub("-", str(value)).strip()
     if not cleaned:
         return ""
     return cleaned[:31]
@@ -299,25 +320,34 @@ def _safe_sheet_name(value: str) -> str:
 def _normalize_phone(value: str | None) -> str:
     if not value:
         return ""
-    return re.sub(r"\D", "", str(value))
+    return _PHONE_RE.sub("", str(value))
 
 
 def _normalize_date(value: str | None) -> str:
     if not value:
         return ""
     cleaned = str(value).strip()
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y"):
+
+    # Most dates arrive as ISO YYYY-MM-DD, already in the stored layout, so
+    # validate those with fromisoformat before the strptime formats.
+    head = cleaned[:10]
+    if len(head) == 10 and head[4] == "-" and head[7] == "-":
+        try:
+            datetime.fromisoformat(head)
+            return head
+        except ValueError:
+            pass
+
+    for fmt in _DATE_FMTS:
         try:
             return datetime.strptime(cleaned, fmt).strftime("%Y-%m-%d")
         except ValueError:
             continue
 
-    date_match = re.search(
-        r"(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/-]\d{1,2}[/-]\d{2,4})", cleaned
-    )
+    date_match = _DATE_RE.search(cleaned)
     if date_match:
         candidate = date_match.group(1)
-        for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y"):
+        for fmt in _DATE_FMTS:
             try:
                 return datetime.strptime(candidate, fmt).strftime("%Y-%m-%d")
             except ValueError:
@@ -364,7 +394,7 @@ def _normalize_time_bucket(value: str | None) -> str:
     if any(k in text for k in ["evening", "night"]):
         return "evening"
 
-    m = re.search(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?", text)
+    m = _TIME_RE.search(text)
     if not m:
         return text
 
@@ -455,7 +485,9 @@ def _time_matches(search: str, candidate: str) -> bool:
 def _ensure_sheet_headers(sheet) -> dict[str, int]:
     header_cells = [cell.value for cell in sheet[1]]
 
-    if sheet.max_row == 1 and sheet.max_column == 1 and header_cells[0] is None:
+    # A1 is checked first, so the row count is only looked up for a sheet that
+    # may be empty.
+    if header_cells[0] is None and len(header_cells) == 1 and sheet.max_row == 1:
         for col_idx, name in enumerate(APPOINTMENTS_HEADERS, start=1):
             sheet.cell(row=1, column=col_idx).value = name
         return {name: idx + 1 for idx, name in enumerate(APPOINTMENTS_HEADERS)}
@@ -476,15 +508,49 @@ def _ensure_sheet_headers(sheet) -> dict[str, int]:
     return header_map
 
 
+# Workbooks this process has loaded or saved, with the (mtime, size) of the
+# file as it last saw it. Reusing them skips re-parsing the whole xlsx on every
+# tool call; a file changed by anyone else no longer matches and is reloaded.
+_WORKBOOK_CACHE: dict[str, tuple[Workbook, tuple[int, int]]] = {}
+
+
+def _file_signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_cached_workbook(path: str) -> Workbook:
+    signature = _file_signature(path)
+    cached = _WORKBOOK_CACHE.get(path)
+    if cached is not None and cached[1] == signature:
+        return cached[0]
+
+    workbook = load_workbook(path)
+    _WORKBOOK_CACHE[path] = (workbook, signature)
+    return workbook
+
+
+def _save_cached_workbook(path: str, workbook: Workbook) -> None:
+    try:
+        workbook.save(path)
+    except Exception:
+        # The in-memory copy now holds changes the file does not.
+        _WORKBOOK_CACHE.pop(path, None)
+        raise
+    _WORKBOOK_CACHE[path] = (workbook, _file_signature(path))
+
+
 def _append_row_to_workbook(path: str, sheet_name: str, row: list[str]) -> None:
     directory = os.path.dirname(path)
     if directory:
         os.makedirs(directory, exist_ok=True)
 
+    created = True
     if os.path.exists(path):
-        workbook = load_workbook(path)
+        workbook = _load_cached_workbook(path)
         if sheet_name in workbook.sheetnames:
             sheet = workbook[sheet_name]
+            created = False
         else:
             sheet = workbook.create_sheet(sheet_name)
     else:
@@ -492,9 +558,496 @@ def _append_row_to_workbook(path: str, sheet_name: str, row: list[str]) -> None:
         sheet = workbook.active
         sheet.title = sheet_name
 
-    _ensure_sheet_headers(sheet)
+    # A sheet made here is known to be empty; only existing ones are checked.
+    if created:
+        sheet.append(APPOINTMENTS_HEADERS)
+    else:
+        _ensure_sheet_headers(sheet)
     sheet.append(row)
+    _save_cached_workbook(path, workbook)
+
+
+def _appointments_format() -> str:
+    value = os.getenv("APPOINTMENTS_FORMAT", "xlsx").strip().lower()
+    return value if value in {"csv", "sqlite"} else "xlsx"
+
+
+def _csv_sheet_path(path: str, sheet_name: str) -> str:
+    return f"{os.path.splitext(path)[0]}.{sheet_name}.csv"
+
+
+def _csv_sheet_names(path: str) -> list[str]:
+    base = os.path.splitext(path)[0]
+    prefix_len = len(base) + 1
+    return sorted(
+        csv_path[prefix_len:-4] for csv_path in glob.glob(f"{glob.escape(base)}.*.csv")
+    )
+
+
+def _append_row_csv(path: str, sheet_name: str, row: list[str]) -> str:
+    """Append one appointment row to the sheet's CSV file.
+
+    Each sheet is its own file next to the configured workbook path, so an
+    append is a single write regardless of how many rows are already logged.
+    """
+    csv_path = _csv_sheet_path(path, sheet_name)
+    directory = os.path.dirname(csv_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(csv_path, "a", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        if handle.tell() == 0:
+            writer.writerow(APPOINTMENTS_HEADERS)
+        writer.writerow(row)
+    return csv_path
+
+
+def _load_csv_sheets(path: str) -> dict[str, tuple[list[str], list[list[str]]]]:
+    sheets = {}
+    for sheet_name in _csv_sheet_names(path):
+        with open(_csv_sheet_path(path, sheet_name), newline="", encoding="utf-8") as handle:
+            rows = list(csv.reader(handle))
+        header = rows[0] if rows else []
+        missing = [name for name in APPOINTMENTS_HEADERS if name not in header]
+        sheets[sheet_name] = (header + missing, rows[1:])
+    return sheets
+
+
+def _write_csv_sheet(path: str, sheet_name: str, header: list[str], rows: list[list[str]]) -> None:
+    csv_path = _csv_sheet_path(path, sheet_name)
+    tmp_path = f"{csv_path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_path, csv_path)
+
+
+# With APPOINTMENTS_FORMAT=sqlite the log is one table in a WAL-mode database
+# next to the configured workbook path. The sheet a row would live on is kept
+# in its own column, and the other columns follow APPOINTMENTS_HEADERS.
+_SQLITE_COLUMNS = [name.lower().replace(" ", "_") for name in APPOINTMENTS_HEADERS]
+_SQLITE_INSERT = (
+    f"INSERT INTO appointments (sheet, {', '.join(_SQLITE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(_SQLITE_COLUMNS) + 1))})"
+)
+_SQLITE_UPDATE = (
+    f"UPDATE appointments SET sheet = ?, {', '.join(f'{c} = ?' for c in _SQLITE_COLUMNS[1:])} "
+    "WHERE rowid = ?"
+)
+_SQLITE_SELECT = (
+    f"SELECT rowid, sheet, {', '.join(_SQLITE_COLUMNS)} FROM appointments ORDER BY rowid"
+)
+_SQLITE_CONNECTIONS: dict[str, sqlite3.Connection] = {}
+
+
+def _sqlite_path(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}.db"
+
+
+def _sqlite_connection(path: str) -> sqlite3.Connection:
+    # One connection per database, shared by the worker threads; the log's
+    # _log_lock_for lock keeps them from using it at the same time.
+    db_path = _sqlite_path(path)
+    conn = _SQLITE_CONNECTIONS.get(db_path)
+    if conn is None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS appointments "
+            f"(sheet TEXT, {', '.join(f'{c} TEXT' for c in _SQLITE_COLUMNS)})"
+        )
+        conn.commit()
+        _SQLITE_CONNECTIONS[db_path] = conn
+    return conn
+
+
+def _append_row_sqlite(path: str, sheet_name: str, row: list[str]) -> str:
+    conn = _sqlite_connection(path)
+    with conn:
+        conn.execute(_SQLITE_INSERT, [sheet_name, *row])
+    return _sqlite_path(path)
+
+
+def _load_sqlite_rows(path: str) -> dict[str, list[tuple[int, list]]]:
+    """Return the logged rows as (rowid, values) pairs grouped by sheet."""
+    if not os.path.exists(_sqlite_path(path)):
+        return {}
+    sheets: dict[str, list[tuple[int, list]]] = {}
+    for rowid, sheet_name, *values in _sqlite_connection(path).execute(_SQLITE_SELECT):
+        sheets.setdefault(sheet_name, []).append((rowid, values))
+    return sheets
+
+
+def _update_row_sqlite(path: str, rowid: int, sheet_name: str, values: dict) -> None:
+    # Logged At is never rewritten, like in the other formats.
+    conn = _sqlite_connection(path)
+    with conn:
+        conn.execute(
+            _SQLITE_UPDATE,
+            [sheet_name, *(values.get(name) for name in APPOINTMENTS_HEADERS[1:]), rowid],
+        )
+
+
+def export_appointments_xlsx(path: str | None = None) -> str:
+    """Build the appointments workbook from the CSV or SQLite log.
+
+    Used with APPOINTMENTS_FORMAT=csv or sqlite to produce the Excel file on
+    demand. The workbook is streamed in write-only mode and replaces any
+    existing file. With the default xlsx format the workbook is the log itself,
+    so ValueError is raised instead of overwriting it.
+    """
+    appointments_format = _appointments_format()
+    if appointments_format == "xlsx":
+        raise ValueError(
+            "APPOINTMENTS_FORMAT is xlsx: the workbook is already the appointments log, "
+            "so there is nothing to export. Set APPOINTMENTS_FORMAT=csv or sqlite."
+        )
+
+    path = path or _resolve_appointments_path()
+    if appointments_format == "sqlite":
+        sheets = {
+            sheet_name: (APPOINTMENTS_HEADERS, [values for _, values in rows])
+            for sheet_name, rows in _load_sqlite_rows(path).items()
+        }
+    else:
+        sheets = _load_csv_sheets(path)
+    sheets = sheets or {DEFAULT_APPOINTMENTS_SHEET: (APPOINTMENTS_HEADERS, [])}
+
+    workbook = Workbook(write_only=True)
+    for sheet_name, (header, rows) in sheets.items():
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
     workbook.save(path)
+    return path
+
+
+# Appends and updates for one log are serialized on the event loop, so a
+# write can run in a worker thread without racing another call's.
+_LOG_LOCKS: dict[str, asyncio.Lock] = {}
+
+
+def _log_lock_for(path: str) -> asyncio.Lock:
+    lock = _LOG_LOCKS.get(path)
+    if lock is None:
+        lock = _LOG_LOCKS[path] = asyncio.Lock()
+    return lock
+
+
+def _append_appointment_row(path: str, sheet_name: str, row: list[str]) -> str:
+    log_format = _appointments_format()
+    if log_format == "csv":
+        return _append_row_csv(path, sheet_name, row)
+    if log_format == "sqlite":
+        return _append_row_sqlite(path, sheet_name, row)
+    _append_row_to_workbook(path, sheet_name, row)
+    return path
+
+
+# Runs in a worker thread, with the log's _log_lock_for lock held by the
+# caller, so loading and saving the workbook never stalls the audio pipeline.
+def _update_appointment_sync(
+    action: str,
+    search_name: str | None = None,
+    search_phone: str | None = None,
+    search_date: str | None = None,
+    search_time: str | None = None,
+    patient_name: str | None = None,
+    patient_age_or_dob: str | None = None,
+    phone: str | None = None,
+    department_or_doctor: str | None = None,
+    reason: str | None = None,
+    preferred_date: str | None = None,
+    preferred_time: str | None = None,
+    visit_type: str | None = None,
+    existing_appointment: str | None = None,
+    notes: str | None = None,
+) -> dict:
+    if not search_name and patient_name:
+        search_name = patient_name
+    if not search_phone and phone:
+        search_phone = phone
+
+    if not any([search_name, search_phone, search_date, search_time]):
+        return {"status": "missing_search"}
+
+    log_path = _resolve_appointments_path()
+    log_format = _appointments_format()
+    use_csv = log_format == "csv"
+    use_sqlite = log_format == "sqlite"
+    if use_csv:
+        log_exists = bool(_csv_sheet_names(log_path))
+    else:
+        log_exists = os.path.exists(_sqlite_path(log_path) if use_sqlite else log_path)
+    if not log_exists:
+        return {"status": "not_found", "reason": "missing_workbook"}
+
+    search_phone_norm = _normalize_phone(search_phone)
+    search_date_norm = _normalize_date(search_date)
+    if _use_single_appointments_sheet():
+        sheet_hint = _appointments_sheet_name(search_date_norm, "")
+    else:
+        sheet_hint = _safe_sheet_name(search_date_norm) if search_date_norm else ""
+
+    action_value = _cell_text(action)
+    preferred_date_norm = _normalize_date(preferred_date)
+
+    if use_csv:
+        csv_sheets = _load_csv_sheets(log_path)
+        all_sheet_names = list(csv_sheets)
+    elif use_sqlite:
+        sqlite_sheets = _load_sqlite_rows(log_path)
+        all_sheet_names = list(sqlite_sheets)
+    else:
+        workbook = _load_cached_workbook(log_path)
+        all_sheet_names = workbook.sheetnames
+
+    if sheet_hint and sheet_hint in all_sheet_names:
+        sheet_names = [sheet_hint] + [s for s in all_sheet_names if s != sheet_hint]
+    else:
+        sheet_names = all_sheet_names
+
+    candidates = []
+    for sheet_name in sheet_names:
+        if use_csv:
+            header, rows = csv_sheets[sheet_name]
+            sheet_rows = (
+                (row_idx, dict(zip(header, values)))
+                for row_idx, values in enumerate(rows, start=2)
+            )
+        elif use_sqlite:
+            # Rows are addressed by rowid instead of their position.
+            sheet_rows = (
+                (rowid, dict(zip(APPOINTMENTS_HEADERS, values)))
+                for rowid, values in sqlite_sheets[sheet_name]
+            )
+        else:
+            sheet = workbook[sheet_name]
+            header_map = _ensure_sheet_headers(sheet)
+            sheet_rows = (
+                (
+                    row_idx,
+                    {
+                        header: sheet.cell(row=row_idx, column=col_idx).value
+                        for header, col_idx in header_map.items()
+                    },
+                )
+                for row_idx in range(2, sheet.max_row + 1)
+            )
+
+        for row_idx, row_values in sheet_rows:
+            if not any(value not in (None, "") for value in row_values.values()):
+                continue
+
+            row_name = _cell_text(row_values.get("Patient Name"))
+            row_phone = _normalize_phone(_cell_text(row_values.get("Phone")))
+            row_pref_date = _cell_text(row_values.get("Preferred Date"))
+            row_pref_time = _cell_text(row_values.get("Preferred Time"))
+            row_existing = _cell_text(row_values.get("Existing Appointment"))
+
+            if search_name and not _text_matches(search_name, row_name):
+                continue
+            if search_phone_norm and not _phone_matches(search_phone_norm, row_phone):
+                continue
+            if search_date and not (
+                _date_matches(search_date, row_pref_date)
+                or _date_matches(search_date, row_existing)
+            ):
+                continue
+            if search_time and not (
+                _time_matches(search_time, row_pref_time)
+                or _time_matches(search_time, row_existing)
+            ):
+                continue
+
+            candidates.append((sheet_name, row_idx, row_values))
+
+    if not candidates:
+        return {"status": "not_found"}
+
+    if len(candidates) > 1 and (not search_date and not search_time):
+        return {
+            "status": "multiple_matches",
+            "matches": [
+                {
+                    "sheet": s,
+                    "row": r,
+                    "patient_name": _cell_text(v.get("Patient Name")),
+                    "phone": _cell_text(v.get("Phone")),
+                    "preferred_date": _cell_text(v.get("Preferred Date")),
+                    "preferred_time": _cell_text(v.get("Preferred Time")),
+                    "existing_appointment": _cell_text(v.get("Existing Appointment")),
+                }
+                for (s, r, v) in candidates[:10]
+            ],
+        }
+
+    sheet_name, row_idx, row_values = candidates[0]
+
+    updated_values = dict(row_values)
+    updated_values["Action"] = action_value
+
+    if not existing_appointment and action_value.lower().startswith("resched"):
+        if not _cell_text(row_values.get("Existing Appointment")):
+            snapshot_parts = [
+                _cell_text(row_values.get("Preferred Date")),
+                _cell_text(row_values.get("Preferred Time")),
+            ]
+            snapshot = " ".join([p for p in snapshot_parts if p])
+            if snapshot:
+                existing_appointment = snapshot
+
+    if patient_name:
+        updated_values["Patient Name"] = patient_name
+    if patient_age_or_dob:
+        updated_values["Patient Age or DOB"] = patient_age_or_dob
+    if phone:
+        updated_values["Phone"] = _normalize_phone(phone) or phone
+    if department_or_doctor:
+        updated_values["Department or Doctor"] = department_or_doctor
+    if reason:
+        updated_values["Reason"] = reason
+    if preferred_date:
+        updated_values["Preferred Date"] = preferred_date_norm or preferred_date
+    if preferred_time:
+        updated_values["Preferred Time"] = preferred_time
+    if visit_type:
+        updated_values["Visit Type"] = visit_type
+    if existing_appointment:
+        updated_values["Existing Appointment"] = existing_appointment
+    if notes:
+        updated_values["Notes"] = notes
+
+    new_sheet_name = sheet_name
+    moved = False
+
+    if not _use_single_appointments_sheet():
+        if preferred_date and action_value.lower().startswith("resched"):
+            new_sheet_name = _safe_sheet_name(preferred_date_norm) or sheet_name
+
+    if use_csv:
+        header, rows = csv_sheets[sheet_name]
+        if new_sheet_name != sheet_name:
+            del rows[row_idx - 2]
+            _write_csv_sheet(log_path, sheet_name, header, rows)
+            target_row = [updated_values.get(header, "") for header in APPOINTMENTS_HEADERS]
+            _append_row_csv(log_path, new_sheet_name, target_row)
+            moved = True
+        else:
+            updated_row = list(rows[row_idx - 2])
+            updated_row += [""] * (len(header) - len(updated_row))
+            for col_idx, column in enumerate(header):
+                if column == "Logged At":
+                    continue
+                if updated_values.get(column) is not None:
+                    updated_row[col_idx] = updated_values[column]
+            rows[row_idx - 2] = updated_row
+            _write_csv_sheet(log_path, sheet_name, header, rows)
+        result_path = _csv_sheet_path(log_path, new_sheet_name)
+    elif use_sqlite:
+        # Moving to another sheet only changes the row's sheet column.
+        _update_row_sqlite(log_path, row_idx, new_sheet_name, updated_values)
+        moved = new_sheet_name != sheet_name
+        result_path = _sqlite_path(log_path)
+    else:
+        sheet = workbook[sheet_name]
+        header_map = _ensure_sheet_headers(sheet)
+        if new_sheet_name != sheet_name:
+            target_sheet = (
+                workbook[new_sheet_name]
+                if new_sheet_name in workbook.sheetnames
+                else workbook.create_sheet(new_sheet_name)
+            )
+            _ensure_sheet_headers(target_sheet)
+            target_row = [updated_values.get(header, "") for header in APPOINTMENTS_HEADERS]
+            target_sheet.append(target_row)
+            sheet.delete_rows(row_idx, 1)
+            moved = True
+        else:
+            for header, col_idx in header_map.items():
+                if header == "Logged At":
+                    continue
+                if header in updated_values and updated_values[header] is not None:
+                    sheet.cell(row=row_idx, column=col_idx).value = updated_values[header]
+
+        _save_cached_workbook(log_path, workbook)
+        result_path = log_path
+
+    return {
+        "status": "updated",
+        "path": result_path,
+        "sheet": new_sheet_name,
+        "moved": moved,
+    }
+
+
+# One AsyncOpenAI client (and its keep-alive httpx pool) per credential set,
+# shared by every call in the process so only the first call pays for the
+# TCP and TLS handshakes. The STT and TTS services stream over a websocket of
+# their own per call, so they are still built by run_bot.
+OPENAI_KEEPALIVE_CONNECTIONS = 64
+OPENAI_KEEPALIVE_EXPIRY_SECS = 300.0
+
+_OPENAI_CLIENTS: dict[tuple, object] = {}
+
+
+def _shared_openai_client(api_key, base_url, organization, project, default_headers):
+    key = (api_key, base_url, organization, project)
+    client = _OPENAI_CLIENTS.get(key)
+    if client is None:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            organization=organization,
+            project=project,
+            default_headers=default_headers,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SECS,
+                ),
+            ),
+        )
+        _OPENAI_CLIENTS[key] = client
+    return client
+
+
+async def close_shared_clients() -> None:
+    """Close the pooled OpenAI clients and their keep-alive connections."""
+    clients = list(_OPENAI_CLIENTS.values())
+    _OPENAI_CLIENTS.clear()
+    for client in clients:
+        await client.close()
+
+
+class PooledOpenAILLMService(OpenAILLMService):
+    """OpenAI LLM service that reuses the process-wide client for its key."""
+
+    def create_client(
+        self,
+        api_key=None,
+        base_url=None,
+        organization=None,
+        project=None,
+        default_headers=None,
+        **kwargs,
+    ):
+        return _shared_openai_client(api_key, base_url, organization, project, default_headers)
+
+
+# The event loop only keeps weak references to tasks, so pending transfers are
+# held here until they finish.
+_TRANSFER_TASKS: set[asyncio.Task] = set()
 
 
 def _build_webrtc_transport(webrtc_connection: object) -> SmallWebRTCTransport:
@@ -513,7 +1066,12 @@ def _build_websocket_transport(
     websocket: object,
     stream_id: str | None = None,
 ) -> FastAPIWebsocketTransport:
-    serializer = NextGenSwitchFrameSerializer()
+    # NEXTGENSWITCH_BINARY_MEDIA=true sends and receives raw μ-law in binary
+    # websocket frames; the NextGenSwitch side must be configured to match.
+    binary_media = os.getenv("NEXTGENSWITCH_BINARY_MEDIA", "false").strip().lower() == "true"
+    serializer = NextGenSwitchFrameSerializer(
+        NextGenSwitchSerializerParams(binary_media=binary_media)
+    )
     if stream_id:
         serializer.set_stream_id(stream_id)
 
@@ -604,9 +1162,20 @@ async def run_bot(
     if not cartesia_api_key:
         raise ValueError("Missing CARTESIA_API_KEY (env or bot_params.cartesia_api_key)")
 
-    stt = DeepgramSTTService(api_key=deepgram_api_key)
+    stt = DeepgramSTTService(
+        api_key=deepgram_api_key,
+        live_options=LiveOptions(
+            endpointing=DEEPGRAM_ENDPOINTING_MS,
+            utterance_end_ms=DEEPGRAM_UTTERANCE_END_MS,
+            interim_results=True,
+        ),
+    )
     # tts = CartesiaTTSService(api_key=cartesia_api_key, voice_id=cartesia_voice_id)
     # tts = DeepgramTTSService(api_key=deepgram_api_key, voice="aura-2-athena-en")
+    # pipecat's TTS services aggregate the streamed LLM text into sentences
+    # and send each one as soon as it ends, so synthesis of the first sentence
+    # starts while the LLM is still generating; no chunker is needed between
+    # llm and tts.
     tts = ElevenLabsTTSService(
         api_key=elevenlabs_api_key,
         voice_id=elevenlabs_voice_id,
@@ -658,8 +1227,10 @@ async def run_bot(
         ]
 
         try:
-            with APPOINTMENT_LOG_LOCK:
-                _append_row_to_workbook(log_path, sheet_name, row)
+            async with _log_lock_for(log_path):
+                log_path = await asyncio.to_thread(
+                    _append_appointment_row, log_path, sheet_name, row
+                )
         except PermissionError as exc:
             logger.exception("Appointment log write blocked (file locked): {}", log_path)
             result = {"status": "error", "reason": "file_locked", "path": log_path}
@@ -693,198 +1264,59 @@ async def run_bot(
         existing_appointment: str | None = None,
         notes: str | None = None,
     ) -> dict:
-        if not search_name and patient_name:
-            search_name = patient_name
-        if not search_phone and phone:
-            search_phone = phone
-
-        if not any([search_name, search_phone, search_date, search_time]):
-            result = {"status": "missing_search"}
-            await params.result_callback(result)
-            return result
-
-        log_path = _resolve_appointments_path()
-        if not os.path.exists(log_path):
-            result = {"status": "not_found", "reason": "missing_workbook"}
-            await params.result_callback(result)
-            return result
-
-        search_phone_norm = _normalize_phone(search_phone)
-        search_date_norm = _normalize_date(search_date)
-        if _use_single_appointments_sheet():
-            sheet_hint = _appointments_sheet_name(search_date_norm, "")
-        else:
-            sheet_hint = _safe_sheet_name(search_date_norm) if search_date_norm else ""
-
-        action_value = _cell_text(action)
-        preferred_date_norm = _normalize_date(preferred_date)
-
-        with APPOINTMENT_LOG_LOCK:
-            workbook = load_workbook(log_path)
-
-            if sheet_hint and sheet_hint in workbook.sheetnames:
-                sheet_names = [sheet_hint] + [s for s in workbook.sheetnames if s != sheet_hint]
-            else:
-                sheet_names = workbook.sheetnames
-
-            candidates = []
-            for sheet_name in sheet_names:
-                sheet = workbook[sheet_name]
-                header_map = _ensure_sheet_headers(sheet)
-
-                for row_idx in range(2, sheet.max_row + 1):
-                    row_values = {
-                        header: sheet.cell(row=row_idx, column=col_idx).value
-                        for header, col_idx in header_map.items()
-                    }
-
-                    if not any(value not in (None, "") for value in row_values.values()):
-                        continue
-
-                    row_name = _cell_text(row_values.get("Patient Name"))
-                    row_phone = _normalize_phone(_cell_text(row_values.get("Phone")))
-                    row_pref_date = _cell_text(row_values.get("Preferred Date"))
-                    row_pref_time = _cell_text(row_values.get("Preferred Time"))
-                    row_existing = _cell_text(row_values.get("Existing Appointment"))
-
-                    if search_name and not _text_matches(search_name, row_name):
-                        continue
-                    if search_phone_norm and not _phone_matches(search_phone_norm, row_phone):
-                        continue
-                    if search_date and not (
-                        _date_matches(search_date, row_pref_date)
-                        or _date_matches(search_date, row_existing)
-                    ):
-                        continue
-                    if search_time and not (
-                        _time_matches(search_time, row_pref_time)
-                        or _time_matches(search_time, row_existing)
-                    ):
-                        continue
-
-                    candidates.append((sheet_name, row_idx, row_values))
-
-            if not candidates:
-                result = {"status": "not_found"}
-                await params.result_callback(result)
-                return result
-
-            if len(candidates) > 1 and (not search_date and not search_time):
-                result = {
-                    "status": "multiple_matches",
-                    "matches": [
-                        {
-                            "sheet": s,
-                            "row": r,
-                            "patient_name": _cell_text(v.get("Patient Name")),
-                            "phone": _cell_text(v.get("Phone")),
-                            "preferred_date": _cell_text(v.get("Preferred Date")),
-                            "preferred_time": _cell_text(v.get("Preferred Time")),
-                            "existing_appointment": _cell_text(v.get("Existing Appointment")),
-                        }
-                        for (s, r, v) in candidates[:10]
-                    ],
-                }
-                await params.result_callback(result)
-                return result
-
-            sheet_name, row_idx, row_values = candidates[0]
-            sheet = workbook[sheet_name]
-            header_map = _ensure_sheet_headers(sheet)
-
-            updated_values = dict(row_values)
-            updated_values["Action"] = action_value
-
-            if not existing_appointment and action_value.lower().startswith("resched"):
-                if not _cell_text(row_values.get("Existing Appointment")):
-                    snapshot_parts = [
-                        _cell_text(row_values.get("Preferred Date")),
-                        _cell_text(row_values.get("Preferred Time")),
-                    ]
-                    snapshot = " ".join([p for p in snapshot_parts if p])
-                    if snapshot:
-                        existing_appointment = snapshot
-
-            if patient_name:
-                updated_values["Patient Name"] = patient_name
-            if patient_age_or_dob:
-                updated_values["Patient Age or DOB"] = patient_age_or_dob
-            if phone:
-                updated_values["Phone"] = _normalize_phone(phone) or phone
-            if department_or_doctor:
-                updated_values["Department or Doctor"] = department_or_doctor
-            if reason:
-                updated_values["Reason"] = reason
-            if preferred_date:
-                updated_values["Preferred Date"] = preferred_date_norm or preferred_date
-            if preferred_time:
-                updated_values["Preferred Time"] = preferred_time
-            if visit_type:
-                updated_values["Visit Type"] = visit_type
-            if existing_appointment:
-                updated_values["Existing Appointment"] = existing_appointment
-            if notes:
-                updated_values["Notes"] = notes
-
-            new_sheet_name = sheet_name
-            moved = False
-
-            if not _use_single_appointments_sheet():
-                if preferred_date and action_value.lower().startswith("resched"):
-                    new_sheet_name = _safe_sheet_name(preferred_date_norm) or sheet_name
-
-            if new_sheet_name != sheet_name:
-                target_sheet = (
-                    workbook[new_sheet_name]
-                    if new_sheet_name in workbook.sheetnames
-                    else workbook.create_sheet(new_sheet_name)
-                )
-                _ensure_sheet_headers(target_sheet)
-                target_row = [updated_values.get(header, "") for header in APPOINTMENTS_HEADERS]
-                target_sheet.append(target_row)
-                sheet.delete_rows(row_idx, 1)
-                moved = True
-            else:
-                for header, col_idx in header_map.items():
-                    if header == "Logged At":
-                        continue
-                    if header in updated_values and updated_values[header] is not None:
-                        sheet.cell(row=row_idx, column=col_idx).value = updated_values[header]
-
-            workbook.save(log_path)
-
-            result = {"status": "updated", "path": log_path, "sheet": new_sheet_name, "moved": moved}
-            await params.result_callback(result)
-            return result
+        async with _log_lock_for(_resolve_appointments_path()):
+            result = await asyncio.to_thread(
+                _update_appointment_sync,
+                action,
+                search_name=search_name,
+                search_phone=search_phone,
+                search_date=search_date,
+                search_time=search_time,
+                patient_name=patient_name,
+                patient_age_or_dob=patient_age_or_dob,
+                phone=phone,
+                department_or_doctor=department_or_doctor,
+                reason=reason,
+                preferred_date=preferred_date,
+                preferred_time=preferred_time,
+                visit_type=visit_type,
+                existing_appointment=existing_appointment,
+                notes=notes,
+            )
+        await params.result_callback(result)
+        return result
 
-    
     async def transfer_call_to(params: FunctionCallParams, forwarding_number: int) -> None:
         """Trasfer call to live agent. Call this function immidiately if user want to talk to a live agent.
 
         This is a placeholder function to demonstrate how to transfer the call
         into a live agent.
         """
-        if not forwarding_number:
-            logger.error("Forwarding number is not configured; skipping transfer for {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        
-        if not base_url:
-            logger.error("NEXTGENSWITCH_URL is not configured; unable to transfer call {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        if not api_key:
-            logger.error("NEXTGENSWITCH_API_KEY is not configured; unable to transfer call {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        if not api_secret:
-            logger.error("NEXTGENSWITCH_API_SECRET is not configured; unable to transfer call {}", call_sid)
+        missing = [
+            name
+            for name, value in (
+                ("forwarding number", forwarding_number),
+                ("NEXTGENSWITCH_URL", base_url),
+                ("NEXTGENSWITCH_API_KEY", api_key),
+                ("NEXTGENSWITCH_API_SECRET", api_secret),
+            )
+            if not value
+        ]
+        if missing:
+            logger.error(
+                "Unable to transfer call {}; not configured: {}", call_sid, ", ".join(missing)
+            )
             await params.result_callback({"status": "unsupported"})
             return
-        
 
         logger.info("Transferring call {} to  {}", call_sid, forwarding_number)
-        asyncio.create_task(transfer_call(call_sid, forwarding_number, base_url, api_key, api_secret))
+        # transfer_call waits a few seconds so the reply can be spoken first,
+        # so it runs as its own task instead of being awaited here.
+        task = asyncio.create_task(
+            transfer_call(call_sid, forwarding_number, base_url, api_key, api_secret)
+        )
+        _TRANSFER_TASKS.add(task)
+        task.add_done_callback(_TRANSFER_TASKS.discard)
         await params.result_callback({"status": "transferred"})
     
     tools = ToolsSchema(standard_tools=[close_session, log_appointment, update_appointment, transfer_call_to])
@@ -898,7 +1330,7 @@ async def run_bot(
     )
     context_aggregator = LLMContextAggregatorPair(context)
 
-    llm = OpenAILLMService(api_key=openai_api_key)
+    llm = PooledOpenAILLMService(api_key=openai_api_key)
 
     pipeline = Pipeline(
         [
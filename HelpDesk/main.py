@@ -16,12 +16,25 @@ from pipecat.transports.smallwebrtc.request_handler import (
     SmallWebRTCRequestHandler,
 )
 
-from bot import run_bot
+from bot import close_shared_clients, export_appointments_xlsx, run_bot
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 # Load environment variables
 load_dotenv(override=True)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield  # Run app
+    await small_webrtc_handler.close()
+    await close_shared_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Initialize the SmallWebRTC request handler
 small_webrtc_handler: SmallWebRTCRequestHandler = SmallWebRTCRequestHandler()
@@ -106,12 +119,6 @@ async def _websocket(websocket: WebSocket) -> None:
     )
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    yield  # Run app
-    await small_webrtc_handler.close()
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the CareDesk FastAPI server.")
     parser.add_argument(
@@ -121,12 +128,26 @@ if __name__ == "__main__":
         "--port", type=int, default=os.getenv("PORT", 7860), help="Port for HTTP server (default: 7860)"
     )
     parser.add_argument("--verbose", "-v", action="count")
+    parser.add_argument(
+        "--export-appointments",
+        action="store_true",
+        help="Rebuild the appointments workbook from the CSV or SQLite log and exit",
+    )
     args = parser.parse_args()
 
+    if args.export_appointments:
+        try:
+            print(export_appointments_xlsx())
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
     logger.remove(0)
     if args.verbose:
         logger.add(sys.stderr, level="TRACE")
     else:
         logger.add(sys.stderr, level="DEBUG")
 
-    uvicorn.run(app, host=args.host, port=args.port)
+    # libuv's loop cuts the per-frame scheduling overhead of the audio pipeline.
+    uvicorn.run(app, host=args.host, port=args.port, loop="uvloop" if uvloop else "asyncio")
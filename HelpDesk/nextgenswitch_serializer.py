@@ -15,6 +15,7 @@
 
 from __future__ import annotations
 
+import audioop
 import base64
 import json
 from typing import Optional
@@ -26,10 +27,38 @@ from pipecat.audio.utils import create_stream_resampler, pcm_to_ulaw, ulaw_to_pc
 from pipecat.frames.frames import Frame, StartFrame, AudioRawFrame, InputAudioRawFrame, TTSAudioRawFrame
 from pipecat.serializers.base_serializer import FrameSerializer
 
+try:
+    # Every inbound 20 ms media message is parsed here, so the C parser pays
+    # off; orjson accepts str and bytes alike.
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+try:
+    # SIMD base64 for the payload of every media message in both directions.
+    from pybase64 import b64decode as _b64decode
+    from pybase64 import b64encode_as_string as _b64encode_str
+except ImportError:
+    _b64decode = base64.b64decode
+
+    def _b64encode_str(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii")
+
 
 class NextGenSwitchSerializerParams(BaseModel):
     wire_sample_rate: int = 8000       # Twilio-style μ-law
     stt_sample_rate: int = 16000       # desired pipeline input rate (override if needed)
+    # Exchange raw μ-law in binary websocket frames instead of base64 inside
+    # "media" JSON. Only for NextGenSwitch deployments configured for binary
+    # media; control messages (start/stop) stay JSON text frames either way.
+    binary_media: bool = False
 
 
 class NextGenSwitchFrameSerializer(FrameSerializer):
@@ -46,11 +75,20 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         self._params = params or NextGenSwitchSerializerParams()
 
         self._stream_id: Optional[str] = None
+        # Outbound media JSON up to the payload, built once per stream.
+        self._media_prefix: Optional[str] = None
 
         self._wire_sr = int(self._params.wire_sample_rate)
+        self._binary_media = bool(self._params.binary_media)
         self._pipeline_in_sr = 0  # set in setup()
+        self._resample_in = True  # set in setup()
         self._pipeline_out_sr = 0  # optional; usually not needed for ulaw conversion
 
+        # One stateful soxr stream per direction, created once per call: the
+        # filter is designed on first use and its history carries across
+        # frames, and the stream passes audio through untouched when both
+        # rates match. The μ-law <-> PCM16 step in ulaw_to_pcm/pcm_to_ulaw is
+        # audioop's C table lookup.
         self._input_resampler = create_stream_resampler()
         self._output_resampler = create_stream_resampler()
 
@@ -59,10 +97,14 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
 
     def set_stream_id(self, stream_id: str) -> None:
         self._stream_id = stream_id
+        self._media_prefix = (
+            '{"event":"media","streamId":' + _json_dumps(stream_id) + ',"media":{"payload":"'
+        )
 
     async def setup(self, frame: StartFrame):
         # Pipecat passes pipeline configuration in StartFrame. Twilio serializer uses audio_in_sample_rate. :contentReference[oaicite:2]{index=2}
         self._pipeline_in_sr = int(frame.audio_in_sample_rate or self._params.stt_sample_rate)
+        self._resample_in = self._pipeline_in_sr != self._wire_sr
         self._pipeline_out_sr = int(frame.audio_out_sample_rate or 0)
 
         logger.info(
@@ -76,38 +118,54 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         """
         Inbound: Twilio-like 'media' with base64 μ-law payload.
         Convert μ-law->PCM16 and resample 8k->pipeline_in_sr.
+        With binary_media, a binary frame is the raw μ-law payload itself.
         """
-        try:
-            if isinstance(data, bytes):
-                data = data.decode("utf-8", errors="ignore")
-            msg = json.loads(data)
-        except Exception:
-            return None
-
-        event = msg.get("event")
-        if event != "media":
-            # ignore start/stop/connected/etc.
-            return None
+        if self._binary_media and isinstance(data, (bytes, bytearray)):
+            ulaw_bytes = bytes(data)
+        else:
+            try:
+                msg = _json_loads(data)
+            except Exception:
+                return None
+
+            event = msg.get("event")
+            if event != "media":
+                # ignore start/stop/connected/etc.
+                return None
+
+            media = msg.get("media") or {}
+            payload_b64 = media.get("payload")
+            if not payload_b64:
+                return None
+
+            try:
+                ulaw_bytes = _b64decode(payload_b64)
+            except Exception:
+                return None
 
-        media = msg.get("media") or {}
-        payload_b64 = media.get("payload")
-        if not payload_b64:
-            return None
-
-        try:
-            ulaw_bytes = base64.b64decode(payload_b64)
-        except Exception:
+        if not ulaw_bytes:
             return None
 
         # Convert 8k μ-law -> PCM at pipeline input sample rate (same as Pipecat Twilio serializer). :contentReference[oaicite:3]{index=3}
-        pcm = await ulaw_to_pcm(ulaw_bytes, self._wire_sr, self._pipeline_in_sr, self._input_resampler)
+        if self._resample_in:
+            pcm = await ulaw_to_pcm(
+                ulaw_bytes, self._wire_sr, self._pipeline_in_sr, self._input_resampler
+            )
+        else:
+            # Same rate on both sides: only the μ-law decode is needed.
+            pcm = audioop.ulaw2lin(ulaw_bytes, 2)
         if not pcm:
             return None
 
         # Optional lightweight debug every ~50 frames
         self._dbg_in_count += 1
         if self._dbg_in_count % 50 == 0:
-            logger.debug(f"[SER IN] ulaw={len(ulaw_bytes)} bytes -> pcm={len(pcm)} bytes @ {self._pipeline_in_sr}")
+            logger.debug(
+                "[SER IN] ulaw={} bytes -> pcm={} bytes @ {}",
+                len(ulaw_bytes),
+                len(pcm),
+                self._pipeline_in_sr,
+            )
 
         return InputAudioRawFrame(audio=pcm, num_channels=1, sample_rate=self._pipeline_in_sr)
 
@@ -118,7 +176,8 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         if not isinstance(frame, (AudioRawFrame, TTSAudioRawFrame)):
             return None
 
-        if not self._stream_id:
+        media_prefix = self._media_prefix
+        if media_prefix is None:
             # If you want hard-fail here, raise. For safety, just drop.
             logger.warning("serialize(): missing stream_id; dropping outbound audio")
             return None
@@ -127,21 +186,34 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         if not pcm:
             return None
 
-        ulaw_bytes = await pcm_to_ulaw(pcm, frame.sample_rate, self._wire_sr, self._output_resampler)
+        if frame.sample_rate != self._wire_sr:
+            ulaw_bytes = await pcm_to_ulaw(
+                pcm, frame.sample_rate, self._wire_sr, self._output_resampler
+            )
+        else:
+            ulaw_bytes = audioop.lin2ulaw(pcm, 2)
         if not ulaw_bytes:
             return None
 
-        payload = base64.b64encode(ulaw_bytes).decode("utf-8")
-
         self._dbg_out_count += 1
         if self._dbg_out_count % 50 == 0:
             logger.debug(
-                f"[SER OUT] pcm={len(pcm)} bytes @ {frame.sample_rate} -> ulaw={len(ulaw_bytes)} bytes @ {self._wire_sr}"
+                "[SER OUT] pcm={} bytes @ {} -> ulaw={} bytes @ {}",
+                len(pcm),
+                frame.sample_rate,
+                len(ulaw_bytes),
+                self._wire_sr,
             )
 
-        answer = {
-            "event": "media",
-            "streamId": self._stream_id,  # your protocol uses streamId
-            "media": {"payload": payload},
-        }
-        return json.dumps(answer)
+        if self._binary_media:
+            # Sent as a binary websocket frame, without base64 or JSON.
+            return ulaw_bytes
+
+        # Base64 output is plain ASCII, so it can be spliced into the JSON
+        # string without escaping.
+        payload = _b64encode_str(ulaw_bytes)
+
+        # Equivalent to {"event": "media", "streamId": ..., "media": {"payload": ...}}.
+        # Kept as str: bytes would go out as a binary websocket frame, which
+        # JSON peers do not read.
+        return media_prefix + payload + '"}}'
@@ -1,9 +1,11 @@
 import os
 
 import asyncio
+from contextvars import ContextVar
+from functools import lru_cache, partial
+from types import MappingProxyType
 from dotenv import load_dotenv
 from loguru import logger
-from pipecat.audio.vad.silero import SileroVADAnalyzer
 from pipecat.frames.frames import LLMRunFrame
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
@@ -12,23 +14,22 @@ from pipecat.processors.aggregators.llm_context import LLMContext
 from pipecat.processors.aggregators.llm_response_universal import LLMContextAggregatorPair
 from pipecat.services.google.gemini_live.llm import GeminiLiveLLMService
 from pipecat.transports.base_transport import TransportParams
-from pipecat.transports.smallwebrtc.transport import SmallWebRTCTransport
-from pipecat.transports.websocket.fastapi import (
-    FastAPIWebsocketParams,
-    FastAPIWebsocketTransport,
-)
 from pipecat.adapters.schemas.tools_schema import ToolsSchema
 from pipecat.services.llm_service import FunctionCallParams
 
-from nextgenswitch_serializer import NextGenSwitchFrameSerializer
 from transfer_call import transfer_call
+from vad import SharedSileroVADAnalyzer
 
 load_dotenv(override=True)
 
+
 GREETING_INSTRUCTION = "Start by greeting the user warmly and introducing yourself."
 
-SYSTEM_INSTRUCTION = f"""
-You are a professional virtual receptionist for {{"Infosoftbd Solutions"}}.
+# Sent once per call as a text part of the Gemini Live session setup message,
+# which goes out as JSON over the websocket. The Live API has no cached-content
+# handle and no bytes field, so the plain str is what the client serializes.
+SYSTEM_INSTRUCTION = """
+You are a professional virtual receptionist for {"Infosoftbd Solutions"}.
 
 You answer incoming phone calls and help callers quickly and politely.
 Your job is to greet the caller, understand what they need, and either:
@@ -66,7 +67,7 @@ CORE CALL FLOW:
 4) Before ending the call, confirm the next step and say goodbye politely.
 
 GREETING TEMPLATE:
-- "Hello, thank you for calling {{"Infosoftbd Solutions"}}. How may I help you today?"
+- "Hello, thank you for calling {"Infosoftbd Solutions"}. How may I help you today?"
 
 ROUTING INTENT (COMMON REASONS):
 - Sales or new service inquiry
@@ -119,26 +120,149 @@ Before ending, always confirm the next step.
 Examples:
 - "Thank you. I will pass this message to our team and someone will call you back soon."
 - "I am connecting you to the right department now."
-- "Thanks for calling {{"Infosoftbd Solutions"}}. Have a nice day."
+- "Thanks for calling {"Infosoftbd Solutions"}. Have a nice day."
 """
 
 
+# Environment defaults for the per-call settings. load_dotenv has already run
+# above, so they are read once here rather than on every call.
+_ENV_CONFIG = MappingProxyType(
+    {
+        "google_api_key": os.getenv("GOOGLE_API_KEY"),
+        "forwarding_number": os.getenv("FORWARDING_NUMBER"),
+        "base_url": os.getenv("NEXTGENSWITCH_URL"),
+        "api_key": os.getenv("NEXTGENSWITCH_API_KEY"),
+        "api_secret": os.getenv("NEXTGENSWITCH_API_SECRET"),
+    }
+)
+
+# bot_params key -> run_bot setting.
+_PARAM_BINDINGS = (
+    ("prompt", "system_instruction"),
+    ("google_api_key", "google_api_key"),
+    ("greetings", "greeting_instruction"),
+    ("forwarding_number", "forwarding_number"),
+    ("nexgenswitch_api_url", "base_url"),
+    ("nexgenswitch_api_key", "api_key"),
+    ("nextgenswitch_api_secret", "api_secret"),
+)
+
+
+# Per-call settings read by the tool functions below. run_bot sets it before
+# the pipeline starts, and every task the pipeline spawns inherits a copy, so
+# the tools and their schema can live at module scope.
+_CALL_CONFIG: ContextVar[dict] = ContextVar("receptionist_call_config")
+
+# The event loop only keeps weak references to tasks, so pending transfers are
+# held here until they finish.
+_TRANSFER_TASKS: set[asyncio.Task] = set()
+
+
+async def close_session(params: FunctionCallParams) -> dict:
+    """Gracefully close the active transport session. the function is called by the LLM when it decides to end the conversation."""
+    config = _CALL_CONFIG.get()
+    closing = config["closing"]
+    # The model can call this again while the first close is still running.
+    if closing.is_set():
+        return {"status": "closing"}
+    closing.set()
+
+    close_callback = config["close_callback"]
+    logger.info("Closing transport session")
+    if close_callback:
+        await close_callback()
+    else:
+        logger.warning("No close callback available for this session")
+    logger.info("Transport session closed")
+    return {"status": "closed"}
+
+
+async def transfer_call_into_live_agent(params: FunctionCallParams) -> None:
+    """Trasfer call to live agent. Call this function immidiately if user want to talk to a live agent.
+
+    This is a placeholder function to demonstrate how to transfer the call
+    into a live agent.
+    """
+    config = _CALL_CONFIG.get()
+    call_sid = config["call_sid"]
+    forwarding_number = config["forwarding_number"]
+    base_url = config["base_url"]
+    api_key = config["api_key"]
+    api_secret = config["api_secret"]
+
+    logger.info("Transferring call {} to live agent {}", call_sid, forwarding_number)
+    # transfer_call waits a few seconds so the reply can be spoken first,
+    # so it runs as its own task instead of being awaited here.
+    task = asyncio.create_task(
+        transfer_call(call_sid, forwarding_number, base_url, api_key, api_secret)
+    )
+    _TRANSFER_TASKS.add(task)
+    task.add_done_callback(_TRANSFER_TASKS.discard)
+    await params.result_callback({"status": "transferred"})
+
+
+_TOOLS = ToolsSchema(standard_tools=[close_session, transfer_call_into_live_agent])
+# Offered instead of _TOOLS when the call cannot be transferred, so the model
+# never picks a tool that can only fail.
+_TOOLS_WITHOUT_TRANSFER = ToolsSchema(standard_tools=[close_session])
+
+
+# Transport event handlers. run_bot binds each call's task and logger with
+# functools.partial instead of defining new closures per call.
+async def _on_client_connected(task: PipelineTask, call_logger, transport, client):
+    call_logger.info("Pipecat Client connected")
+    # Kick off the conversation.
+    await task.queue_frames([LLMRunFrame()])
+
+
+async def _on_client_disconnected(task: PipelineTask, call_logger, transport, client):
+    call_logger.info("Pipecat Client disconnected")
+    if not task.has_finished():
+        await task.cancel()
+
+
+# Transport modules are imported on first use: a process that only serves
+# websocket calls never loads aiortc, and vice versa. The helpers are cached so
+# later calls skip the import machinery entirely.
+@lru_cache(maxsize=None)
+def _import_webrtc_transport():
+    from pipecat.transports.smallwebrtc.transport import SmallWebRTCTransport
+
+    return SmallWebRTCTransport
 
-def _build_webrtc_transport(webrtc_connection: object) -> SmallWebRTCTransport:
+
+@lru_cache(maxsize=None)
+def _import_websocket_transport():
+    from pipecat.transports.websocket.fastapi import (
+        FastAPIWebsocketParams,
+        FastAPIWebsocketTransport,
+    )
+
+    from nextgenswitch_serializer import NextGenSwitchFrameSerializer
+
+    return FastAPIWebsocketTransport, FastAPIWebsocketParams, NextGenSwitchFrameSerializer
+
+
+def _build_webrtc_transport(webrtc_connection: object):
+    SmallWebRTCTransport = _import_webrtc_transport()
     return SmallWebRTCTransport(
         webrtc_connection=webrtc_connection,
         params=TransportParams(
             audio_in_enabled=True,
             audio_out_enabled=True,
-            vad_analyzer=SileroVADAnalyzer(),
-            audio_out_10ms_chunks=2,
+            vad_analyzer=SharedSileroVADAnalyzer(),
+            audio_out_10ms_chunks=1,
         ),
     )
 
 
-def _build_websocket_transport(
-    websocket: object, stream_id: str | None = None
-) -> FastAPIWebsocketTransport:
+def _build_websocket_transport(websocket: object, stream_id: str | None = None):
+    (
+        FastAPIWebsocketTransport,
+        FastAPIWebsocketParams,
+        NextGenSwitchFrameSerializer,
+    ) = _import_websocket_transport()
+
     serializer = NextGenSwitchFrameSerializer()
     if stream_id:
         serializer.set_stream_id(stream_id)
@@ -148,7 +272,7 @@ def _build_websocket_transport(
             audio_in_enabled=True,
             audio_out_enabled=True,
             add_wav_header=False,
-            vad_analyzer=SileroVADAnalyzer(),
+            vad_analyzer=SharedSileroVADAnalyzer(),
             serializer=serializer,
         ),
     )
@@ -171,94 +295,76 @@ async def run_bot(
         if webrtc_connection
         else _build_websocket_transport(websocket, stream_id=stream_id)
     )
-    close_callback = None
+    call_logger = logger.bind(call_sid=call_sid)
+
     if webrtc_connection:
-        if hasattr(webrtc_connection, "disconnect"):
-            close_callback = webrtc_connection.disconnect
-        elif hasattr(webrtc_connection, "close"):
-            close_callback = webrtc_connection.close
-    elif websocket:
+        close_callback = getattr(webrtc_connection, "disconnect", None) or getattr(
+            webrtc_connection, "close", None
+        )
+    else:
         close_callback = websocket.close
     
-    system_instruction = SYSTEM_INSTRUCTION
-    greeting_instruction = GREETING_INSTRUCTION
-    google_api_key = os.getenv("GOOGLE_API_KEY")
-    forwarding_number = os.getenv("FORWARDING_NUMBER")
-    base_url = os.getenv("NEXTGENSWITCH_URL")
-    api_key = os.getenv("NEXTGENSWITCH_API_KEY")
-    api_secret = os.getenv("NEXTGENSWITCH_API_SECRET")
-
-    if bot_params and "prompt" in bot_params:
-        system_instruction = bot_params["prompt"]
-
-    if bot_params and "google_api_key" in bot_params:
-        google_api_key = bot_params["google_api_key"]
-
-    if bot_params and "greetings" in bot_params:
-        greeting_instruction = bot_params["greetings"]
-
-    if bot_params and "forwarding_number" in bot_params:
-        forwarding_number = bot_params["forwarding_number"]
-    
-    if bot_params and "nexgenswitch_api_url" in bot_params:
-        base_url = bot_params["nexgenswitch_api_url"]
-
-    if bot_params and "nexgenswitch_api_key" in bot_params:
-        api_key = bot_params["nexgenswitch_api_key"]
-
-    if bot_params and "nextgenswitch_api_secret" in bot_params:
-        api_secret = bot_params["nextgenswitch_api_secret"]
-
-    async def close_session(params: FunctionCallParams) -> dict:
-        """Gracefully close the active transport session. the function is called by the LLM when it decides to end the conversation."""
-        logger.info("Closing transport session")
-        if close_callback:
-            await close_callback()
-        else:
-            logger.warning("No close callback available for this session")
-        logger.info("Transport session closed")
-        return {"status": "closed"}
-
-    async def transfer_call_into_live_agent(params: FunctionCallParams) -> None:
-        """Trasfer call to live agent. Call this function immidiately if user want to talk to a live agent.
-
-        This is a placeholder function to demonstrate how to transfer the call
-        into a live agent.
-        """
-        if not forwarding_number:
-            logger.error("Forwarding number is not configured; skipping live agent transfer for {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        
-        if not base_url:
-            logger.error("NEXTGENSWITCH_URL is not configured; unable to transfer call {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        if not api_key:
-            logger.error("NEXTGENSWITCH_API_KEY is not configured; unable to transfer call {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        if not api_secret:
-            logger.error("NEXTGENSWITCH_API_SECRET is not configured; unable to transfer call {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        
-
-        logger.info("Transferring call {} to live agent {}", call_sid, forwarding_number)
-        asyncio.create_task(transfer_call(call_sid, forwarding_number, base_url, api_key, api_secret))
-        await params.result_callback({"status": "transferred"})
-
-    tools = ToolsSchema(standard_tools=[close_session, transfer_call_into_live_agent])
+    config = {
+        "system_instruction": SYSTEM_INSTRUCTION,
+        "greeting_instruction": GREETING_INSTRUCTION,
+        **_ENV_CONFIG,
+    }
+    if bot_params:
+        config.update(
+            {dst: bot_params[src] for src, dst in _PARAM_BINDINGS if src in bot_params}
+        )
+
+    system_instruction = config["system_instruction"]
+    greeting_instruction = config["greeting_instruction"]
+    google_api_key = config["google_api_key"]
+    forwarding_number = config["forwarding_number"]
+    base_url = config["base_url"]
+    api_key = config["api_key"]
+    api_secret = config["api_secret"]
+
+    missing = [
+        name
+        for name, value in (
+            ("forwarding number", forwarding_number),
+            ("NEXTGENSWITCH_URL", base_url),
+            ("NEXTGENSWITCH_API_KEY", api_key),
+            ("NEXTGENSWITCH_API_SECRET", api_secret),
+        )
+        if not value
+    ]
+    if missing:
+        call_logger.warning(
+            "Live agent transfer disabled for this call; not configured: {}", ", ".join(missing)
+        )
+
+    _CALL_CONFIG.set(
+        {
+            "close_callback": close_callback,
+            "closing": asyncio.Event(),
+            "call_sid": call_sid,
+            "forwarding_number": forwarding_number,
+            "base_url": base_url,
+            "api_key": api_key,
+            "api_secret": api_secret,
+        }
+    )
 
+    # The Live session is opened when the pipeline starts. Its setup message
+    # carries this call's prompt and tool list, so it cannot be opened early.
     llm = GeminiLiveLLMService(
         api_key=google_api_key,
         voice_id="Puck",  # Aoede, Charon, Fenrir, Kore, Puck
         transcribe_user_audio=True,
         transcribe_model_audio=True,
         system_instruction=system_instruction,
-        tools=tools,
+        tools=_TOOLS_WITHOUT_TRANSFER if missing else _TOOLS,
     )
 
+    # Gemini Live only produces audio in reply to a client turn, so this one-line
+    # seed is what LLMRunFrame sends on connect to get the greeting spoken. An
+    # assistant-role prefill would not be voiced, and there is no TTS stage to
+    # speak a canned greeting. The context is built fresh for every call since
+    # the aggregators append each turn to it in place.
     context = LLMContext(
         [
             {
@@ -279,7 +385,8 @@ async def run_bot(
         ]
     )
     llm.register_direct_function(close_session, cancel_on_interruption=False)
-    llm.register_direct_function(transfer_call_into_live_agent, cancel_on_interruption=False)
+    if not missing:
+        llm.register_direct_function(transfer_call_into_live_agent, cancel_on_interruption=False)
 
     task = PipelineTask(
         pipeline,
@@ -289,17 +396,16 @@ async def run_bot(
         ),
     )
 
-    @transport.event_handler("on_client_connected")
-    async def on_client_connected(transport, client):
-        logger.info("Pipecat Client connected")
-        # Kick off the conversation.
-        await task.queue_frames([LLMRunFrame()])
-
-    @transport.event_handler("on_client_disconnected")
-    async def on_client_disconnected(transport, client):
-        logger.info("Pipecat Client disconnected")
-        await task.cancel()
+    transport.add_event_handler(
+        "on_client_connected", partial(_on_client_connected, task, call_logger)
+    )
+    transport.add_event_handler(
+        "on_client_disconnected", partial(_on_client_disconnected, task, call_logger)
+    )
 
+    # One runner per call. It only wraps task.run() with cleanup for this task,
+    # so sharing one across calls would save a single small object and tie
+    # every call to the runner of the loop that happened to build it.
     runner = PipelineRunner(handle_sigint=False)
 
     await runner.run(task)
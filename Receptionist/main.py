@@ -17,16 +17,54 @@ from pipecat.transports.smallwebrtc.request_handler import (
 )
 
 from bot import run_bot
+from transfer_call import close_http_session
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
+try:
+    import httptools
+except ImportError:
+    httptools = None
+
+try:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the handler
+    # in _initialize_websocket covers both parsers.
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
 # Load environment variables
 load_dotenv(override=True)
 
-app = FastAPI()
+
+def _configure_logging(level: str) -> None:
+    # enqueue=True hands formatting and the stderr write to loguru's worker
+    # thread so logging never blocks the event loop that is pumping audio frames.
+    logger.remove()
+    logger.add(sys.stderr, level=level, enqueue=True, backtrace=False, diagnose=False)
+
+
+# The sink is configured here, by the entrypoint, so importing bot leaves the
+# global logger alone. uvicorn imports this module as main:app.
+_configure_logging(os.getenv("LOG_LEVEL", "DEBUG"))
 
 # Initialize the SmallWebRTC request handler
 small_webrtc_handler: SmallWebRTCRequestHandler = SmallWebRTCRequestHandler()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield  # Run app
+    await small_webrtc_handler.close()
+    await close_http_session()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
 async def _initialize_websocket(websocket: WebSocket) -> Dict[str, Any]:
     await websocket.accept()
     start_iterator = websocket.iter_text()
@@ -40,7 +78,7 @@ async def _initialize_websocket(websocket: WebSocket) -> Dict[str, Any]:
         raise WebSocketDisconnect(code=1002) from exc
 
     try:
-        call_data = json.loads(raw_payload)
+        call_data = _json_loads(raw_payload)
     except json.JSONDecodeError as exc:
         logger.error("Invalid JSON payload from websocket: {}", raw_payload)
         await websocket.close(code=1003)
@@ -66,7 +104,7 @@ async def offer(request: SmallWebRTCRequest, background_tasks: BackgroundTasks):
 
 @app.patch("/api/offer")
 async def ice_candidate(request: SmallWebRTCPatchRequest):
-    logger.debug(f"Received patch request: {request}")
+    logger.debug("Received patch request: {}", request)
     await small_webrtc_handler.handle_patch_request(request)
     return {"status": "success"}
 
@@ -106,12 +144,6 @@ async def _websocket(websocket: WebSocket) -> None:
     )
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    yield  # Run app
-    await small_webrtc_handler.close()
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the Receptionist HTTP server.")
     parser.add_argument(
@@ -120,13 +152,28 @@ if __name__ == "__main__":
     parser.add_argument(
         "--port", type=int, default=os.getenv("PORT", 7860), help="Port for HTTP server (default: 7860)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of worker processes (default: WEB_CONCURRENCY or 1)",
+    )
     parser.add_argument("--verbose", "-v", action="count")
     args = parser.parse_args()
 
-    logger.remove(0)
     if args.verbose:
-        logger.add(sys.stderr, level="TRACE")
-    else:
-        logger.add(sys.stderr, level="DEBUG")
-
-    uvicorn.run(app, host=args.host, port=args.port)
+        _configure_logging("TRACE")
+
+    # libuv's loop cuts the per-frame scheduling overhead of the audio pipeline,
+    # and httptools parses the HTTP/upgrade requests in C.
+    # Extra workers are separate processes that import the app by name. WebRTC
+    # signalling state lives in each worker, so the PATCH that carries ICE
+    # candidates must reach the worker that answered the offer.
+    uvicorn.run(
+        "main:app" if args.workers > 1 else app,
+        host=args.host,
+        port=args.port,
+        loop="uvloop" if uvloop else "asyncio",
+        http="httptools" if httptools else "h11",
+        workers=args.workers,
+    )
@@ -32,6 +32,10 @@ class NextGenSwitchSerializerParams(BaseModel):
     stt_sample_rate: int = 16000       # desired pipeline input rate (override if needed)
 
 
+# Read-only defaults shared by every serializer that is built without params.
+_DEFAULT_PARAMS = NextGenSwitchSerializerParams()
+
+
 class NextGenSwitchFrameSerializer(FrameSerializer):
     """
     Serializer compatible with FastAPIWebsocketTransport.
@@ -43,7 +47,7 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
     """
 
     def __init__(self, params: Optional[NextGenSwitchSerializerParams] = None):
-        self._params = params or NextGenSwitchSerializerParams()
+        self._params = params or _DEFAULT_PARAMS
 
         self._stream_id: Optional[str] = None
 
@@ -51,6 +55,9 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         self._pipeline_in_sr = 0  # set in setup()
         self._pipeline_out_sr = 0  # optional; usually not needed for ulaw conversion
 
+        # Everything else here is per-call state: the stream id and one
+        # stateful resampler per direction. Construction is a handful of
+        # attribute writes, so instances are not pooled or shared.
         self._input_resampler = create_stream_resampler()
         self._output_resampler = create_stream_resampler()
 
@@ -1,15 +1,76 @@
 """Utilities for transferring an active call to a live agent."""
 
 import asyncio
-from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
+from urllib.parse import quote_plus
 
-import requests
+import aiohttp
 from loguru import logger
 
 
 XML_TEMPLATE = """<?xml version="1.0"?>\n<response>\n    <dial>{number}</dial>\n</response>"""
 
+# The PUT body is the form-encoded XML, and only the dialled number varies, so
+# everything around it is encoded once here. The result is byte-for-byte what
+# urlencode({"responseXml": XML_TEMPLATE.format(number=...)}) produces.
+_XML_BEFORE, _XML_AFTER = XML_TEMPLATE.split("{number}")
+_FORM_PREFIX = ("responseXml=" + quote_plus(_XML_BEFORE)).encode("ascii")
+_FORM_SUFFIX = quote_plus(_XML_AFTER).encode("ascii")
+
+
+def _form_body(dial_number) -> bytes:
+    return _FORM_PREFIX + quote_plus(str(dial_number)).encode("ascii") + _FORM_SUFFIX
+
+
+# The base URL and credentials come from the same env or bot_params values on
+# every call, so the URL prefix and request headers are built once per value.
+@lru_cache(maxsize=16)
+def _call_url_prefix(base_url: str) -> str:
+    return f"{base_url.rstrip('/')}/call/"
+
+
+@lru_cache(maxsize=16)
+def _request_headers(api_key: str, api_secret: str) -> Mapping[str, str]:
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    if api_key:
+        headers["X-Authorization"] = api_key
+    if api_secret:
+        headers["X-Authorization-Secret"] = api_secret
+    return MappingProxyType(headers)
+
+# One keep-alive session for the NextGenSwitch API, created on first use inside
+# the running loop, so later transfers skip the TCP and TLS handshakes.
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+def _http_session() -> aiohttp.ClientSession:
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300)
+        )
+    return _SESSION
+
+
+async def close_http_session() -> None:
+    """Close the pooled NextGenSwitch HTTP session. Meant for server shutdown."""
+    global _SESSION
+    if _SESSION is not None:
+        await _SESSION.close()
+        _SESSION = None
+
+
+async def _preconnect(session: aiohttp.ClientSession, base_url: str, timeout: float) -> None:
+    # Any response leaves a warm keep-alive connection in the pool; the status
+    # of this probe does not matter.
+    try:
+        async with session.head(base_url, timeout=aiohttp.ClientTimeout(total=timeout)):
+            pass
+    except Exception as exc:
+        logger.debug("Transfer preconnect to {} failed: {}", base_url, exc)
+
 
 async def transfer_call(call_sid: str, dial_number: str, base_url: str, api_key: str, api_secret: str, transfer_delay: float = 5.0, timeout: int = 10) -> None:
     """Transfer an active call to the supplied number."""
@@ -18,45 +79,43 @@ async def transfer_call(call_sid: str, dial_number: str, base_url: str, api_key:
         logger.error("NEXTGENSWITCH_URL is not configured; unable to transfer call {}", call_sid)
         return
 
+    session = _http_session()
     if transfer_delay:
         logger.debug("Waiting {} seconds before transferring call {}", transfer_delay, call_sid)
+        # Open the TCP and TLS connection during the wait so the PUT goes out
+        # as soon as the delay ends.
+        preconnect = asyncio.create_task(_preconnect(session, base_url, transfer_delay))
         await asyncio.sleep(transfer_delay)
+        await preconnect
 
-    url = f"{base_url.rstrip('/')}/call/{call_sid}"
-    headers = {}
-    if api_key:
-        headers["X-Authorization"] = api_key
-    if api_secret:
-        headers["X-Authorization-Secret"] = api_secret
-
-    payload = {"responseXml": XML_TEMPLATE.format(number=dial_number)}
+    url = f"{_call_url_prefix(base_url)}{call_sid}"
+    headers = _request_headers(api_key, api_secret)
     logger.info("Transferring call {} to {} via {}", call_sid, dial_number, url)
 
     try:
-        response = await asyncio.to_thread(
-            requests.put,
+        async with session.put(
             url,
             headers=headers,
-            data=payload,
-            timeout=timeout,
-        )
+            data=_form_body(dial_number),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            ok = response.ok
+            status = response.status
+            text = await response.text()
     except Exception as exc:
         logger.exception("Failed to transfer call {}: {}", call_sid, exc)
         return
 
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    if response.ok:
+    if ok:
         logger.info(
-            "Call {} transferred successfully (status {} at {})",
+            "Call {} transferred successfully (status {})",
             call_sid,
-            response.status_code,
-            timestamp,
+            status,
         )
     else:
         logger.error(
-            "Call {} transfer failed (status {} at {}): {}",
+            "Call {} transfer failed (status {}): {}",
             call_sid,
-            response.status_code,
-            timestamp,
-            response.text,
+            status,
+            text,
         )
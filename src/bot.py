@@ -2,10 +2,8 @@ import os
 import re
 import json
 import asyncio
-from dataclasses import dataclass
-from dotenv import load_dotenv
+from dataclasses import dataclass, replace
 from loguru import logger
-from pipecat.audio.vad.silero import SileroVADAnalyzer
 from pipecat.frames.frames import (
     DataFrame,
     InterimTranscriptionFrame,
@@ -35,8 +33,7 @@ from tools.transfer_call import transfer_call
 from llm_service import get_llm_service
 from stt_service import get_stt_service
 from tts_service import get_tts_service
-
-load_dotenv(override=True)
+from vad import SharedSileroVADAnalyzer
 
 GREETING_INSTRUCTION = "Start by greeting the user warmly and introducing yourself."
 
@@ -57,51 +54,133 @@ Your output will be converted to speech (text-to-speech). You MUST respond in pl
 Write naturally as if you're speaking out loud."""
 
 
+@dataclass(slots=True, frozen=True)
+class BotConfig:
+    """Per-call settings: environment defaults overridden by the agent's bot_params."""
+
+    system_instruction: str
+    greeting_instruction: str
+    closing_announcement: str | None
+    forwarding_number: str | None
+    base_url: str | None
+    api_key: str | None
+    api_secret: str | None
+
+    @classmethod
+    def from_env(cls) -> "BotConfig":
+        env = os.environ
+        return cls(
+            system_instruction=SYSTEM_INSTRUCTION,
+            greeting_instruction=GREETING_INSTRUCTION,
+            closing_announcement=env.get("CLOSING_ANNOUNCEMENT", CLOSING_ANNOUNCEMENT),
+            forwarding_number=env.get("FORWARDING_NUMBER"),
+            base_url=env.get("NEXTGENSWITCH_URL"),
+            api_key=env.get("NEXTGENSWITCH_API_KEY"),
+            api_secret=env.get("NEXTGENSWITCH_API_SECRET"),
+        )
+
+    def override(self, bot_params: dict | None) -> "BotConfig":
+        # An empty prompt or greeting in the agent file falls back to the
+        # default; the other keys override whenever they are present.
+        params = bot_params
+        if not params:
+            return self
+        return replace(
+            self,
+            system_instruction=params.get("prompt") or self.system_instruction,
+            greeting_instruction=params.get("greetings") or self.greeting_instruction,
+            closing_announcement=params.get("closing_announcement", self.closing_announcement),
+            forwarding_number=params.get("forwarding_number", self.forwarding_number),
+            base_url=params.get("nexgenswitch_api_url", self.base_url),
+            api_key=params.get("nexgenswitch_api_key", self.api_key),
+            api_secret=params.get("nextgenswitch_api_secret", self.api_secret),
+        )
+
+
+# Environment defaults are read once at import (main.py has loaded .env); each call
+# only applies its agent's bot_params on top.
+_DEFAULT_CONFIG = BotConfig.from_env()
+
+
+def build_config(bot_params: dict | None) -> BotConfig:
+    """Return the environment defaults with the agent's bot_params applied."""
+    return _DEFAULT_CONFIG.override(bot_params)
+
+
 class TranscriptProcessor(FrameProcessor):
     """Processor that captures transcripts and sends them via callback."""
     
-    def __init__(self, get_callback, role: str):
+    def __init__(self, callback_ref: list, role: str):
         super().__init__()
-        self._get_callback = get_callback  # Function that returns current callback
+        # One-slot list shared with run_bot, which fills it once the client
+        # connects; reading it is a plain index instead of a call per frame.
+        self._callback_ref = callback_ref
         self._role = role
-        self._bot_text_buffer = ""
+        # Frame class -> handler (or None), filled on first sight of each class.
+        # Every frame in the pipeline passes through here, so one dict probe
+        # replaces the isinstance chain; subclasses such as LLMTextFrame are
+        # resolved once with the same precedence as the chain.
+        self._handlers = {}
+
+    def _resolve_handler(self, frame_type):
+        if issubclass(frame_type, TranscriptionFrame):
+            handler = self._on_final_transcript
+        elif issubclass(frame_type, InterimTranscriptionFrame):
+            handler = self._on_interim_transcript
+        elif issubclass(frame_type, TextFrame) and self._role == "bot":
+            handler = self._on_bot_text
+        else:
+            handler = None
+        self._handlers[frame_type] = handler
+        return handler
+
+    async def _on_final_transcript(self, frame, callback):
+        # Final user transcription
+        logger.debug(f"User final transcript: {frame.text}")
+        await callback({
+            "type": "transcript",
+            "role": "user",
+            "text": frame.text,
+            "final": True
+        })
+
+    async def _on_interim_transcript(self, frame, callback):
+        # Interim user transcription
+        logger.debug(f"User interim transcript: {frame.text}")
+        await callback({
+            "type": "transcript",
+            "role": "user",
+            "text": frame.text,
+            "final": False
+        })
+
+    async def _on_bot_text(self, frame, callback):
+        # Bot text output (LLM response)
+        if frame.text:
+            logger.debug(f"Bot transcript: {frame.text}")
+            await callback({
+                "type": "transcript",
+                "role": "bot",
+                "text": frame.text,
+                "final": False
+            })
     
     async def process_frame(self, frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
         
-        callback = self._get_callback()  # Get current callback
+        callback = self._callback_ref[0]  # Get current callback
+        if callback is None:
+            # Nothing to report to until the client connects.
+            await self.push_frame(frame, direction)
+            return
         
-        if isinstance(frame, TranscriptionFrame):
-            # Final user transcription
-            if callback:
-                logger.debug(f"User final transcript: {frame.text}")
-                await callback({
-                    "type": "transcript",
-                    "role": "user",
-                    "text": frame.text,
-                    "final": True
-                })
-        elif isinstance(frame, InterimTranscriptionFrame):
-            # Interim user transcription
-            if callback:
-                logger.debug(f"User interim transcript: {frame.text}")
-                await callback({
-                    "type": "transcript",
-                    "role": "user",
-                    "text": frame.text,
-                    "final": False
-                })
-        elif isinstance(frame, TextFrame) and self._role == "bot":
-            # Bot text output (LLM response)
-            if callback and frame.text:
-                self._bot_text_buffer += frame.text
-                logger.debug(f"Bot transcript: {frame.text}")
-                await callback({
-                    "type": "transcript",
-                    "role": "bot",
-                    "text": frame.text,
-                    "final": False
-                })
+        frame_type = type(frame)
+        try:
+            handler = self._handlers[frame_type]
+        except KeyError:
+            handler = self._resolve_handler(frame_type)
+        if handler:
+            await handler(frame, callback)
         
         await self.push_frame(frame, direction)
 
@@ -136,13 +215,18 @@ class CloseSessionProcessor(FrameProcessor):
 
 
 
+# The event loop only keeps weak references to tasks, so pending transfers are
+# held here until they finish.
+_TRANSFER_TASKS: set[asyncio.Task] = set()
+
+
 def _build_webrtc_transport(webrtc_connection: object) -> SmallWebRTCTransport:
     return SmallWebRTCTransport(
         webrtc_connection=webrtc_connection,
         params=TransportParams(
             audio_in_enabled=True,
             audio_out_enabled=True,
-            vad_analyzer=SileroVADAnalyzer(),
+            vad_analyzer=SharedSileroVADAnalyzer(),
             audio_out_10ms_chunks=2,
         ),
     )
@@ -160,7 +244,7 @@ def _build_websocket_transport(
             audio_in_enabled=True,
             audio_out_enabled=True,
             add_wav_header=False,
-            vad_analyzer=SileroVADAnalyzer(),
+            vad_analyzer=SharedSileroVADAnalyzer(),
             serializer=serializer,
         ),
     )
@@ -172,6 +256,7 @@ async def run_bot(
     stream_id=None,
     call_sid=None,
     bot_params=None,
+    config: BotConfig | None = None,
 ):
     if webrtc_connection and websocket:
         raise ValueError("Provide either webrtc_connection or websocket, not both.")
@@ -195,31 +280,25 @@ async def run_bot(
     
 
 
-    system_instruction = SYSTEM_INSTRUCTION
-    greeting_instruction = GREETING_INSTRUCTION
-    closing_announcement = os.getenv("CLOSING_ANNOUNCEMENT", CLOSING_ANNOUNCEMENT)
-    default_forwarding_number = os.getenv("FORWARDING_NUMBER")
-    base_url = os.getenv("NEXTGENSWITCH_URL")
-    api_key = os.getenv("NEXTGENSWITCH_API_KEY")
-    api_secret = os.getenv("NEXTGENSWITCH_API_SECRET")
-
-    # Load from bot_params (agent config from JSON file)
-    if bot_params:
-        if "prompt" in bot_params and bot_params["prompt"]:
-            system_instruction = bot_params["prompt"]
-        if "greetings" in bot_params and bot_params["greetings"]:
-            greeting_instruction = bot_params["greetings"]
-        if "closing_announcement" in bot_params:
-            closing_announcement = bot_params["closing_announcement"]
-        if "forwarding_number" in bot_params:
-            default_forwarding_number = bot_params["forwarding_number"]
-        if "nexgenswitch_api_url" in bot_params:
-            base_url = bot_params["nexgenswitch_api_url"]
-        if "nexgenswitch_api_key" in bot_params:
-            api_key = bot_params["nexgenswitch_api_key"]
-        if "nextgenswitch_api_secret" in bot_params:
-            api_secret = bot_params["nextgenswitch_api_secret"]
-    
+    # Callers that already built the config from the same bot_params pass it
+    # in; bot_params is still needed to pick the STT, TTS and LLM services.
+    if config is None:
+        config = build_config(bot_params)
+    base_url = config.base_url
+    api_key = config.api_key
+    api_secret = config.api_secret
+    # The NextGenSwitch settings are fixed for the call, so they are checked once
+    # here; only the number the model passes varies per transfer.
+    transfer_missing = [
+        name
+        for name, value in (
+            ("NEXTGENSWITCH_URL", base_url),
+            ("NEXTGENSWITCH_API_KEY", api_key),
+            ("NEXTGENSWITCH_API_SECRET", api_secret),
+        )
+        if not value
+    ]
+
     logger.info(f"Bot starting with agent: {bot_params.get('agent') if bot_params else 'default'}")
 
     async def close_session(params: FunctionCallParams) -> dict:
@@ -232,7 +311,7 @@ async def run_bot(
             await close_callback()
             logger.info("Transport session closed")
             return {"status": "closed"}
-        announcement = (closing_announcement or "").strip()
+        announcement = (config.closing_announcement or "").strip()
         if announcement:
             await tts.queue_frame(TTSSpeakFrame(announcement))
         await tts.queue_frame(CloseSessionFrame())
@@ -244,27 +323,23 @@ async def run_bot(
         This is a placeholder function to demonstrate how to transfer the call
         into a specific agent.
         """
-        if not forwarding_number:
-            logger.error("Forwarding number is not configured; skipping transfer for {}", call_sid)
+        if not forwarding_number or transfer_missing:
+            logger.error(
+                "Unable to transfer call {}; not configured: {}",
+                call_sid,
+                ", ".join(transfer_missing) or "forwarding number",
+            )
             await params.result_callback({"status": "unsupported"})
             return
-        
-        if not base_url:
-            logger.error("NEXTGENSWITCH_URL is not configured; unable to transfer call {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        if not api_key:
-            logger.error("NEXTGENSWITCH_API_KEY is not configured; unable to transfer call {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        if not api_secret:
-            logger.error("NEXTGENSWITCH_API_SECRET is not configured; unable to transfer call {}", call_sid)
-            await params.result_callback({"status": "unsupported"})
-            return
-        
 
         logger.info("Transferring call {} to  {}", call_sid, forwarding_number)
-        asyncio.create_task(transfer_call(call_sid, forwarding_number, base_url, api_key, api_secret))
+        # transfer_call waits a few seconds so the reply can be spoken first,
+        # so it runs as its own task and the model is told it has been started.
+        task = asyncio.create_task(
+            transfer_call(call_sid, forwarding_number, base_url, api_key, api_secret)
+        )
+        _TRANSFER_TASKS.add(task)
+        task.add_done_callback(_TRANSFER_TASKS.discard)
         await params.result_callback({"status": "transferred"})
 
     async def support_ticket(
@@ -302,28 +377,25 @@ async def run_bot(
     llm = get_llm_service(effective_params)
 
     # Set up transcript callback - will be configured after transport is ready
-    transcript_callback = None
-    
-    def get_transcript_callback():
-        return transcript_callback
+    transcript_callback_ref = [None]
     
     async def send_transcript(data):
-        nonlocal transcript_callback
+        transcript_callback = transcript_callback_ref[0]
         if transcript_callback:
             try:
                 await transcript_callback(data)
             except Exception as e:
                 logger.debug(f"Transcript send error: {e}")
 
-    # Create transcript processors with getter function
-    user_transcript_processor = TranscriptProcessor(get_transcript_callback, "user")
-    bot_transcript_processor = TranscriptProcessor(get_transcript_callback, "bot")
+    # Create transcript processors sharing the callback slot
+    user_transcript_processor = TranscriptProcessor(transcript_callback_ref, "user")
+    bot_transcript_processor = TranscriptProcessor(transcript_callback_ref, "bot")
     # markdown_stripper = MarkdownStripper()
 
     context = LLMContext(
         [
-            {"role": "system", "content": system_instruction},
-            {"role": "user", "content": greeting_instruction},
+            {"role": "system", "content": config.system_instruction},
+            {"role": "user", "content": config.greeting_instruction},
         ],
         tools=tools,
     )
@@ -359,7 +431,6 @@ async def run_bot(
 
     @transport.event_handler("on_client_connected")
     async def on_client_connected(transport, client):
-        nonlocal transcript_callback
         logger.info("Pipecat Client connected")
         
         # Set up the transcript callback using webrtc_connection's send_app_message
@@ -375,7 +446,7 @@ async def run_bot(
         async def _async_send(data):
             _send_via_connection(data)
         
-        transcript_callback = _async_send
+        transcript_callback_ref[0] = _async_send
         
         # Kick off the conversation.
         await task.queue_frames([LLMRunFrame()])
@@ -1,326 +1,365 @@
 import os
+from functools import lru_cache
+from importlib import import_module
 
-from dotenv import load_dotenv
 from loguru import logger
 
-load_dotenv(override=True)
-
-
-def _optional(value):
-    if value is None or value == "":
-        return None
-    return value
-
-
-def _add_optional(kwargs, key, value):
-    value = _optional(value)
-    if value is not None:
-        kwargs[key] = value
+__all__ = ["get_llm_service", "close_shared_clients", "prewarm", "refresh_env"]
+
+# Every environment variable the builders read. They are snapshotted once at
+# import and read from a plain dict on each call. main.py loads .env before
+# the bot, and with it this module, is first imported.
+_ENV_KEYS = (
+    "LLM_PROVIDER",
+    "OPENAI_API_KEY",
+    "OPENAI_LLM_MODEL",
+    "OPENAI_MODEL",
+    "OPENAI_BASE_URL",
+    "ANTHROPIC_API_KEY",
+    "ANTHROPIC_MODEL",
+    "AZURE_CHATGPT_API_KEY",
+    "AZURE_OPENAI_API_KEY",
+    "AZURE_CHATGPT_ENDPOINT",
+    "AZURE_OPENAI_ENDPOINT",
+    "AZURE_CHATGPT_MODEL",
+    "AZURE_OPENAI_MODEL",
+    "AZURE_OPENAI_API_VERSION",
+    "DEEPSEEK_API_KEY",
+    "DEEPSEEK_MODEL",
+    "DEEPSEEK_BASE_URL",
+    "GOOGLE_API_KEY",
+    "GEMINI_MODEL",
+    "GOOGLE_MODEL",
+    "XAI_API_KEY",
+    "GROK_API_KEY",
+    "XAI_MODEL",
+    "GROK_MODEL",
+    "XAI_BASE_URL",
+    "GROK_BASE_URL",
+    "GROQ_API_KEY",
+    "GROQ_MODEL",
+    "GROQ_BASE_URL",
+    "OLLAMA_MODEL",
+    "OLLAMA_BASE_URL",
+    "OPENROUTER_API_KEY",
+    "OPENROUTER_MODEL",
+    "OPENROUTER_BASE_URL",
+    "PPLX_API_KEY",
+    "PERPLEXITY_API_KEY",
+    "PERPLEXITY_MODEL",
+    "PERPLEXITY_BASE_URL",
+)
+
+_ENV: dict[str, str] = {}
+
+
+def refresh_env() -> None:
+    """Re-read the snapshotted variables from the process environment."""
+    environ = os.environ
+    _ENV.clear()
+    _ENV.update({key: environ[key] for key in _ENV_KEYS if key in environ})
+
+
+refresh_env()
+
+
+# Provider modules are imported on first use, so a deployment only loads the
+# SDKs it is configured for; the cache skips the import machinery afterwards.
+@lru_cache(maxsize=None)
+def _service_class(module: str, name: str):
+    return getattr(import_module(module), name)
+
+
+# Service instances are pipeline processors and are built per call, but the
+# OpenAI-compatible ones can share one AsyncOpenAI client (and its keep-alive
+# httpx pool) per credential set, so only the first call to a provider pays
+# for the TCP and TLS handshakes.
+OPENAI_KEEPALIVE_CONNECTIONS = 64
+OPENAI_KEEPALIVE_EXPIRY_SECS = 300.0
+
+_OPENAI_CLIENTS: dict[tuple, object] = {}
+
+
+def _shared_openai_client(api_key, base_url, organization, project, default_headers):
+    key = (api_key, base_url, organization, project)
+    client = _OPENAI_CLIENTS.get(key)
+    if client is None:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            organization=organization,
+            project=project,
+            default_headers=default_headers,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SECS,
+                ),
+            ),
+        )
+        _OPENAI_CLIENTS[key] = client
+    return client
+
+
+@lru_cache(maxsize=None)
+def _pooled(service_cls):
+    """Subclass an OpenAI-compatible service so it reuses the shared client."""
+
+    class PooledService(service_cls):
+        def create_client(
+            self,
+            api_key=None,
+            base_url=None,
+            organization=None,
+            project=None,
+            default_headers=None,
+            **kwargs,
+        ):
+            return _shared_openai_client(
+                api_key, base_url, organization, project, default_headers
+            )
+
+    PooledService.__name__ = service_cls.__name__
+    PooledService.__qualname__ = service_cls.__qualname__
+    return PooledService
+
+
+async def close_shared_clients() -> None:
+    """Close the pooled OpenAI clients. Meant for server shutdown."""
+    clients = list(_OPENAI_CLIENTS.values())
+    _OPENAI_CLIENTS.clear()
+    for client in clients:
+        await client.close()
+
+
+def _make_builder(
+    module: str,
+    class_name: str,
+    label: str,
+    sources: dict,
+    required: tuple = (),
+    passthrough: tuple = ("params",),
+    pooled: bool = False,
+):
+    """Return a builder for one provider, specialised at import time.
+
+    ``sources`` maps each service kwarg to the environment variables consulted,
+    in order, when bot_params has no value under that kwarg's name; empty
+    results are left out. ``required`` pairs kwargs with the error raised when
+    they resolve empty, and ``passthrough`` keys are copied from bot_params
+    whenever they are not None.
+    """
+    sources = tuple((key, tuple(env_keys)) for key, env_keys in sources.items())
+    message = f"Using {label} LLM Service"
+
+    def build(bot_params: dict):
+        kwargs = {}
+        for key, env_keys in sources:
+            value = bot_params.get(key)
+            if not value:
+                for env_key in env_keys:
+                    value = _ENV.get(env_key)
+                    if value:
+                        break
+            if value not in (None, ""):
+                kwargs[key] = value
+        for key, error in required:
+            if key not in kwargs:
+                raise ValueError(error)
+
+        service_cls = _service_class(module, class_name)
+        if pooled:
+            service_cls = _pooled(service_cls)
+
+        logger.info(message)
+        for key in passthrough:
+            value = bot_params.get(key)
+            if value is not None:
+                kwargs[key] = value
+        return service_cls(**kwargs)
+
+    build.__name__ = f"_build_{class_name}"
+    build.module = module
+    return build
+
+
+_build_openai = _make_builder(
+    "pipecat.services.openai.llm",
+    "OpenAILLMService",
+    "OpenAI",
+    {
+        "api_key": ("OPENAI_API_KEY",),
+        "model": ("OPENAI_LLM_MODEL", "OPENAI_MODEL"),
+        "base_url": ("OPENAI_BASE_URL",),
+    },
+    required=(("api_key", "Missing OpenAI API key"),),
+    pooled=True,
+)
+
+_build_anthropic = _make_builder(
+    "pipecat.services.anthropic.llm",
+    "AnthropicLLMService",
+    "Anthropic",
+    {
+        "api_key": ("ANTHROPIC_API_KEY",),
+        "model": ("ANTHROPIC_MODEL",),
+    },
+    required=(("api_key", "Missing Anthropic API key"),),
+)
+
+_build_azure = _make_builder(
+    "pipecat.services.azure.llm",
+    "AzureLLMService",
+    "Azure OpenAI",
+    {
+        "api_key": ("AZURE_CHATGPT_API_KEY", "AZURE_OPENAI_API_KEY"),
+        "endpoint": ("AZURE_CHATGPT_ENDPOINT", "AZURE_OPENAI_ENDPOINT"),
+        "model": ("AZURE_CHATGPT_MODEL", "AZURE_OPENAI_MODEL"),
+        "api_version": ("AZURE_OPENAI_API_VERSION",),
+    },
+    required=(
+        ("api_key", "Missing Azure OpenAI API key"),
+        ("endpoint", "Missing Azure OpenAI endpoint"),
+        ("model", "Missing Azure OpenAI model"),
+    ),
+)
+
+_build_deepseek = _make_builder(
+    "pipecat.services.deepseek.llm",
+    "DeepSeekLLMService",
+    "DeepSeek",
+    {
+        "api_key": ("DEEPSEEK_API_KEY",),
+        "model": ("DEEPSEEK_MODEL",),
+        "base_url": ("DEEPSEEK_BASE_URL",),
+    },
+    required=(("api_key", "Missing DeepSeek API key"),),
+    pooled=True,
+)
+
+_build_gemini = _make_builder(
+    "pipecat.services.google.llm",
+    "GoogleLLMService",
+    "Google Gemini",
+    {
+        "api_key": ("GOOGLE_API_KEY",),
+        "model": ("GEMINI_MODEL", "GOOGLE_MODEL"),
+    },
+    required=(("api_key", "Missing Google API key"),),
+    passthrough=("params", "system_instruction", "tools", "tool_config", "http_options"),
+)
+
+_build_grok = _make_builder(
+    "pipecat.services.grok.llm",
+    "GrokLLMService",
+    "Grok",
+    {
+        "api_key": ("XAI_API_KEY", "GROK_API_KEY"),
+        "model": ("XAI_MODEL", "GROK_MODEL"),
+        "base_url": ("XAI_BASE_URL", "GROK_BASE_URL"),
+    },
+    required=(("api_key", "Missing Grok (xAI) API key"),),
+    pooled=True,
+)
+
+_build_groq = _make_builder(
+    "pipecat.services.groq.llm",
+    "GroqLLMService",
+    "Groq",
+    {
+        "api_key": ("GROQ_API_KEY",),
+        "model": ("GROQ_MODEL",),
+        "base_url": ("GROQ_BASE_URL",),
+    },
+    required=(("api_key", "Missing Groq API key"),),
+    pooled=True,
+)
+
+_build_ollama = _make_builder(
+    "pipecat.services.ollama.llm",
+    "OLLamaLLMService",
+    "Ollama",
+    {
+        "model": ("OLLAMA_MODEL",),
+        "base_url": ("OLLAMA_BASE_URL",),
+    },
+    pooled=True,
+)
+
+_build_openrouter = _make_builder(
+    "pipecat.services.openrouter.llm",
+    "OpenRouterLLMService",
+    "OpenRouter",
+    {
+        "api_key": ("OPENROUTER_API_KEY",),
+        "model": ("OPENROUTER_MODEL",),
+        "base_url": ("OPENROUTER_BASE_URL",),
+    },
+    required=(("api_key", "Missing OpenRouter API key"),),
+    pooled=True,
+)
+
+_build_perplexity = _make_builder(
+    "pipecat.services.perplexity.llm",
+    "PerplexityLLMService",
+    "Perplexity",
+    {
+        "api_key": ("PPLX_API_KEY", "PERPLEXITY_API_KEY"),
+        "model": ("PERPLEXITY_MODEL",),
+        "base_url": ("PERPLEXITY_BASE_URL",),
+    },
+    required=(("api_key", "Missing Perplexity API key"),),
+    pooled=True,
+)
+
+
+# Every accepted provider name, aliases included, mapped to its builder.
+_PROVIDERS = {
+    "openai": _build_openai,
+    "open_ai": _build_openai,
+    "anthropic": _build_anthropic,
+    "claude": _build_anthropic,
+    "azure": _build_azure,
+    "azure_openai": _build_azure,
+    "azure_chatgpt": _build_azure,
+    "deepseek": _build_deepseek,
+    "deep_seek": _build_deepseek,
+    "gemini": _build_gemini,
+    "google": _build_gemini,
+    "google_gemini": _build_gemini,
+    "grok": _build_grok,
+    "xai": _build_grok,
+    "groq": _build_groq,
+    "ollama": _build_ollama,
+    "openrouter": _build_openrouter,
+    "open_router": _build_openrouter,
+    "perplexity": _build_perplexity,
+    "pplx": _build_perplexity,
+}
 
 
 def get_llm_service(bot_params: dict):
     provider = (
         bot_params.get("llm_provider")
-        or os.getenv("LLM_PROVIDER", "openai")
+        or _ENV.get("LLM_PROVIDER", "openai")
     )
-    provider = provider.lower()
-
-    if provider in {"openai", "open_ai"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("OPENAI_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing OpenAI API key")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("OPENAI_LLM_MODEL")
-            or os.getenv("OPENAI_MODEL")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("OPENAI_BASE_URL")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.openai.llm import OpenAILLMService
-
-        logger.info("Using OpenAI LLM Service")
-        kwargs = {"api_key": api_key}
-        _add_optional(kwargs, "model", model)
-        _add_optional(kwargs, "base_url", base_url)
-        if params is not None:
-            kwargs["params"] = params
-        return OpenAILLMService(**kwargs)
-
-    elif provider in {"anthropic", "claude"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("ANTHROPIC_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Anthropic API key")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("ANTHROPIC_MODEL")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.anthropic.llm import AnthropicLLMService
-
-        logger.info("Using Anthropic LLM Service")
-        kwargs = {"api_key": api_key}
-        _add_optional(kwargs, "model", model)
-        if params is not None:
-            kwargs["params"] = params
-        return AnthropicLLMService(**kwargs)
-
-    elif provider in {"azure", "azure_openai", "azure_chatgpt"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("AZURE_CHATGPT_API_KEY")
-            or os.getenv("AZURE_OPENAI_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Azure OpenAI API key")
-
-        endpoint = (
-            bot_params.get("endpoint")
-            or os.getenv("AZURE_CHATGPT_ENDPOINT")
-            or os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
-        if not endpoint:
-            raise ValueError("Missing Azure OpenAI endpoint")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("AZURE_CHATGPT_MODEL")
-            or os.getenv("AZURE_OPENAI_MODEL")
-        )
-        if not model:
-            raise ValueError("Missing Azure OpenAI model")
-
-        api_version = (
-            bot_params.get("api_version")
-            or os.getenv("AZURE_OPENAI_API_VERSION")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.azure.llm import AzureLLMService
-
-        logger.info("Using Azure OpenAI LLM Service")
-        kwargs = {
-            "api_key": api_key,
-            "endpoint": endpoint,
-            "model": model,
-        }
-        _add_optional(kwargs, "api_version", api_version)
-        if params is not None:
-            kwargs["params"] = params
-        return AzureLLMService(**kwargs)
-
-    elif provider in {"deepseek", "deep_seek"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("DEEPSEEK_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing DeepSeek API key")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("DEEPSEEK_MODEL")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("DEEPSEEK_BASE_URL")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.deepseek.llm import DeepSeekLLMService
-
-        logger.info("Using DeepSeek LLM Service")
-        kwargs = {"api_key": api_key}
-        _add_optional(kwargs, "model", model)
-        _add_optional(kwargs, "base_url", base_url)
-        if params is not None:
-            kwargs["params"] = params
-        return DeepSeekLLMService(**kwargs)
-
-    elif provider in {"gemini", "google", "google_gemini"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("GOOGLE_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Google API key")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("GEMINI_MODEL")
-            or os.getenv("GOOGLE_MODEL")
-        )
-        params = bot_params.get("params")
-        system_instruction = bot_params.get("system_instruction")
-        tools = bot_params.get("tools")
-        tool_config = bot_params.get("tool_config")
-        http_options = bot_params.get("http_options")
-
-        from pipecat.services.google.llm import GoogleLLMService
-
-        logger.info("Using Google Gemini LLM Service")
-        kwargs = {"api_key": api_key}
-        _add_optional(kwargs, "model", model)
-        if params is not None:
-            kwargs["params"] = params
-        if system_instruction is not None:
-            kwargs["system_instruction"] = system_instruction
-        if tools is not None:
-            kwargs["tools"] = tools
-        if tool_config is not None:
-            kwargs["tool_config"] = tool_config
-        if http_options is not None:
-            kwargs["http_options"] = http_options
-        return GoogleLLMService(**kwargs)
-
-    elif provider in {"grok", "xai"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("XAI_API_KEY")
-            or os.getenv("GROK_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Grok (xAI) API key")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("XAI_MODEL")
-            or os.getenv("GROK_MODEL")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("XAI_BASE_URL")
-            or os.getenv("GROK_BASE_URL")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.grok.llm import GrokLLMService
-
-        logger.info("Using Grok LLM Service")
-        kwargs = {"api_key": api_key}
-        _add_optional(kwargs, "model", model)
-        _add_optional(kwargs, "base_url", base_url)
-        if params is not None:
-            kwargs["params"] = params
-        return GrokLLMService(**kwargs)
-
-    elif provider == "groq":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("GROQ_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Groq API key")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("GROQ_MODEL")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("GROQ_BASE_URL")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.groq.llm import GroqLLMService
-
-        logger.info("Using Groq LLM Service")
-        kwargs = {"api_key": api_key}
-        _add_optional(kwargs, "model", model)
-        _add_optional(kwargs, "base_url", base_url)
-        if params is not None:
-            kwargs["params"] = params
-        return GroqLLMService(**kwargs)
-
-    elif provider == "ollama":
-        model = (
-            bot_params.get("model")
-            or os.getenv("OLLAMA_MODEL")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("OLLAMA_BASE_URL")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.ollama.llm import OLLamaLLMService
-
-        logger.info("Using Ollama LLM Service")
-        kwargs = {}
-        _add_optional(kwargs, "model", model)
-        _add_optional(kwargs, "base_url", base_url)
-        if params is not None:
-            kwargs["params"] = params
-        return OLLamaLLMService(**kwargs)
-
-    elif provider in {"openrouter", "open_router"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("OPENROUTER_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing OpenRouter API key")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("OPENROUTER_MODEL")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("OPENROUTER_BASE_URL")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.openrouter.llm import OpenRouterLLMService
-
-        logger.info("Using OpenRouter LLM Service")
-        kwargs = {"api_key": api_key}
-        _add_optional(kwargs, "model", model)
-        _add_optional(kwargs, "base_url", base_url)
-        if params is not None:
-            kwargs["params"] = params
-        return OpenRouterLLMService(**kwargs)
-
-    elif provider in {"perplexity", "pplx"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("PPLX_API_KEY")
-            or os.getenv("PERPLEXITY_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Perplexity API key")
-
-        model = (
-            bot_params.get("model")
-            or os.getenv("PERPLEXITY_MODEL")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("PERPLEXITY_BASE_URL")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.perplexity.llm import PerplexityLLMService
-
-        logger.info("Using Perplexity LLM Service")
-        kwargs = {"api_key": api_key}
-        _add_optional(kwargs, "model", model)
-        _add_optional(kwargs, "base_url", base_url)
-        if params is not None:
-            kwargs["params"] = params
-        return PerplexityLLMService(**kwargs)
 
-    else:
-        raise ValueError(f"Unsupported LLM provider: {provider}")
+    # The table keys are lowercase and the agent files already use them, so
+    # the name is only lowercased when the exact lookup misses.
+    builder = _PROVIDERS.get(provider)
+    if builder is None:
+        provider = provider.lower()
+        builder = _PROVIDERS.get(provider)
+        if builder is None:
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+    return builder(bot_params)
+
+
+def prewarm() -> None:
+    """Import the SDK module of the LLM_PROVIDER provider ahead of the first call."""
+    builder = _PROVIDERS.get(_ENV.get("LLM_PROVIDER", "openai").lower())
+    if builder is not None:
+        import_module(builder.module)
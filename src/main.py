@@ -1,15 +1,18 @@
 import argparse
+import asyncio
 import sys
+import threading
 from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import uvicorn
 import json
 from datetime import datetime
 from dotenv import load_dotenv
 from fastapi import BackgroundTasks, FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from loguru import logger
 from pydantic import BaseModel
 from pipecat.transports.smallwebrtc.request_handler import (
@@ -18,19 +21,153 @@ from pipecat.transports.smallwebrtc.request_handler import (
     SmallWebRTCRequestHandler,
 )
 
-from bot import run_bot
+from tools.http_client import close_http_session
+
+try:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the existing
+    # handlers cover both parsers.
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps_bytes(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode("utf-8")
 
 # Load environment variables
 load_dotenv(override=True)
 
-app = FastAPI()
-
 # Initialize the SmallWebRTC request handler
 small_webrtc_handler: SmallWebRTCRequestHandler = SmallWebRTCRequestHandler()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=_prewarm, name="prewarm", daemon=True).start()
+    yield  # Run app
+    await small_webrtc_handler.close()
+    await close_http_session()
+    # llm_service is light to import; it holds the pooled LLM clients.
+    from llm_service import close_shared_clients
+
+    await close_shared_clients()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+# bot pulls in the pipeline graph: the pipecat services and transports and the
+# Silero ONNX session. It is imported by _prewarm's background thread or by the
+# first call, whichever comes first, so the server and the agent API come up
+# without waiting for it; the cache skips the import machinery on later calls.
+@lru_cache(maxsize=None)
+def _import_bot():
+    from bot import build_config, run_bot
+
+    return build_config, run_bot
+
+
+_PREWARM_LOCK = threading.Lock()
+_prewarmed = False
+
+
+def _prewarm() -> None:
+    """Import bot and the configured provider SDKs off the event loop.
+
+    Runs once, in a background thread started at server start, so the first
+    call finds them in sys.modules instead of paying for the imports itself.
+    A call that arrives earlier simply waits on the import lock.
+    """
+    global _prewarmed
+    with _PREWARM_LOCK:
+        if _prewarmed:
+            return
+        _prewarmed = True
+    try:
+        _import_bot()
+        import llm_service
+        import stt_service
+        import tts_service
+
+        for module in (stt_service, tts_service, llm_service):
+            module.prewarm()
+    except Exception as e:
+        logger.warning(f"Prewarming the bot modules failed: {e}")
+
+
 # Agents directory
 AGENTS_DIR = Path(__file__).parent / "agents"
 
+# Parsed agent files keyed by path, with the st_mtime_ns they were read at and
+# the ISO form of that mtime, which list_agents shows when the file has no
+# created_at. A file is parsed again only after it changes on disk.
+_AGENT_CACHE: Dict[Path, tuple[int, Dict[str, Any], str]] = {}
+
+
+def _load_cached(path: Path, fill_created_at: bool = False) -> Dict[str, Any]:
+    """Return a copy of the parsed agent file, reading it only if it changed."""
+    mtime_ns = path.stat().st_mtime_ns
+    cached = _AGENT_CACHE.get(path)
+    if cached is None or cached[0] != mtime_ns:
+        cached = (
+            mtime_ns,
+            _json_loads(path.read_bytes()),
+            datetime.fromtimestamp(mtime_ns / 1e9).isoformat(),
+        )
+        _AGENT_CACHE[path] = cached
+    # Callers add per-response keys such as "filename", so hand out a copy.
+    agent_data = dict(cached[1])
+    if fill_created_at:
+        agent_data.setdefault("created_at", cached[2])
+    return agent_data
+
+
+# Agent id -> file path. Built by one directory scan and kept up to date by
+# create_agent and delete_agent.
+_AGENTS_BY_ID: Dict[str, Path] = {}
+
+
+def _index_agents() -> None:
+    # Rescans run in worker threads next to other lookups, so the new index is
+    # built aside and swapped in with one assignment; readers never see it
+    # empty or half-built.
+    global _AGENTS_BY_ID
+    index: Dict[str, Path] = {}
+    if AGENTS_DIR.exists():
+        for file_path in AGENTS_DIR.glob("*.json"):
+            try:
+                agent_id = _load_cached(file_path).get("id")
+            except Exception as e:
+                logger.error(f"Failed to load agent {file_path}: {e}")
+                continue
+            if agent_id:
+                index.setdefault(agent_id, file_path)
+    _AGENTS_BY_ID = index
+
+
+def _find_agent(agent_id: str) -> Optional[tuple[Path, Dict[str, Any]]]:
+    """Return the file and data of the agent with this id, or None."""
+    for attempt in range(2):
+        file_path = _AGENTS_BY_ID.get(agent_id)
+        if file_path is not None:
+            try:
+                agent_data = _load_cached(file_path)
+            except Exception as e:
+                logger.error(f"Failed to load agent {file_path}: {e}")
+            else:
+                if agent_data.get("id") == agent_id:
+                    return file_path, agent_data
+        if attempt == 0:
+            # Missing or stale entry, e.g. a file edited outside the API: scan
+            # the directory again before giving up.
+            _index_agents()
+    return None
+
 
 class AgentConfig(BaseModel):
     id: str = None
@@ -45,6 +182,24 @@ class AgentConfig(BaseModel):
     color: str = "purple"
 
 
+# bot_params key <- (agent file key, default when the file lacks it).
+_AGENT_PARAM_BINDINGS = (
+    ("prompt", "prompt", None),
+    ("greetings", "greeting_message", None),
+    ("llm_provider", "llm_provider", "openai"),
+    ("stt_provider", "stt_provider", "deepgram"),
+    ("tts_provider", "tts_provider", "deepgram"),
+)
+
+
+def _agent_bot_params(agent_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the bot_params an agent file contributes to a call."""
+    return {
+        dst: agent_config.get(src, default)
+        for dst, src, default in _AGENT_PARAM_BINDINGS
+    }
+
+
 def get_agent_config(agent: str) -> Dict[str, Any]:
     """Load agent configuration from agents directory or return default config."""
     agent_config = None
@@ -52,16 +207,12 @@ def get_agent_config(agent: str) -> Dict[str, Any]:
     
     # Try exact match first, then search all files
     if agent_file.exists():
-        with open(agent_file, "r") as f:
-            agent_config = json.load(f)
+        agent_config = _load_cached(agent_file)
     else:
-        # Search for agent by ID in all JSON files
-        for file in AGENTS_DIR.glob("*.json"):
-            with open(file, "r") as f:
-                data = json.load(f)
-                if data.get("id") == agent:
-                    agent_config = data
-                    break
+        # Look the agent up by ID
+        found = _find_agent(agent)
+        if found:
+            agent_config = found[1]
     
     if not agent_config:
         # raise error if agent not found
@@ -74,18 +225,18 @@ def get_agent_config(agent: str) -> Dict[str, Any]:
 
 async def _initialize_websocket(websocket: WebSocket) -> Dict[str, Any]:
     await websocket.accept()
-    start_iterator = websocket.iter_text()
 
+    # The start frame is only logged; the call data comes in the second frame.
     try:
-        start_message = await start_iterator.__anext__()
+        start_message = await websocket.receive_text()
         logger.debug("Received websocket start frame: {}", start_message)
-        raw_payload = await start_iterator.__anext__()
-    except StopAsyncIteration as exc:
+        raw_payload = await websocket.receive_text()
+    except WebSocketDisconnect:
         logger.warning("Websocket disconnected before sending call data")
-        raise WebSocketDisconnect(code=1002) from exc
+        raise
 
     try:
-        call_data = json.loads(raw_payload)
+        call_data = _json_loads(raw_payload)
     except json.JSONDecodeError as exc:
         logger.error("Invalid JSON payload from websocket: {}", raw_payload)
         await websocket.close(code=1003)
@@ -101,19 +252,19 @@ async def offer(
 ):
     """Handle WebRTC offer requests via SmallWebRTCRequestHandler."""
     
-    agent_config = get_agent_config(agent)
+    # Agent files are read on a worker thread so a cold read does not stall
+    # the event loop and the calls it is running.
+    agent_config = await asyncio.to_thread(get_agent_config, agent)
+    bot_params = {"agent": agent, **_agent_bot_params(agent_config)}
+    build_config, run_bot = _import_bot()
+    # Built once per offer; the config is immutable, so the callback can share it.
+    config = build_config(bot_params)
 
     # Prepare runner arguments with the callback to run your bot
     async def webrtc_connection_callback(connection):
-        bot_params = {
-            "agent": agent,
-            "prompt": agent_config.get("prompt"),
-            "greetings": agent_config.get("greeting_message"),
-            "llm_provider": agent_config.get("llm_provider", "openai"),
-            "stt_provider": agent_config.get("stt_provider", "deepgram"),
-            "tts_provider": agent_config.get("tts_provider", "deepgram"),
-        }
-        background_tasks.add_task(run_bot, webrtc_connection=connection, bot_params=bot_params)
+        background_tasks.add_task(
+            run_bot, webrtc_connection=connection, bot_params=bot_params, config=config
+        )
 
     # Delegate handling to SmallWebRTCRequestHandler
     answer = await small_webrtc_handler.handle_web_request(
@@ -135,21 +286,17 @@ async def serve_index():
     return FileResponse("index.html")
 
 
-# Agent management API endpoints
-@app.get("/api/agents")
-async def list_agents() -> List[dict]:
-    """List all agents from the agents directory, sorted by creation date (latest first)."""
+# Agent management API endpoints. The file work runs on a worker thread via
+# asyncio.to_thread, off the event loop that carries the live calls.
+def _list_agents_sync() -> List[dict]:
     agents = []
     if AGENTS_DIR.exists():
         for file_path in AGENTS_DIR.glob("*.json"):
             try:
-                with open(file_path, "r") as f:
-                    agent_data = json.load(f)
-                    agent_data["filename"] = file_path.name
-                    # Use file modification time as fallback if created_at is not present
-                    if "created_at" not in agent_data:
-                        agent_data["created_at"] = datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-                    agents.append(agent_data)
+                # Use file modification time as fallback if created_at is not present
+                agent_data = _load_cached(file_path, fill_created_at=True)
+                agent_data["filename"] = file_path.name
+                agents.append(agent_data)
             except Exception as e:
                 logger.error(f"Failed to load agent {file_path}: {e}")
     # Sort by created_at in descending order (latest first)
@@ -157,19 +304,20 @@ async def list_agents() -> List[dict]:
     return agents
 
 
+@app.get("/api/agents")
+async def list_agents() -> List[dict]:
+    """List all agents from the agents directory, sorted by creation date (latest first)."""
+    return await asyncio.to_thread(_list_agents_sync)
+
+
 @app.get("/api/agents/{agent_id}")
 async def get_agent(agent_id: str) -> dict:
     """Get a specific agent by ID."""
-    if AGENTS_DIR.exists():
-        for file_path in AGENTS_DIR.glob("*.json"):
-            try:
-                with open(file_path, "r") as f:
-                    agent_data = json.load(f)
-                    if agent_data.get("id") == agent_id:
-                        agent_data["filename"] = file_path.name
-                        return agent_data
-            except Exception as e:
-                logger.error(f"Failed to load agent {file_path}: {e}")
+    found = await asyncio.to_thread(_find_agent, agent_id)
+    if found:
+        file_path, agent_data = found
+        agent_data["filename"] = file_path.name
+        return agent_data
     raise HTTPException(status_code=404, detail="Agent not found")
 
 
@@ -177,7 +325,7 @@ async def get_agent(agent_id: str) -> dict:
 async def create_agent(agent: AgentConfig) -> dict:
     """Create a new agent and save to the agents directory."""
     # Create agents directory if it doesn't exist
-    AGENTS_DIR.mkdir(parents=True, exist_ok=True)
+    await asyncio.to_thread(AGENTS_DIR.mkdir, parents=True, exist_ok=True)
     
     # Generate ID and filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -192,11 +340,13 @@ async def create_agent(agent: AgentConfig) -> dict:
     
     # Save to file
     try:
-        with open(file_path, "w") as f:
-            json.dump(agent_data, f, indent=2)
+        await asyncio.to_thread(file_path.write_bytes, _json_dumps_bytes(agent_data))
+        _AGENTS_BY_ID[agent_id] = file_path
         agent_data["filename"] = filename
         logger.info(f"Created agent: {filename}")
-        return agent_data
+        # agent_data holds only JSON types already, so it is returned as a
+        # response directly rather than run through FastAPI's encoder.
+        return JSONResponse(agent_data)
     except Exception as e:
         logger.error(f"Failed to save agent: {e}")
         raise HTTPException(status_code=500, detail="Failed to save agent")
@@ -205,17 +355,17 @@ async def create_agent(agent: AgentConfig) -> dict:
 @app.delete("/api/agents/{agent_id}")
 async def delete_agent(agent_id: str) -> dict:
     """Delete an agent by ID."""
-    if AGENTS_DIR.exists():
-        for file_path in AGENTS_DIR.glob("*.json"):
-            try:
-                with open(file_path, "r") as f:
-                    agent_data = json.load(f)
-                    if agent_data.get("id") == agent_id:
-                        file_path.unlink()
-                        logger.info(f"Deleted agent: {file_path.name}")
-                        return {"status": "deleted", "id": agent_id}
-            except Exception as e:
-                logger.error(f"Failed to process agent {file_path}: {e}")
+    found = await asyncio.to_thread(_find_agent, agent_id)
+    if found:
+        file_path = found[0]
+        try:
+            await asyncio.to_thread(file_path.unlink)
+            _AGENT_CACHE.pop(file_path, None)
+            _AGENTS_BY_ID.pop(agent_id, None)
+            logger.info(f"Deleted agent: {file_path.name}")
+            return {"status": "deleted", "id": agent_id}
+        except Exception as e:
+            logger.error(f"Failed to process agent {file_path}: {e}")
     raise HTTPException(status_code=404, detail="Agent not found")
 
 
@@ -233,14 +383,11 @@ async def _websocket(websocket: WebSocket) -> None:
     bot_params = call_data.get("params") or {}
     agent = bot_params.get("agent") if isinstance(bot_params, dict) else None
     logger.info("WebSocket call data received: stream_id={}, call_sid={}, agent={}", stream_id, call_sid, agent)
-    agent_config = get_agent_config(agent) if agent else None
+    agent_config = await asyncio.to_thread(get_agent_config, agent) if agent else None
 
     if agent_config:
-        bot_params.setdefault("prompt", agent_config.get("prompt"))
-        bot_params.setdefault("greetings", agent_config.get("greeting_message"))
-        bot_params.setdefault("llm_provider", agent_config.get("llm_provider", "openai"))
-        bot_params.setdefault("stt_provider", agent_config.get("stt_provider", "deepgram"))
-        bot_params.setdefault("tts_provider", agent_config.get("tts_provider", "deepgram"))
+        # Keys sent in the call data win over the agent file.
+        bot_params = {**_agent_bot_params(agent_config), **bot_params}
         
     if not isinstance(bot_params, dict):
         logger.warning("Gemini params payload must be a dict. Received {}", bot_params)
@@ -253,20 +400,16 @@ async def _websocket(websocket: WebSocket) -> None:
         list(bot_params.keys()),
     )
 
+    build_config, run_bot = _import_bot()
     await run_bot(
         websocket=websocket,
         stream_id=stream_id,
         call_sid=call_sid,
         bot_params=bot_params,
+        config=build_config(bot_params),
     )
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    yield  # Run app
-    await small_webrtc_handler.close()
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the CareDesk FastAPI server.")
     parser.add_argument(
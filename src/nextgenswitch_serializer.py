@@ -46,6 +46,8 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         self._params = params or NextGenSwitchSerializerParams()
 
         self._stream_id: Optional[str] = None
+        # Outbound media JSON up to the payload, built once per stream.
+        self._media_prefix: Optional[str] = None
 
         self._wire_sr = int(self._params.wire_sample_rate)
         self._pipeline_in_sr = 0  # set in setup()
@@ -59,6 +61,9 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
 
     def set_stream_id(self, stream_id: str) -> None:
         self._stream_id = stream_id
+        self._media_prefix = (
+            '{"event":"media","streamId":' + json.dumps(stream_id) + ',"media":{"payload":"'
+        )
 
     async def setup(self, frame: StartFrame):
         # Pipecat passes pipeline configuration in StartFrame. Twilio serializer uses audio_in_sample_rate. :contentReference[oaicite:2]{index=2}
@@ -78,8 +83,7 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         Convert μ-law->PCM16 and resample 8k->pipeline_in_sr.
         """
         try:
-            if isinstance(data, bytes):
-                data = data.decode("utf-8", errors="ignore")
+            # json.loads reads UTF-8 bytes directly, without a decoded copy.
             msg = json.loads(data)
         except Exception:
             return None
@@ -118,7 +122,8 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         if not isinstance(frame, (AudioRawFrame, TTSAudioRawFrame)):
             return None
 
-        if not self._stream_id:
+        media_prefix = self._media_prefix
+        if media_prefix is None:
             # If you want hard-fail here, raise. For safety, just drop.
             logger.warning("serialize(): missing stream_id; dropping outbound audio")
             return None
@@ -131,17 +136,17 @@ class NextGenSwitchFrameSerializer(FrameSerializer):
         if not ulaw_bytes:
             return None
 
-        payload = base64.b64encode(ulaw_bytes).decode("utf-8")
-
         self._dbg_out_count += 1
         if self._dbg_out_count % 50 == 0:
             logger.debug(
                 f"[SER OUT] pcm={len(pcm)} bytes @ {frame.sample_rate} -> ulaw={len(ulaw_bytes)} bytes @ {self._wire_sr}"
             )
 
-        answer = {
-            "event": "media",
-            "streamId": self._stream_id,  # your protocol uses streamId
-            "media": {"payload": payload},
-        }
-        return json.dumps(answer)
+        # Base64 output is plain ASCII, so it can be spliced into the JSON
+        # string without escaping.
+        payload = base64.b64encode(ulaw_bytes).decode("ascii")
+
+        # Equivalent to {"event": "media", "streamId": ..., "media": {"payload": ...}}.
+        # Kept as str: bytes would go out as a binary websocket frame, which
+        # JSON peers do not read.
+        return media_prefix + payload + '"}}'
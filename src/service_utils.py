@@ -0,0 +1,18 @@
+"""Helpers shared by the STT and TTS service factories."""
+
+
+def coerce_int(value):
+    """Return ``value`` as an int, or None when it is missing or not numeric.
+
+    Settings arrive as ints from agent files and as strings from the
+    environment; ints are returned as they are, and ``int("")`` raises like
+    any other malformed string.
+    """
+    if value is None:
+        return None
+    if type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -1,355 +1,410 @@
 import os
+from functools import lru_cache
+from importlib import import_module
 
-from dotenv import load_dotenv
 from loguru import logger
 
-load_dotenv(override=True)
+from service_utils import coerce_int
+
+__all__ = ["get_stt_service", "prewarm", "refresh_env"]
+
+# Every environment variable the builders read. They are snapshotted once at
+# import and read from a plain dict on each call. main.py loads .env before
+# the bot, and with it this module, is first imported.
+_ENV_KEYS = (
+    "STT_PROVIDER",
+    "AWS_SECRET_ACCESS_KEY",
+    "AWS_ACCESS_KEY_ID",
+    "AWS_SESSION_TOKEN",
+    "AWS_REGION",
+    "AWS_SAMPLE_RATE",
+    "AZURE_SPEECH_API_KEY",
+    "AZURE_API_KEY",
+    "AZURE_SPEECH_REGION",
+    "AZURE_REGION",
+    "AZURE_SPEECH_ENDPOINT_ID",
+    "AZURE_SPEECH_LANGUAGE",
+    "AZURE_LANGUAGE",
+    "AZURE_SAMPLE_RATE",
+    "CARTESIA_API_KEY",
+    "CARTESIA_BASE_URL",
+    "CARTESIA_SAMPLE_RATE",
+    "DEEPGRAM_API_KEY",
+    "DEEPGRAM_BASE_URL",
+    "DEEPGRAM_URL",
+    "DEEPGRAM_SAMPLE_RATE",
+    "ELEVENLABS_API_KEY",
+    "ELEVENLABS_STT_MODEL",
+    "ELEVENLABS_BASE_URL",
+    "ELEVENLABS_SAMPLE_RATE",
+    "GOOGLE_CREDENTIALS_JSON",
+    "GOOGLE_APPLICATION_CREDENTIALS",
+    "GOOGLE_STT_LOCATION",
+    "GOOGLE_SAMPLE_RATE",
+    "OPENAI_API_KEY",
+    "OPENAI_STT_MODEL",
+    "OPENAI_BASE_URL",
+    "FAL_KEY",
+    "FAL_SAMPLE_RATE",
+)
+
+_ENV: dict[str, str] = {}
+
+
+def refresh_env() -> None:
+    """Re-read the snapshotted variables from the process environment."""
+    environ = os.environ
+    _ENV.clear()
+    _ENV.update({key: environ[key] for key in _ENV_KEYS if key in environ})
+
+
+refresh_env()
+
+
+# Provider modules are imported on first use, so a deployment only loads the
+# SDKs it is configured for; the cache skips the import machinery afterwards.
+@lru_cache(maxsize=None)
+def _service_class(module: str, name: str):
+    return getattr(import_module(module), name)
+
+
+@lru_cache(maxsize=64)
+def _parse_language(value: str | None, default: str):
+    Language = _service_class("pipecat.transcriptions.language", "Language")
+    if value is None:
+        return getattr(Language, default)
+    try:
+        return Language(value)
+    except ValueError:
+        return getattr(Language, default)
 
 
-def _coerce_int(value):
-    if value is None or value == "":
-        return None
-    try:
-        return int(value)
-    except (TypeError, ValueError):
-        return None
+def _coerce_language(value, default: str):
+    """Map a language code to pipecat's Language, falling back to ``default``.
 
+    Strings and None are memoized; anything else (e.g. a Language already) is
+    passed through unchanged.
+    """
+    if value is None or isinstance(value, str):
+        return _parse_language(value, default)
+    return value
 
-def get_stt_service(bot_params: dict):
-    provider = (
-        bot_params.get("stt_provider")
-        or os.getenv("STT_PROVIDER", "deepgram")
-    )
-    provider = provider.lower()
 
-    if provider in {"amazon_transcribe", "aws_transcribe", "aws"}:
-        secret_access_key = (
-            bot_params.get("secret_access_key")
-            or bot_params.get("api_key")
-            or os.getenv("AWS_SECRET_ACCESS_KEY")
-        )
-        if not secret_access_key:
-            raise ValueError("Missing AWS secret access key")
+def _resolve(bot_params: dict, keys: tuple, env_keys: tuple, default=None):
+    """Return the first non-empty value among bot_params[keys], then env_keys."""
+    for key in keys:
+        value = bot_params.get(key)
+        if value:
+            return value
+    for key in env_keys:
+        value = _ENV.get(key)
+        if value:
+            return value
+    return default
 
-        access_key_id = (
-            bot_params.get("access_key_id")
-            or os.getenv("AWS_ACCESS_KEY_ID")
-        )
-        if not access_key_id:
-            raise ValueError("Missing AWS access key ID")
 
-        session_token = (
-            bot_params.get("session_token")
-            or os.getenv("AWS_SESSION_TOKEN")
-        )
+def _build_aws(bot_params: dict, secret_access_key, access_key_id):
+    session_token = _resolve(bot_params, ("session_token",), ("AWS_SESSION_TOKEN",))
 
-        region = (
-            bot_params.get("region")
-            or os.getenv("AWS_REGION")
-            or "us-east-1"
-        )
+    region = _resolve(bot_params, ("region",), ("AWS_REGION",), "us-east-1")
 
-        language = bot_params.get("language")
-        if language is None:
-            from pipecat.transcriptions.language import Language
-            language = Language.EN
-        else:
-            from pipecat.transcriptions.language import Language
-            if isinstance(language, str):
-                try:
-                    language = Language(language)
-                except ValueError:
-                    language = Language.EN
-
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("AWS_SAMPLE_RATE")
-        )
+    language = _coerce_language(bot_params.get("language"), "EN")
 
-        from pipecat.services.aws.stt import AWSTranscribeSTTService
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("AWS_SAMPLE_RATE",))
+    )
 
-        logger.info("Using AWS Transcribe STT Service")
-        return AWSTranscribeSTTService(
-            api_key=secret_access_key,
-            aws_access_key_id=access_key_id,
-            aws_session_token=session_token,
-            region=region,
-            language=language,
-            sample_rate=sample_rate or 16000,
-        )
+    AWSTranscribeSTTService = _service_class("pipecat.services.aws.stt", "AWSTranscribeSTTService")
 
-    elif provider == "azure":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("AZURE_SPEECH_API_KEY")
-            or os.getenv("AZURE_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Azure API key")
+    return AWSTranscribeSTTService(
+        api_key=secret_access_key,
+        aws_access_key_id=access_key_id,
+        aws_session_token=session_token,
+        region=region,
+        language=language,
+        sample_rate=sample_rate or 16000,
+    )
 
-        region = (
-            bot_params.get("region")
-            or os.getenv("AZURE_SPEECH_REGION")
-            or os.getenv("AZURE_REGION")
-        )
-        if not region:
-            raise ValueError("Missing Azure region")
 
-        endpoint_id = (
-            bot_params.get("endpoint_id")
-            or os.getenv("AZURE_SPEECH_ENDPOINT_ID")
-        )
+def _build_azure(bot_params: dict, api_key, region):
+    endpoint_id = _resolve(bot_params, ("endpoint_id",), ("AZURE_SPEECH_ENDPOINT_ID",))
 
-        language = (
-            bot_params.get("language")
-            or os.getenv("AZURE_SPEECH_LANGUAGE")
-            or os.getenv("AZURE_LANGUAGE")
-        )
-        from pipecat.transcriptions.language import Language
-        if language is None:
-            language = Language.EN_US
-        elif isinstance(language, str):
-            try:
-                language = Language(language)
-            except ValueError:
-                language = Language.EN_US
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("AZURE_SAMPLE_RATE")
-        )
+    language = _resolve(
+        bot_params, ("language",), ("AZURE_SPEECH_LANGUAGE", "AZURE_LANGUAGE")
+    )
+    language = _coerce_language(language, "EN_US")
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("AZURE_SAMPLE_RATE",))
+    )
 
-        from pipecat.services.azure.stt import AzureSTTService
-
-        logger.info("Using Azure STT Service")
-        kwargs = {
-            "api_key": api_key,
-            "region": region,
-            "language": language,
-            "endpoint_id": endpoint_id,
-        }
-        if sample_rate is not None:
-            kwargs["sample_rate"] = sample_rate
-        return AzureSTTService(
-            **kwargs,
-        )
+    AzureSTTService = _service_class("pipecat.services.azure.stt", "AzureSTTService")
+
+    kwargs = {
+        "api_key": api_key,
+        "region": region,
+        "language": language,
+        "endpoint_id": endpoint_id,
+    }
+    if sample_rate is not None:
+        kwargs["sample_rate"] = sample_rate
+    return AzureSTTService(
+        **kwargs,
+    )
 
-    elif provider == "cartesia":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("CARTESIA_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Cartesia API key")
 
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("CARTESIA_BASE_URL")
-        )
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("CARTESIA_SAMPLE_RATE")
-        )
-        live_options = bot_params.get("live_options")
+def _build_cartesia(bot_params: dict, api_key):
+    base_url = _resolve(bot_params, ("base_url",), ("CARTESIA_BASE_URL",))
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("CARTESIA_SAMPLE_RATE",))
+    )
+    live_options = bot_params.get("live_options")
 
-        from pipecat.services.cartesia.stt import (
-            CartesiaLiveOptions,
-            CartesiaSTTService,
-        )
+    CartesiaLiveOptions = _service_class("pipecat.services.cartesia.stt", "CartesiaLiveOptions")
+    CartesiaSTTService = _service_class("pipecat.services.cartesia.stt", "CartesiaSTTService")
 
-        if isinstance(live_options, dict):
-            live_options = CartesiaLiveOptions(**live_options)
-
-        logger.info("Using Cartesia STT Service")
-        kwargs = {
-            "api_key": api_key,
-        }
-        if base_url:
-            kwargs["base_url"] = base_url
-        if live_options is not None:
-            kwargs["live_options"] = live_options
-        if sample_rate:
-            kwargs["sample_rate"] = sample_rate
-        return CartesiaSTTService(**kwargs)
-
-    elif provider == "deepgram":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("DEEPGRAM_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Deepgram API key")
+    if isinstance(live_options, dict):
+        live_options = CartesiaLiveOptions(**live_options)
 
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("DEEPGRAM_BASE_URL")
-        )
-        url = (
-            bot_params.get("url")
-            or os.getenv("DEEPGRAM_URL")
+    kwargs = {
+        "api_key": api_key,
+    }
+    kwargs.update(
+        (key, value)
+        for key, value in (
+            ("base_url", base_url),
+            ("live_options", live_options),
+            ("sample_rate", sample_rate),
         )
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("DEEPGRAM_SAMPLE_RATE")
-        )
-        live_options = bot_params.get("live_options")
-        addons = bot_params.get("addons")
-        should_interrupt = bot_params.get("should_interrupt")
-
-        from pipecat.services.deepgram.stt import DeepgramSTTService
-
-        logger.info("Using Deepgram STT Service")
-        kwargs = {
-            "api_key": api_key,
-        }
-        if base_url:
-            kwargs["base_url"] = base_url
-        if url:
-            kwargs["url"] = url
-        if live_options is not None:
-            kwargs["live_options"] = live_options
-        if addons is not None:
-            kwargs["addons"] = addons
-        if sample_rate:
-            kwargs["sample_rate"] = sample_rate
-        if should_interrupt is not None:
-            kwargs["should_interrupt"] = should_interrupt
-        return DeepgramSTTService(**kwargs)
-
-    elif provider == "elevenlabs":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("ELEVENLABS_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing ElevenLabs API key")
+        if value is not None
+    )
+    return CartesiaSTTService(**kwargs)
 
-        aiohttp_session = bot_params.get("aiohttp_session")
-        if not aiohttp_session:
-            raise ValueError("Missing aiohttp_session for ElevenLabs STT")
 
-        model = (
-            bot_params.get("model")
-            or os.getenv("ELEVENLABS_STT_MODEL")
-            or "scribe_v1"
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("ELEVENLABS_BASE_URL")
-            or "https://api.elevenlabs.io"
-        )
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("ELEVENLABS_SAMPLE_RATE")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.elevenlabs.stt import ElevenLabsSTTService
-
-        logger.info("Using ElevenLabs STT Service")
-        kwargs = {
-            "api_key": api_key,
-            "aiohttp_session": aiohttp_session,
-            "model": model,
-            "base_url": base_url,
-            "params": params,
-        }
-        if sample_rate:
-            kwargs["sample_rate"] = sample_rate
-        return ElevenLabsSTTService(**kwargs)
-
-    elif provider in {"google", "google_stt", "google_cloud"}:
-        credentials = (
-            bot_params.get("credentials")
-            or os.getenv("GOOGLE_CREDENTIALS_JSON")
-        )
-        credentials_path = (
-            bot_params.get("credentials_path")
-            or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-        )
-        location = (
-            bot_params.get("location")
-            or os.getenv("GOOGLE_STT_LOCATION")
-            or "global"
-        )
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("GOOGLE_SAMPLE_RATE")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.google.stt import GoogleSTTService
-
-        logger.info("Using Google STT Service")
-        kwargs = {
-            "credentials": credentials,
-            "credentials_path": credentials_path,
-            "location": location,
-            "params": params,
-        }
-        if sample_rate:
-            kwargs["sample_rate"] = sample_rate
-        return GoogleSTTService(**kwargs)
-
-    elif provider in {"openai", "openai_whisper", "whisper"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("OPENAI_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing OpenAI API key")
+def _build_deepgram(bot_params: dict, api_key):
+    base_url = _resolve(bot_params, ("base_url",), ("DEEPGRAM_BASE_URL",))
+    url = _resolve(bot_params, ("url",), ("DEEPGRAM_URL",))
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("DEEPGRAM_SAMPLE_RATE",))
+    )
+    live_options = bot_params.get("live_options")
+    addons = bot_params.get("addons")
+    should_interrupt = bot_params.get("should_interrupt")
+
+    DeepgramSTTService = _service_class("pipecat.services.deepgram.stt", "DeepgramSTTService")
+
+    kwargs = {
+        "api_key": api_key,
+    }
+    kwargs.update(
+        (key, value)
+        for key, value in (
+            ("base_url", base_url),
+            ("url", url),
+            ("live_options", live_options),
+            ("addons", addons),
+            ("sample_rate", sample_rate),
+            ("should_interrupt", should_interrupt),
+        )
+        if value is not None
+    )
+    return DeepgramSTTService(**kwargs)
 
-        model = (
-            bot_params.get("model")
-            or os.getenv("OPENAI_STT_MODEL")
-            or "gpt-4o-transcribe"
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("OPENAI_BASE_URL")
-        )
-        language = bot_params.get("language")
-        prompt = bot_params.get("prompt")
-        temperature = bot_params.get("temperature")
-
-        from pipecat.services.openai.stt import OpenAISTTService
-
-        logger.info("Using OpenAI STT Service")
-        kwargs = {
-            "api_key": api_key,
-            "model": model,
-            "prompt": prompt,
-            "temperature": temperature,
-        }
-        if base_url:
-            kwargs["base_url"] = base_url
-        if language is not None:
-            kwargs["language"] = language
-        return OpenAISTTService(**kwargs)
-
-    elif provider in {"fal", "fal_wizper", "wizper"}:
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("FAL_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing FAL API key")
 
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("FAL_SAMPLE_RATE")
-        )
-        params = bot_params.get("params")
+def _build_elevenlabs(bot_params: dict, api_key, aiohttp_session):
+    model = _resolve(bot_params, ("model",), ("ELEVENLABS_STT_MODEL",), "scribe_v1")
+    base_url = _resolve(
+        bot_params, ("base_url",), ("ELEVENLABS_BASE_URL",), "https://api.elevenlabs.io"
+    )
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("ELEVENLABS_SAMPLE_RATE",))
+    )
+    params = bot_params.get("params")
+
+    ElevenLabsSTTService = _service_class("pipecat.services.elevenlabs.stt", "ElevenLabsSTTService")
+
+    kwargs = {
+        "api_key": api_key,
+        "aiohttp_session": aiohttp_session,
+        "model": model,
+        "base_url": base_url,
+        "params": params,
+    }
+    if sample_rate:
+        kwargs["sample_rate"] = sample_rate
+    return ElevenLabsSTTService(**kwargs)
+
+
+def _build_google(bot_params: dict):
+    credentials = _resolve(bot_params, ("credentials",), ("GOOGLE_CREDENTIALS_JSON",))
+    credentials_path = _resolve(
+        bot_params, ("credentials_path",), ("GOOGLE_APPLICATION_CREDENTIALS",)
+    )
+    location = _resolve(bot_params, ("location",), ("GOOGLE_STT_LOCATION",), "global")
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("GOOGLE_SAMPLE_RATE",))
+    )
+    params = bot_params.get("params")
+
+    GoogleSTTService = _service_class("pipecat.services.google.stt", "GoogleSTTService")
+
+    kwargs = {
+        "credentials": credentials,
+        "credentials_path": credentials_path,
+        "location": location,
+        "params": params,
+    }
+    if sample_rate:
+        kwargs["sample_rate"] = sample_rate
+    return GoogleSTTService(**kwargs)
+
+
+def _build_openai(bot_params: dict, api_key):
+    model = _resolve(bot_params, ("model",), ("OPENAI_STT_MODEL",), "gpt-4o-transcribe")
+    base_url = _resolve(bot_params, ("base_url",), ("OPENAI_BASE_URL",))
+    language = bot_params.get("language")
+    prompt = bot_params.get("prompt")
+    temperature = bot_params.get("temperature")
+
+    OpenAISTTService = _service_class("pipecat.services.openai.stt", "OpenAISTTService")
+
+    kwargs = {
+        "api_key": api_key,
+        "model": model,
+        "prompt": prompt,
+        "temperature": temperature,
+    }
+    kwargs.update(
+        (key, value)
+        for key, value in (
+            ("base_url", base_url),
+            ("language", language),
+        )
+        if value is not None
+    )
+    return OpenAISTTService(**kwargs)
 
-        from pipecat.services.fal.stt import FalSTTService
 
-        logger.info("Using FAL STT Service")
-        kwargs = {
-            "api_key": api_key,
-            "params": params,
-        }
-        if sample_rate:
-            kwargs["sample_rate"] = sample_rate
-        return FalSTTService(**kwargs)
+def _build_fal(bot_params: dict, api_key):
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("FAL_SAMPLE_RATE",))
+    )
+    params = bot_params.get("params")
+
+    FalSTTService = _service_class("pipecat.services.fal.stt", "FalSTTService")
+
+    kwargs = {
+        "api_key": api_key,
+        "params": params,
+    }
+    if sample_rate:
+        kwargs["sample_rate"] = sample_rate
+    return FalSTTService(**kwargs)
+
+
+# Every accepted provider name, aliases included, mapped to its builder.
+_PROVIDERS = {
+    "amazon_transcribe": _build_aws,
+    "aws_transcribe": _build_aws,
+    "aws": _build_aws,
+    "azure": _build_azure,
+    "cartesia": _build_cartesia,
+    "deepgram": _build_deepgram,
+    "elevenlabs": _build_elevenlabs,
+    "google": _build_google,
+    "google_stt": _build_google,
+    "google_cloud": _build_google,
+    "openai": _build_openai,
+    "openai_whisper": _build_openai,
+    "whisper": _build_openai,
+    "fal": _build_fal,
+    "fal_wizper": _build_fal,
+    "wizper": _build_fal,
+}
+
+
+# Settings a provider cannot start without, as (builder kwarg, bot_params keys,
+# environment keys, error). The dispatcher resolves and checks them before the
+# builder runs, so every provider fails with the same kind of message.
+_REQUIRED = {
+    _build_aws: (
+        ("secret_access_key", ("secret_access_key", "api_key"), ("AWS_SECRET_ACCESS_KEY",),
+         "Missing AWS secret access key"),
+        ("access_key_id", ("access_key_id",), ("AWS_ACCESS_KEY_ID",), "Missing AWS access key ID"),
+    ),
+    _build_azure: (
+        ("api_key", ("api_key",), ("AZURE_SPEECH_API_KEY", "AZURE_API_KEY"), "Missing Azure API key"),
+        ("region", ("region",), ("AZURE_SPEECH_REGION", "AZURE_REGION"), "Missing Azure region"),
+    ),
+    _build_cartesia: (("api_key", ("api_key",), ("CARTESIA_API_KEY",), "Missing Cartesia API key"),),
+    _build_deepgram: (("api_key", ("api_key",), ("DEEPGRAM_API_KEY",), "Missing Deepgram API key"),),
+    _build_elevenlabs: (
+        ("api_key", ("api_key",), ("ELEVENLABS_API_KEY",), "Missing ElevenLabs API key"),
+        ("aiohttp_session", ("aiohttp_session",), (), "Missing aiohttp_session for ElevenLabs STT"),
+    ),
+    _build_openai: (("api_key", ("api_key",), ("OPENAI_API_KEY",), "Missing OpenAI API key"),),
+    _build_fal: (("api_key", ("api_key",), ("FAL_KEY",), "Missing FAL API key"),),
+}
+
+
+# The line logged when each builder is chosen.
+_MSG = {
+    _build_aws: "Using AWS Transcribe STT Service",
+    _build_azure: "Using Azure STT Service",
+    _build_cartesia: "Using Cartesia STT Service",
+    _build_deepgram: "Using Deepgram STT Service",
+    _build_elevenlabs: "Using ElevenLabs STT Service",
+    _build_google: "Using Google STT Service",
+    _build_openai: "Using OpenAI STT Service",
+    _build_fal: "Using FAL STT Service",
+}
+
+
+# The SDK module behind each builder, imported ahead of time by prewarm().
+_MODULES = {
+    _build_aws: "pipecat.services.aws.stt",
+    _build_azure: "pipecat.services.azure.stt",
+    _build_cartesia: "pipecat.services.cartesia.stt",
+    _build_deepgram: "pipecat.services.deepgram.stt",
+    _build_elevenlabs: "pipecat.services.elevenlabs.stt",
+    _build_google: "pipecat.services.google.stt",
+    _build_openai: "pipecat.services.openai.stt",
+    _build_fal: "pipecat.services.fal.stt",
+}
+
+
+def get_stt_service(bot_params: dict):
+    """Build a new STT service for one call.
+
+    Instances are deliberately not cached: pipecat services are processors
+    linked into a single pipeline, hold that call's streaming connection and
+    are torn down with it. Only the service classes are cached.
+    """
+    provider = (
+        bot_params.get("stt_provider")
+        or _ENV.get("STT_PROVIDER", "deepgram")
+    )
 
-    else:
-        raise ValueError(f"Unsupported STT provider: {provider}")
+    # The table keys are lowercase and the agent files already use them, so
+    # the name is only lowercased when the exact lookup misses.
+    builder = _PROVIDERS.get(provider)
+    if builder is None:
+        provider = provider.lower()
+        builder = _PROVIDERS.get(provider)
+        if builder is None:
+            raise ValueError(f"Unsupported STT provider: {provider}")
+
+    resolved = {}
+    for field, keys, env_keys, error in _REQUIRED.get(builder, ()):
+        value = _resolve(bot_params, keys, env_keys)
+        if not value:
+            raise ValueError(error)
+        resolved[field] = value
+    logger.info(_MSG[builder])
+    return builder(bot_params, **resolved)
+
+
+def prewarm() -> None:
+    """Import the SDK module of the STT_PROVIDER provider ahead of the first call."""
+    builder = _PROVIDERS.get(_ENV.get("STT_PROVIDER", "deepgram").lower())
+    if builder is not None:
+        import_module(_MODULES[builder])
@@ -0,0 +1,39 @@
+"""Shared HTTP client for the NextGenSwitch API calls made by the tools."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+
+# transfer_call and create_ticket talk to the same NextGenSwitch host. One
+# HTTP/2 client multiplexes the tool calls of concurrent sessions over a single
+# TCP and TLS connection; servers that only speak HTTP/1.1 are negotiated down
+# through ALPN and get a keep-alive pool instead.
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide client, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        # httpx, its h2 stack and certifi are imported on the first tool call
+        # rather than at server start; many sessions never make one.
+        import httpx
+
+        _CLIENT = httpx.AsyncClient(
+            http2=True,
+            timeout=10,
+            limits=httpx.Limits(max_keepalive_connections=16, keepalive_expiry=120),
+        )
+    return _CLIENT
+
+
+async def close_http_session() -> None:
+    """Close the shared client. Meant for server shutdown."""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
@@ -2,20 +2,97 @@
 
 from __future__ import annotations
 
-import asyncio
 import os
+import time
 from datetime import datetime, timezone
-from typing import Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
 
-import requests
 from loguru import logger
 
+from tools.http_client import get_client
+
+try:
+    from orjson import dumps as _json_dumps_bytes
+except ImportError:
+    import json
+
+    def _json_dumps_bytes(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
+# The NextGenSwitch fallbacks create_ticket reads, snapshotted once at import
+# instead of going through os.environ on every ticket.
+_ENV_KEYS = (
+    "NEXTGENSWITCH_API_URL",
+    "NEXTGENSWITCH_URL",
+    "NEXTGENSWITCH_KEY",
+    "NEXTGENSWITCH_API_KEY",
+    "NEXTGENSWITCH_SECRET",
+    "NEXTGENSWITCH_API_SECRET",
+    "NEXTGENSWITCH_TIMEOUT",
+)
+
+_ENV: dict[str, str] = {}
+
+
+def refresh_env() -> None:
+    """Re-read the snapshotted variables from the process environment."""
+    environ = os.environ
+    _ENV.clear()
+    _ENV.update({key: environ[key] for key in _ENV_KEYS if environ.get(key)})
+
+
+refresh_env()
+
 
 def _env(key: str, default: Optional[str] = None) -> Optional[str]:
-    value = os.getenv(key)
-    if value is None or value == "":
-        return default
-    return value
+    return _ENV.get(key, default)
+
+
+class _BodyPreview:
+    """Decodes and trims the response body only if the debug line is emitted."""
+
+    __slots__ = ("_response",)
+
+    def __init__(self, response) -> None:
+        self._response = response
+
+    def __str__(self) -> str:
+        return self._response.text[:500]
+
+
+class _Timestamp:
+    """The response time, formatted only if a log line that shows it is emitted.
+
+    The clock is read when the response arrives, so every line of one ticket
+    shows the same second.
+    """
+
+    __slots__ = ("_seconds",)
+
+    def __init__(self) -> None:
+        self._seconds = time.time_ns() // 1_000_000_000
+
+    def __str__(self) -> str:
+        return datetime.fromtimestamp(self._seconds, timezone.utc).isoformat(timespec="seconds")
+
+
+# The base URL and credentials come from the same env or bot_params values on
+# every call, so the URL and request headers are built once per value.
+@lru_cache(maxsize=16)
+def _ticket_endpoint(
+    base_url: str, api_key: Optional[str], api_secret: Optional[str]
+) -> tuple[str, Mapping[str, str]]:
+    # The body is serialized here rather than by httpx, so the JSON content
+    # type is part of the cached headers.
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["X-Authorization"] = api_key
+    if api_secret:
+        headers["X-Authorization-Secret"] = api_secret
+    return f"{base_url.rstrip('/')}/support_tickets", MappingProxyType(headers)
 
 
 async def create_ticket(
@@ -53,21 +130,14 @@ async def create_ticket(
             has_secret=bool(api_secret),
         )
 
-    url = f"{base_url.rstrip('/')}/support_tickets"
-
-    headers = {}
-    if api_key:
-        headers["X-Authorization"] = api_key
-    if api_secret:
-        headers["X-Authorization-Secret"] = api_secret
+    url, headers = _ticket_endpoint(base_url, api_key, api_secret)
 
     payload = {"call_id": call_sid, "subject": subject, "description": description}
-    if name:
-        payload["name"] = name
-    if email:
-        payload["email"] = email
-    if phone:
-        payload["phone"] = phone
+    payload.update(
+        (key, value)
+        for key, value in (("name", name), ("email", email), ("phone", phone))
+        if value
+    )
 
     logger.info(
         "create_ticket: sending POST {url} (call_sid={call_sid}, timeout={timeout})",
@@ -77,13 +147,14 @@ async def create_ticket(
     )
 
     try:
-        response = await asyncio.to_thread(
-            requests.post,
+        response = await get_client().post(
             url,
             headers=headers,
-            json=payload,
+            content=_json_dumps_bytes(payload),
             timeout=timeout_value,
         )
+        ok = response.is_success
+        status = response.status_code
     except Exception as exc:  # noqa: BLE001
         logger.exception(
             "create_ticket: request failed (call_sid={call_sid}, error={error})",
@@ -92,20 +163,20 @@ async def create_ticket(
         )
         return False
 
-    timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    timestamp = _Timestamp()
     logger.debug(
         "create_ticket: received response (call_sid={call_sid}, status_code={status}, at={ts}, body_preview={preview})",
         call_sid=call_sid,
-        status=response.status_code,
+        status=status,
         ts=timestamp,
-        preview=response.text[:500],
+        preview=_BodyPreview(response),
     )
 
-    if response.ok:
+    if ok:
         logger.info(
             "create_ticket: success (call_sid={call_sid}, status_code={status}, at={ts})",
             call_sid=call_sid,
-            status=response.status_code,
+            status=status,
             ts=timestamp,
         )
         return True
@@ -113,7 +184,7 @@ async def create_ticket(
     logger.warning(
         "create_ticket: non-2xx response (call_sid={call_sid}, status_code={status}, at={ts})",
         call_sid=call_sid,
-        status=response.status_code,
+        status=status,
         ts=timestamp,
     )
     return False
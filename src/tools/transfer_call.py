@@ -1,15 +1,41 @@
 """Utilities for transferring an active call to a live agent."""
 
+from __future__ import annotations
+
 import asyncio
-from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import quote_plus
 
-import requests
 from loguru import logger
 
+from tools.http_client import get_client
+
+if TYPE_CHECKING:
+    import httpx
+
 
 XML_TEMPLATE = """<?xml version="1.0"?>\n<response>\n    <dial>{number}</dial>\n</response>"""
 
+# The PUT body is the form-encoded XML, and only the dialled number varies, so
+# everything around it is encoded once here. The result is byte-for-byte what
+# urlencode({"responseXml": XML_TEMPLATE.format(number=...)}) produces.
+_XML_BEFORE, _XML_AFTER = XML_TEMPLATE.split("{number}")
+_FORM_PREFIX = ("responseXml=" + quote_plus(_XML_BEFORE)).encode("ascii")
+_FORM_SUFFIX = quote_plus(_XML_AFTER).encode("ascii")
+
+
+def _form_body(dial_number) -> bytes:
+    return _FORM_PREFIX + quote_plus(str(dial_number)).encode("ascii") + _FORM_SUFFIX
+
+
+async def _preconnect(client: httpx.AsyncClient, base_url: str, timeout: float) -> None:
+    # Any response leaves a warm keep-alive connection in the pool; the status
+    # of this probe does not matter.
+    try:
+        await client.head(base_url, timeout=timeout)
+    except Exception as exc:
+        logger.debug("Transfer preconnect to {} failed: {}", base_url, exc)
+
 
 async def transfer_call(call_sid: str, dial_number: str, base_url: str, api_key: str, api_secret: str, transfer_delay: float = 5.0, timeout: int = 10) -> None:
     """Transfer an active call to the supplied number."""
@@ -18,45 +44,48 @@ async def transfer_call(call_sid: str, dial_number: str, base_url: str, api_key:
         logger.error("NEXTGENSWITCH_URL is not configured; unable to transfer call {}", call_sid)
         return
 
+    client = get_client()
     if transfer_delay:
         logger.debug("Waiting {} seconds before transferring call {}", transfer_delay, call_sid)
+        # Open the TCP and TLS connection during the wait so the PUT goes out
+        # as soon as the delay ends.
+        preconnect = asyncio.create_task(_preconnect(client, base_url, transfer_delay))
         await asyncio.sleep(transfer_delay)
+        await preconnect
 
     url = f"{base_url.rstrip('/')}/call/{call_sid}"
-    headers = {}
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
     if api_key:
         headers["X-Authorization"] = api_key
     if api_secret:
         headers["X-Authorization-Secret"] = api_secret
 
-    payload = {"responseXml": XML_TEMPLATE.format(number=dial_number)}
     logger.info("Transferring call {} to {} via {}", call_sid, dial_number, url)
 
     try:
-        response = await asyncio.to_thread(
-            requests.put,
+        response = await client.put(
             url,
             headers=headers,
-            data=payload,
+            content=_form_body(dial_number),
             timeout=timeout,
         )
+        ok = response.is_success
+        status = response.status_code
+        text = response.text
     except Exception as exc:
         logger.exception("Failed to transfer call {}: {}", call_sid, exc)
         return
 
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    if response.ok:
+    if ok:
         logger.info(
-            "Call {} transferred successfully (status {} at {})",
+            "Call {} transferred successfully (status {})",
             call_sid,
-            response.status_code,
-            timestamp,
+            status,
         )
     else:
         logger.error(
-            "Call {} transfer failed (status {} at {}): {}",
+            "Call {} transfer failed (status {}): {}",
             call_sid,
-            response.status_code,
-            timestamp,
-            response.text,
+            status,
+            text,
         )
@@ -1,268 +1,317 @@
 import os
+from functools import lru_cache
+from importlib import import_module
 
-from dotenv import load_dotenv
 from loguru import logger
 
-load_dotenv(override=True)
+from service_utils import coerce_int
 
+__all__ = ["get_tts_service", "prewarm", "refresh_env"]
 
-def _coerce_int(value):
-    if value is None or value == "":
-        return None
-    try:
-        return int(value)
-    except (TypeError, ValueError):
-        return None
+# Every environment variable the builders read. They are snapshotted once at
+# import and read from a plain dict on each call. main.py loads .env before
+# the bot, and with it this module, is first imported.
+_ENV_KEYS = (
+    "TTS_PROVIDER",
+    "AWS_SECRET_ACCESS_KEY",
+    "AWS_ACCESS_KEY_ID",
+    "AWS_SESSION_TOKEN",
+    "AWS_REGION",
+    "AWS_VOICE_ID",
+    "AWS_TTS_ENGINE",
+    "AWS_TTS_RATE",
+    "AZURE_SPEECH_API_KEY",
+    "AZURE_API_KEY",
+    "AZURE_SPEECH_REGION",
+    "AZURE_REGION",
+    "AZURE_SPEECH_VOICE_ID",
+    "AZURE_VOICE_ID",
+    "AZURE_SPEECH_LANGUAGE",
+    "AZURE_LANGUAGE",
+    "AZURE_SAMPLE_RATE",
+    "CARTESIA_API_KEY",
+    "CARTESIA_VOICE_ID",
+    "CARTESIA_MODEL_ID",
+    "CARTESIA_BASE_URL",
+    "CARTESIA_SAMPLE_RATE",
+    "DEEPGRAM_API_KEY",
+    "DEEPGRAM_VOICE_ID",
+    "DEEPGRAM_TTS_MODEL",
+    "DEEPGRAM_BASE_URL",
+    "DEEPGRAM_SAMPLE_RATE",
+    "ELEVENLABS_API_KEY",
+    "ELEVENLABS_VOICE_ID",
+    "ELEVENLABS_MODEL_ID",
+    "ELEVENLABS_BASE_URL",
+    "ELEVENLABS_OUTPUT_FORMAT",
+)
 
+_ENV: dict[str, str] = {}
 
-def get_tts_service(bot_params: dict):
-    provider = (
-        bot_params.get("tts_provider")
-        or os.getenv("TTS_PROVIDER", "deepgram")
-    )
-    provider = provider.lower()
 
-    if provider in {"amazon_polly", "aws_polly", "aws"}:
-        secret_access_key = (
-            bot_params.get("secret_access_key")
-            or bot_params.get("api_key")
-            or os.getenv("AWS_SECRET_ACCESS_KEY")
-        )
-        if not secret_access_key:
-            raise ValueError("Missing AWS secret access key")
+def refresh_env() -> None:
+    """Re-read the snapshotted variables from the process environment."""
+    environ = os.environ
+    _ENV.clear()
+    _ENV.update({key: environ[key] for key in _ENV_KEYS if key in environ})
 
-        access_key_id = (
-            bot_params.get("access_key_id")
-            or os.getenv("AWS_ACCESS_KEY_ID")
-        )
-        if not access_key_id:
-            raise ValueError("Missing AWS access key ID")
 
-        session_token = (
-            bot_params.get("session_token")
-            or os.getenv("AWS_SESSION_TOKEN")
-        )
-        region = (
-            bot_params.get("region")
-            or os.getenv("AWS_REGION")
-            or "us-east-1"
-        )
-        voice_id = (
-            bot_params.get("voice_id")
-            or os.getenv("AWS_VOICE_ID")
-            or "Joanna"
-        )
-        engine = (
-            bot_params.get("engine")
-            or os.getenv("AWS_TTS_ENGINE")
-            or "generative"
-        )
-        rate = (
-            bot_params.get("rate")
-            or os.getenv("AWS_TTS_RATE")
-            or "1.1"
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.aws.tts import AWSPollyTTSService
-
-        if params is None:
-            params = AWSPollyTTSService.InputParams(
-                engine=engine,
-                rate=rate,
-            )
-
-        logger.info("Using Amazon Polly TTS Service")
-        return AWSPollyTTSService(
-            api_key=secret_access_key,
-            aws_access_key_id=access_key_id,
-            aws_session_token=session_token,
-            region=region,
-            voice_id=voice_id,
-            params=params,
-        )
+refresh_env()
 
-    elif provider == "azure":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("AZURE_SPEECH_API_KEY")
-            or os.getenv("AZURE_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Azure API key")
 
-        region = (
-            bot_params.get("region")
-            or os.getenv("AZURE_SPEECH_REGION")
-            or os.getenv("AZURE_REGION")
-        )
-        if not region:
-            raise ValueError("Missing Azure region")
-
-        voice_id = (
-            bot_params.get("voice_id")
-            or os.getenv("AZURE_SPEECH_VOICE_ID")
-            or os.getenv("AZURE_VOICE_ID")
-            or "en-US-JennyNeural"
-        )
-        language = (
-            bot_params.get("language")
-            or os.getenv("AZURE_SPEECH_LANGUAGE")
-            or os.getenv("AZURE_LANGUAGE")
-        )
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("AZURE_SAMPLE_RATE")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.azure.tts import AzureTTSService
-
-        logger.info("Using Azure TTS Service")
-        kwargs = {
-            "api_key": api_key,
-            "region": region,
-            "voice_id": voice_id,
-        }
-        if language:
-            kwargs["language"] = language
-        if sample_rate is not None:
-            kwargs["sample_rate"] = sample_rate
-        if params is not None:
-            kwargs["params"] = params
-        return AzureTTSService(**kwargs)
-
-    elif provider == "cartesia":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("CARTESIA_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Cartesia API key")
+# Provider modules are imported on first use, so a deployment only loads the
+# SDKs it is configured for; the cache skips the import machinery afterwards.
+@lru_cache(maxsize=None)
+def _service_class(module: str, name: str):
+    return getattr(import_module(module), name)
 
-        voice_id = (
-            bot_params.get("voice_id")
-            or os.getenv("CARTESIA_VOICE_ID")
-            or "71a7ad14-091c-4e8e-a314-022ece01c121"
-        )
-        model_id = (
-            bot_params.get("model_id")
-            or os.getenv("CARTESIA_MODEL_ID")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("CARTESIA_BASE_URL")
-        )
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("CARTESIA_SAMPLE_RATE")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.cartesia.tts import CartesiaTTSService
-
-        logger.info("Using Cartesia TTS Service")
-        kwargs = {
-            "api_key": api_key,
-            "voice_id": voice_id,
-        }
-        if model_id:
-            kwargs["model_id"] = model_id
-        if base_url:
-            kwargs["base_url"] = base_url
-        if sample_rate:
-            kwargs["sample_rate"] = sample_rate
-        if params is not None:
-            kwargs["params"] = params
-        return CartesiaTTSService(**kwargs)
-
-    elif provider == "deepgram":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("DEEPGRAM_API_KEY")
-        )
-        if not api_key:
-            raise ValueError("Missing Deepgram API key")
 
-        voice_id = (
-            bot_params.get("voice_id")
-            or os.getenv("DEEPGRAM_VOICE_ID")
-            or "aura-2-athena-en"
-        )
-        model = (
-            bot_params.get("model")
-            or os.getenv("DEEPGRAM_TTS_MODEL")
-        )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("DEEPGRAM_BASE_URL")
-        )
-        sample_rate = _coerce_int(
-            bot_params.get("sample_rate")
-            or os.getenv("DEEPGRAM_SAMPLE_RATE")
-        )
-        params = bot_params.get("params")
-
-        from pipecat.services.deepgram.tts import DeepgramTTSService
-
-        logger.info("Using Deepgram TTS Service")
-        kwargs = {
-            "api_key": api_key,
-            "voice_id": voice_id,
-        }
-        if model:
-            kwargs["model"] = model
-        if base_url:
-            kwargs["base_url"] = base_url
-        if sample_rate:
-            kwargs["sample_rate"] = sample_rate
-        if params is not None:
-            kwargs["params"] = params
-        return DeepgramTTSService(**kwargs)
-
-    elif provider == "elevenlabs":
-        api_key = (
-            bot_params.get("api_key")
-            or os.getenv("ELEVENLABS_API_KEY")
+def _resolve(bot_params: dict, keys: tuple, env_keys: tuple, default=None):
+    """Return the first non-empty value among bot_params[keys], then env_keys."""
+    for key in keys:
+        value = bot_params.get(key)
+        if value:
+            return value
+    for key in env_keys:
+        value = _ENV.get(key)
+        if value:
+            return value
+    return default
+
+
+def _build_aws(bot_params: dict, secret_access_key, access_key_id):
+    session_token = _resolve(bot_params, ("session_token",), ("AWS_SESSION_TOKEN",))
+    region = _resolve(bot_params, ("region",), ("AWS_REGION",), "us-east-1")
+    voice_id = _resolve(bot_params, ("voice_id",), ("AWS_VOICE_ID",), "Joanna")
+    engine = _resolve(bot_params, ("engine",), ("AWS_TTS_ENGINE",), "generative")
+    rate = _resolve(bot_params, ("rate",), ("AWS_TTS_RATE",), "1.1")
+    params = bot_params.get("params")
+
+    AWSPollyTTSService = _service_class("pipecat.services.aws.tts", "AWSPollyTTSService")
+
+    if params is None:
+        params = AWSPollyTTSService.InputParams(
+            engine=engine,
+            rate=rate,
         )
-        if not api_key:
-            raise ValueError("Missing ElevenLabs API key")
 
-        voice_id = (
-            bot_params.get("voice_id")
-            or os.getenv("ELEVENLABS_VOICE_ID")
-            or "21m00Tcm4TlvDq8ikWAM"
+    return AWSPollyTTSService(
+        api_key=secret_access_key,
+        aws_access_key_id=access_key_id,
+        aws_session_token=session_token,
+        region=region,
+        voice_id=voice_id,
+        params=params,
+    )
+
+
+def _build_azure(bot_params: dict, api_key, region):
+    voice_id = _resolve(
+        bot_params, ("voice_id",), ("AZURE_SPEECH_VOICE_ID", "AZURE_VOICE_ID"), "en-US-JennyNeural"
+    )
+    language = _resolve(
+        bot_params, ("language",), ("AZURE_SPEECH_LANGUAGE", "AZURE_LANGUAGE")
+    )
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("AZURE_SAMPLE_RATE",))
+    )
+    params = bot_params.get("params")
+
+    AzureTTSService = _service_class("pipecat.services.azure.tts", "AzureTTSService")
+
+    kwargs = {
+        "api_key": api_key,
+        "region": region,
+        "voice_id": voice_id,
+    }
+    kwargs.update(
+        (key, value)
+        for key, value in (
+            ("language", language),
+            ("sample_rate", sample_rate),
+            ("params", params),
         )
-        model_id = (
-            bot_params.get("model_id")
-            or os.getenv("ELEVENLABS_MODEL_ID")
+        if value is not None
+    )
+    return AzureTTSService(**kwargs)
+
+
+def _build_cartesia(bot_params: dict, api_key):
+    voice_id = _resolve(
+        bot_params, ("voice_id",), ("CARTESIA_VOICE_ID",), "71a7ad14-091c-4e8e-a314-022ece01c121"
+    )
+    model_id = _resolve(bot_params, ("model_id",), ("CARTESIA_MODEL_ID",))
+    base_url = _resolve(bot_params, ("base_url",), ("CARTESIA_BASE_URL",))
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("CARTESIA_SAMPLE_RATE",))
+    )
+    params = bot_params.get("params")
+
+    CartesiaTTSService = _service_class("pipecat.services.cartesia.tts", "CartesiaTTSService")
+
+    kwargs = {
+        "api_key": api_key,
+        "voice_id": voice_id,
+    }
+    kwargs.update(
+        (key, value)
+        for key, value in (
+            ("model_id", model_id),
+            ("base_url", base_url),
+            ("sample_rate", sample_rate),
+            ("params", params),
         )
-        base_url = (
-            bot_params.get("base_url")
-            or os.getenv("ELEVENLABS_BASE_URL")
+        if value is not None
+    )
+    return CartesiaTTSService(**kwargs)
+
+
+def _build_deepgram(bot_params: dict, api_key):
+    voice_id = _resolve(
+        bot_params, ("voice_id",), ("DEEPGRAM_VOICE_ID",), "aura-2-athena-en"
+    )
+    model = _resolve(bot_params, ("model",), ("DEEPGRAM_TTS_MODEL",))
+    base_url = _resolve(bot_params, ("base_url",), ("DEEPGRAM_BASE_URL",))
+    sample_rate = coerce_int(
+        _resolve(bot_params, ("sample_rate",), ("DEEPGRAM_SAMPLE_RATE",))
+    )
+    params = bot_params.get("params")
+
+    DeepgramTTSService = _service_class("pipecat.services.deepgram.tts", "DeepgramTTSService")
+
+    kwargs = {
+        "api_key": api_key,
+        "voice_id": voice_id,
+    }
+    kwargs.update(
+        (key, value)
+        for key, value in (
+            ("model", model),
+            ("base_url", base_url),
+            ("sample_rate", sample_rate),
+            ("params", params),
         )
-        output_format = (
-            bot_params.get("output_format")
-            or os.getenv("ELEVENLABS_OUTPUT_FORMAT")
+        if value is not None
+    )
+    return DeepgramTTSService(**kwargs)
+
+
+def _build_elevenlabs(bot_params: dict, api_key):
+    voice_id = _resolve(
+        bot_params, ("voice_id",), ("ELEVENLABS_VOICE_ID",), "21m00Tcm4TlvDq8ikWAM"
+    )
+    model_id = _resolve(bot_params, ("model_id",), ("ELEVENLABS_MODEL_ID",))
+    base_url = _resolve(bot_params, ("base_url",), ("ELEVENLABS_BASE_URL",))
+    output_format = _resolve(
+        bot_params, ("output_format",), ("ELEVENLABS_OUTPUT_FORMAT",)
+    )
+    params = bot_params.get("params")
+
+    ElevenLabsTTSService = _service_class("pipecat.services.elevenlabs.tts", "ElevenLabsTTSService")
+
+    kwargs = {
+        "api_key": api_key,
+        "voice_id": voice_id,
+    }
+    kwargs.update(
+        (key, value)
+        for key, value in (
+            ("model_id", model_id),
+            ("base_url", base_url),
+            ("output_format", output_format),
+            ("params", params),
         )
-        params = bot_params.get("params")
-
-        from pipecat.services.elevenlabs.tts import ElevenLabsTTSService
-
-        logger.info("Using ElevenLabs TTS Service")
-        kwargs = {
-            "api_key": api_key,
-            "voice_id": voice_id,
-        }
-        if model_id:
-            kwargs["model_id"] = model_id
-        if base_url:
-            kwargs["base_url"] = base_url
-        if output_format:
-            kwargs["output_format"] = output_format
-        if params is not None:
-            kwargs["params"] = params
-        return ElevenLabsTTSService(**kwargs)
-
-    else:
-        raise ValueError(f"Unsupported TTS provider: {provider}")
+        if value is not None
+    )
+    return ElevenLabsTTSService(**kwargs)
+
+
+# Every accepted provider name, aliases included, mapped to its builder.
+_PROVIDERS = {
+    "amazon_polly": _build_aws,
+    "aws_polly": _build_aws,
+    "aws": _build_aws,
+    "azure": _build_azure,
+    "cartesia": _build_cartesia,
+    "deepgram": _build_deepgram,
+    "elevenlabs": _build_elevenlabs,
+}
+
+
+# Settings a provider cannot start without, as (builder kwarg, bot_params keys,
+# environment keys, error). The dispatcher resolves and checks them before the
+# builder runs, so every provider fails with the same kind of message.
+_REQUIRED = {
+    _build_aws: (
+        ("secret_access_key", ("secret_access_key", "api_key"), ("AWS_SECRET_ACCESS_KEY",),
+         "Missing AWS secret access key"),
+        ("access_key_id", ("access_key_id",), ("AWS_ACCESS_KEY_ID",), "Missing AWS access key ID"),
+    ),
+    _build_azure: (
+        ("api_key", ("api_key",), ("AZURE_SPEECH_API_KEY", "AZURE_API_KEY"), "Missing Azure API key"),
+        ("region", ("region",), ("AZURE_SPEECH_REGION", "AZURE_REGION"), "Missing Azure region"),
+    ),
+    _build_cartesia: (("api_key", ("api_key",), ("CARTESIA_API_KEY",), "Missing Cartesia API key"),),
+    _build_deepgram: (("api_key", ("api_key",), ("DEEPGRAM_API_KEY",), "Missing Deepgram API key"),),
+    _build_elevenlabs: (
+        ("api_key", ("api_key",), ("ELEVENLABS_API_KEY",), "Missing ElevenLabs API key"),
+    ),
+}
+
+
+# The line logged when each builder is chosen.
+_MSG = {
+    _build_aws: "Using Amazon Polly TTS Service",
+    _build_azure: "Using Azure TTS Service",
+    _build_cartesia: "Using Cartesia TTS Service",
+    _build_deepgram: "Using Deepgram TTS Service",
+    _build_elevenlabs: "Using ElevenLabs TTS Service",
+}
+
+
+# The SDK module behind each builder, imported ahead of time by prewarm().
+_MODULES = {
+    _build_aws: "pipecat.services.aws.tts",
+    _build_azure: "pipecat.services.azure.tts",
+    _build_cartesia: "pipecat.services.cartesia.tts",
+    _build_deepgram: "pipecat.services.deepgram.tts",
+    _build_elevenlabs: "pipecat.services.elevenlabs.tts",
+}
+
+
+def get_tts_service(bot_params: dict):
+    """Build a new TTS service for one call.
+
+    Instances are deliberately not cached: pipecat services are processors
+    linked into a single pipeline, hold that call's streaming connection and
+    are torn down with it. Only the service classes are cached.
+    """
+    provider = (
+        bot_params.get("tts_provider")
+        or _ENV.get("TTS_PROVIDER", "deepgram")
+    )
+
+    # The table keys are lowercase and the agent files already use them, so
+    # the name is only lowercased when the exact lookup misses.
+    builder = _PROVIDERS.get(provider)
+    if builder is None:
+        provider = provider.lower()
+        builder = _PROVIDERS.get(provider)
+        if builder is None:
+            raise ValueError(f"Unsupported TTS provider: {provider}")
+
+    resolved = {}
+    for field, keys, env_keys, error in _REQUIRED.get(builder, ()):
+        value = _resolve(bot_params, keys, env_keys)
+        if not value:
+            raise ValueError(error)
+        resolved[field] = value
+    logger.info(_MSG[builder])
+    return builder(bot_params, **resolved)
+
+
+def prewarm() -> None:
+    """Import the SDK module of the TTS_PROVIDER provider ahead of the first call."""
+    builder = _PROVIDERS.get(_ENV.get("TTS_PROVIDER", "deepgram").lower())
+    if builder is not None:
+        import_module(_MODULES[builder])